@@ -19,6 +19,7 @@ from oioioi.base.utils import ObjectWithMixins, ClassInitMeta
 from oioioi.base.utils.redirect import safe_redirect
 from oioioi.base.menu import MenuRegistry, side_pane_menus_registry
 from oioioi.base.forms import OioioiUserChangeForm, OioioiUserCreationForm
+from oioioi.contests.utils import invalidate_contest_membership
 
 TabularInline = admin.TabularInline
 StackedInline = admin.StackedInline
@@ -165,7 +166,11 @@ class OioioiUserAdmin(UserAdmin, ObjectWithMixins):
     actions = ['activate_user']
 
     def activate_user(self, request, qs):
+        user_ids = list(qs.values_list('id', flat=True))
         qs.update(is_active=True)
+        # Bulk updates bypass the receivers invalidating memberships.
+        for user_id in user_ids:
+            invalidate_contest_membership(user_id)
     activate_user.short_description = _("Mark users as active")
 
 site.register(User, OioioiUserAdmin)
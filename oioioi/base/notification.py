@@ -1,10 +1,13 @@
+import atexit
 import logging
 import json
+import os
 import uuid
 import time
 import threading
+from Queue import Queue, Empty, Full
 from urlparse import urlparse
-from librabbitmq import Connection, ConnectionError, ChannelError
+from librabbitmq import Connection
 
 from django.conf import settings
 
@@ -12,7 +15,199 @@ from oioioi.base.utils.loaders import load_modules
 
 
 logger = logging.getLogger(__name__)
-thread_data = threading.local()
+
+STATS_LOG_INTERVAL = 60  # seconds
+
+
+class NotificationPublisher(object):
+    """Publishes notifications to RabbitMQ in the background.
+
+       Messages are put in a bounded in-process buffer, so that senders
+       (e.g. the evaluation) never wait for RabbitMQ. A daemon thread
+       drains the buffer in batches over one persistent connection and
+       channel, declaring each queue and exchange only once. A batch is
+       retried until it is published, so delivery is at-least-once; if
+       the buffer is full, new messages are dropped and counted.
+    """
+
+    def __init__(self, buffer_size=None, batch_size=None,
+                 retry_interval=None):
+        self.buffer_size = buffer_size or \
+                settings.NOTIFICATIONS_BUFFER_SIZE
+        self.batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+        self.retry_interval = retry_interval or \
+                settings.NOTIFICATIONS_RETRY_INTERVAL
+        self.lock = threading.Lock()
+        self.buffer = Queue(self.buffer_size)
+        self.counters = dict.fromkeys(('published', 'dropped', 'errors'), 0)
+        self.connection = None
+        self.channel = None
+        self.declared = set()
+        self.thread = None
+        self.pid = None
+
+    def _connect(self):
+        o = urlparse(settings.NOTIFICATIONS_RABBITMQ_URL)
+        kwargs = {}
+        if o.hostname:
+            kwargs['host'] = o.hostname
+        if o.port:
+            kwargs['port'] = o.port
+        if o.username:
+            kwargs['userid'] = o.username
+        if o.password:
+            kwargs['password'] = o.password
+        if o.path:
+            kwargs['virtual_host'] = o.path
+        return Connection(**kwargs)
+
+    def _disconnect(self):
+        # pylint: disable=broad-except
+        try:
+            if self.connection is not None:
+                self.connection.close()
+        except Exception:
+            pass
+        self.connection = self.channel = None
+        self.declared = set()
+
+    def _publish_batch(self, batch):
+        if self.channel is None:
+            self.connection = self._connect()
+            self.channel = self.connection.channel()
+        for exchange, routing_key, body in batch:
+            if exchange and ('exchange', exchange) not in self.declared:
+                # Must match the declaration in the Notifications Server.
+                self.channel.exchange_declare(exchange=exchange,
+                        type='topic', durable=False, auto_delete=False)
+                self.declared.add(('exchange', exchange))
+            elif not exchange and ('queue', routing_key) not in self.declared:
+                self.channel.queue_declare(queue=routing_key, durable=True)
+                self.declared.add(('queue', routing_key))
+            self.channel.basic_publish(exchange=exchange,
+                                       routing_key=routing_key, body=body)
+
+    def _take_batch(self, timeout=None):
+        batch = [self.buffer.get(timeout=timeout)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.buffer.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        """Publishes the batch, reconnecting and retrying until it
+           succeeds.
+        """
+        while True:
+            # pylint: disable=broad-except
+            try:
+                self._publish_batch(batch)
+                with self.lock:
+                    self.counters['published'] += len(batch)
+                return
+            except Exception:
+                with self.lock:
+                    self.counters['errors'] += 1
+                logger.info("Notifications: Can't publish to RabbitMQ, "
+                            "retrying in %d seconds", self.retry_interval,
+                            exc_info=True)
+                self._disconnect()
+                time.sleep(self.retry_interval)
+
+    def _log_stats(self):
+        stats = self.stats()
+        logger.info("Notifications: %(published)d published, %(dropped)d "
+                    "dropped, %(errors)d errors, %(queue_depth)d buffered",
+                    stats)
+
+    def _run(self):
+        last_log = time.time()
+        while True:
+            try:
+                batch = self._take_batch(timeout=STATS_LOG_INTERVAL)
+            except Empty:
+                batch = []
+            if batch:
+                self._send(batch)
+                for _i in batch:
+                    self.buffer.task_done()
+            if time.time() - last_log > STATS_LOG_INTERVAL:
+                self._log_stats()
+                last_log = time.time()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork(), so a worker process forked after
+        # the first notification starts its own.
+        with self.lock:
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            if self.pid is not None:
+                # Messages buffered before fork() are published by
+                # the parent.
+                self.buffer = Queue(self.buffer_size)
+            self.pid = os.getpid()
+            self.connection = self.channel = None
+            self.declared = set()
+            self.thread = threading.Thread(target=self._run,
+                                           name='NotificationPublisher')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def publish(self, routing_key, body, exchange=''):
+        """Buffers the message to be published to the queue named
+           ``routing_key`` or, if ``exchange`` is given, to the topic
+           exchange with this routing key. Never blocks.
+        """
+        self._ensure_thread()
+        try:
+            self.buffer.put_nowait((exchange, routing_key, body))
+        except Full:
+            with self.lock:
+                self.counters['dropped'] += 1
+            logger.warning("Notifications: The buffer is full, a message "
+                           "to %s was dropped", exchange or routing_key)
+
+    def flush(self, timeout=None):
+        """Waits until buffered messages are published, but at most
+           ``timeout`` seconds. Returns ``True`` if the buffer is empty.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while self.buffer.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self):
+        """Returns a dictionary with the number of ``published`` and
+           ``dropped`` messages, failed attempts to publish (``errors``)
+           and the current ``queue_depth``.
+        """
+        with self.lock:
+            result = dict(self.counters)
+        result['queue_depth'] = self.buffer.qsize()
+        return result
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = NotificationPublisher()
+            atexit.register(_flush_publisher)
+        return _publisher
+
+
+def _flush_publisher():
+    if _publisher is not None and _publisher.thread is not None:
+        _publisher.flush(settings.NOTIFICATIONS_FLUSH_TIMEOUT)
+
 
 class NotificationHandler(logging.StreamHandler):
     """This handler catches all logs and emits a notification
@@ -30,60 +225,44 @@ class NotificationHandler(logging.StreamHandler):
     notification_functions = {}
 
     notification_queue_prefix = '_notifs_'
-    last_connection_check = 0
-    conn_try_interval = 30
 
-    @classmethod
-    def _check_connection(cls):
-        if not getattr(thread_data, 'rabbitmq_connected', False) \
-                and 'oioioi.notifications' in settings.INSTALLED_APPS \
-                and NotificationHandler.last_connection_check < \
-                time.time() - NotificationHandler.conn_try_interval:
-            try:
-                o = urlparse(settings.NOTIFICATIONS_RABBITMQ_URL)
-                kwargs = {}
-                if o.hostname:
-                    kwargs['host'] = o.hostname
-                if o.port:
-                    kwargs['port'] = o.port
-                if o.username:
-                    kwargs['userid'] = o.username
-                if o.password:
-                    kwargs['password'] = o.password
-                if o.path:
-                    kwargs['virtual_host'] = o.path
-                thread_data.conn = Connection(**kwargs)
-
-                thread_data.rabbitmq_connected = True
-            # pylint: disable=broad-except
-            except Exception:
-                NotificationHandler.last_connection_check = time.time()
-                logger.info("Notifications: Can't connect to RabbitMQ",
-                            exc_info=True)
+    # Notifications for all users of a contest are published once, to this
+    # topic exchange with a routing key of the form
+    # ``broadcast_routing_key % contest_id``. The Notifications Server passes
+    # them to connected users allowed to receive them.
+    broadcast_exchange = '_notifs_broadcast'
+    broadcast_routing_key = 'contest.%s'
 
     @classmethod
-    def _send_notification_message(cls, user, message, repeated=False):
-        if not hasattr(thread_data, 'conn') or \
-                not getattr(thread_data, 'rabbitmq_connected', False):
+    def _send_notification_message(cls, user, message):
+        if 'oioioi.notifications' not in settings.INSTALLED_APPS:
             return
+        queue_name = NotificationHandler.notification_queue_prefix \
+                + str(user.pk)
+        get_publisher().publish(queue_name, json.dumps(message))
 
-        try:
-            queue_name = NotificationHandler.notification_queue_prefix \
-                    + str(user.pk)
-            channel = thread_data.conn.channel()
-            channel.queue_declare(queue=queue_name, durable=True)
-            channel.basic_publish(exchange='',
-                    routing_key=queue_name, body=json.dumps(message))
-        except (ConnectionError, ChannelError):
-            logger.info("Notifications: Connection with RabbitMQ broken",
-                    exec_info=True)
-            thread_data.rabbitmq_connected = False
-
-            # Make a second try
-            if not repeated:
-                NotificationHandler._check_connection()
-                NotificationHandler._send_notification_message(user, message,
-                        repeated=True)
+    @classmethod
+    def _make_message(cls, notification_message,
+            notification_message_arguments):
+        message = {}
+
+        # Id of a message is an unique uuid4.
+        message['id'] = str(uuid.uuid4())
+
+        message['date'] = round(time.time() * 1000)
+        message['message'] = notification_message
+
+        if 'details' in notification_message_arguments:
+            message['details'] = notification_message_arguments['details']
+
+        if 'address' in notification_message_arguments:
+            message['address'] = notification_message_arguments['address']
+
+        if 'popup' in notification_message_arguments:
+            message['popup'] = notification_message_arguments['popup']
+
+        message['arguments'] = notification_message_arguments
+        return message
 
     @classmethod
     def send_notification(cls, user, notification_type,
@@ -112,29 +291,30 @@ class NotificationHandler(logging.StreamHandler):
                    * "details" -- a short information
                        for the user about the event.
         """
+        message = cls._make_message(notification_message,
+                                    notification_message_arguments)
+        NotificationHandler._send_notification_message(user, message)
 
-        NotificationHandler._check_connection()
-
-        message = {}
-
-        # Id of a message is an unique uuid4.
-        message['id'] = str(uuid.uuid4())
-
-        message['date'] = round(time.time() * 1000)
-        message['message'] = notification_message
-
-        if 'details' in notification_message_arguments:
-            message['details'] = notification_message_arguments['details']
-
-        if 'address' in notification_message_arguments:
-            message['address'] = notification_message_arguments['address']
-
-        if 'popup' in notification_message_arguments:
-            message['popup'] = notification_message_arguments['popup']
+    @classmethod
+    def send_broadcast(cls, contest, notification_type,
+            notification_message, notification_message_arguments):
+        """Sends a notification to all users of the contest who are
+           connected to the Notifications Server and may receive it (see
+           ``is_public_message_notification_recipient`` of the contest
+           controller), publishing a single message.
 
-        message['arguments'] = notification_message_arguments
+           Unlike :meth:`send_notification`, users who are offline do not
+           get the notification later.
 
-        NotificationHandler._send_notification_message(user, message)
+           The parameters are the same as in :meth:`send_notification`.
+        """
+        if 'oioioi.notifications' not in settings.INSTALLED_APPS:
+            return
+        message = cls._make_message(notification_message,
+                                    notification_message_arguments)
+        message['contest'] = contest.id
+        get_publisher().publish(cls.broadcast_routing_key % contest.id,
+                json.dumps(message), exchange=cls.broadcast_exchange)
 
     @classmethod
     def register_notification(cls, notification_type, notification_function):
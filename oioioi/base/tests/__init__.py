@@ -3,11 +3,14 @@ import sys
 import os.path
 import re
 import tempfile
+import time
 import shutil
 from contextlib import contextmanager
 import threading
 import urllib
 import subprocess
+import zipfile
+from StringIO import StringIO
 import logging
 from copy import deepcopy
 
@@ -41,12 +44,14 @@ from oioioi.base.permissions import is_superuser, Condition, make_condition, \
 from oioioi.base.utils import RegisteredSubclassesBase, archive
 from oioioi.base.utils import group_cache
 from oioioi.base.utils.execute import execute, ExecuteError
+from oioioi.base.utils.streaming_zip import stream_zip
 from oioioi.base.fields import DottedNameField, EnumRegistry, EnumField
 from oioioi.base.menu import menu_registry, OrderedRegistry, \
     side_pane_menus_registry, MenuRegistry
 from oioioi.base.management.commands import import_users
 from oioioi.contests.utils import is_contest_admin
-from oioioi.base.notification import NotificationHandler
+from oioioi.base.notification import NotificationHandler, \
+        NotificationPublisher
 from oioioi.base.middleware import UserInfoInErrorMessage
 from oioioi.base.main_page import register_main_page_view, \
         unregister_main_page_view
@@ -817,6 +822,51 @@ class TestArchive(unittest.TestCase):
             self.assertEqual(archive.Archive(filename).extracted_size(),
                              expected_size)
 
+    def test_index(self):
+        for good_file in self.good_files:
+            filename = os.path.join(self.base_dir, good_file)
+            index = archive.Archive(filename).index()
+            self.assertEqual(index.listdir(), ['a', 'b'])
+            self.assertEqual(index.size(), 8)
+            self.assertEqual(index.size('a'), 4)
+            self.assertTrue(index.exists('b'))
+            self.assertFalse(index.isdir('b'))
+            self.assertIs(archive.get_index(filename), index)
+
+    def test_selective_extract(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for good_file in self.good_files:
+                filename = os.path.join(self.base_dir, good_file)
+                archive.Archive(filename).extract(tmpdir, paths=['b'])
+                self.assertEqual(os.listdir(tmpdir), ['b'])
+                os.unlink(os.path.join(tmpdir, 'b'))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestStreamingZip(unittest.TestCase):
+    def test_stream_zip(self):
+        big = 'abcdefgh' * 100000
+        files = [('a', StringIO('foo')), ('dir/b', StringIO(big)),
+                 (u'za\u017c\u00f3\u0142\u0107', StringIO(''))]
+        chunks = list(stream_zip(iter(files), chunk_size=1024))
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(f.closed for _name, f in files))
+
+        zip = zipfile.ZipFile(StringIO(''.join(chunks)), 'r')
+        self.assertEqual(zip.namelist(),
+                ['a', 'dir/b', u'za\u017c\u00f3\u0142\u0107'])
+        self.assertIsNone(zip.testzip())
+        self.assertEqual(zip.read('a'), 'foo')
+        self.assertEqual(zip.read('dir/b'), big)
+
+    def test_stream_zip_stored(self):
+        chunks = stream_zip([('a', StringIO('foo'))],
+                compression=zipfile.ZIP_STORED)
+        zip = zipfile.ZipFile(StringIO(''.join(chunks)), 'r')
+        self.assertEqual(zip.read('a'), 'foo')
+
 class TestAdmin(TestCase):
     fixtures = ['test_users']
 
@@ -955,6 +1005,97 @@ class TestNotifications(TestCase):
         self.assertTrue(flags['got_notification'])
 
 
+class FakeChannel(object):
+    def __init__(self, connection):
+        self.connection = connection
+
+    def queue_declare(self, queue, durable):
+        self.connection.declared.append(queue)
+
+    def exchange_declare(self, exchange, type, durable, auto_delete):
+        self.connection.declared.append(exchange)
+
+    def basic_publish(self, exchange, routing_key, body):
+        self.connection.release.wait()
+        if self.connection.failures:
+            self.connection.failures -= 1
+            raise IOError("Connection lost")
+        if exchange:
+            self.connection.published.append((exchange, routing_key, body))
+        else:
+            self.connection.published.append((routing_key, body))
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.declared = []
+        self.published = []
+        self.failures = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def close(self):
+        pass
+
+
+class TestNotificationPublisher(TestCase):
+    def _publisher(self, **kwargs):
+        connection = FakeConnection()
+        publisher = NotificationPublisher(retry_interval=0.01, **kwargs)
+        publisher._connect = lambda: connection
+        return publisher, connection
+
+    def test_publishing(self):
+        publisher, connection = self._publisher()
+        connection.failures = 1
+        for i in xrange(5):
+            publisher.publish('_notifs_%d' % (i % 2), str(i))
+        self.assertTrue(publisher.flush(5))
+        # The failed message is published again.
+        self.assertEqual(set(connection.published),
+                         set(('_notifs_%d' % (i % 2), str(i))
+                             for i in xrange(5)))
+        self.assertEqual(sorted(set(connection.declared)),
+                         ['_notifs_0', '_notifs_1'])
+        stats = publisher.stats()
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_broadcast(self):
+        publisher, connection = self._publisher()
+        for i in xrange(3):
+            publisher.publish('contest.c', str(i),
+                              exchange='_notifs_broadcast')
+        self.assertTrue(publisher.flush(5))
+        self.assertEqual(connection.declared, ['_notifs_broadcast'])
+        self.assertEqual(connection.published,
+                         [('_notifs_broadcast', 'contest.c', str(i))
+                          for i in xrange(3)])
+
+    def test_buffer_limit(self):
+        publisher, connection = self._publisher(buffer_size=1,
+                                                batch_size=1)
+        connection.release.clear()
+        publisher.publish('_notifs_1', '1')
+        # Wait until the worker takes the first message.
+        while publisher.stats()['queue_depth']:
+            time.sleep(0.01)
+        publisher.publish('_notifs_1', '2')
+        publisher.publish('_notifs_1', '3')
+        self.assertEqual(publisher.stats()['queue_depth'], 1)
+        self.assertEqual(publisher.stats()['dropped'], 1)
+        self.assertFalse(publisher.flush(0.1))
+
+        connection.release.set()
+        self.assertTrue(publisher.flush(5))
+        self.assertEqual(connection.published,
+                         [('_notifs_1', '1'), ('_notifs_1', '2')])
+
+
 class TestCondition(TestCase):
     fixtures = ['test_users']
 
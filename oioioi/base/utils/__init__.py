@@ -7,17 +7,20 @@ import base64
 import shutil
 import tempfile
 import functools
+import hashlib
 import weakref
 import urllib
 from contextlib import contextmanager
 
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, \
+        HttpResponseNotModified
 from django.forms.util import flatatt
 from django.template import Template, Context
 from django.template.response import TemplateResponse
 from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
 from django.utils.encoding import force_unicode
+from django.utils.http import parse_etags, quote_etag
 from django.utils.importlib import import_module
 from django.utils.translation import ugettext_lazy as _
 
@@ -531,6 +534,27 @@ def jsonify(view):
     return inner
 
 
+def content_etag(view):
+    """A decorator which adds an ``ETag`` computed from the content to
+       successful responses of ``view`` and replies with ``304 Not
+       Modified`` if the client already has the same content.
+
+       Meant for small, frequently polled responses.
+    """
+    @functools.wraps(view)
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') \
+                or response.status_code != 200 or response.streaming:
+            return response
+        etag = hashlib.md5(response.content).hexdigest()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        response['ETag'] = quote_etag(etag)
+        return response
+    return inner
+
+
 def add_header(header, value):
     def decorator(view):
         @functools.wraps(view)
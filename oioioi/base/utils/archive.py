@@ -23,7 +23,9 @@
 
 import os
 import tarfile
+import threading
 import zipfile
+from collections import OrderedDict
 
 
 class ArchiveException(RuntimeError):
@@ -41,6 +43,84 @@ class UnsafeArchive(ArchiveException):
     """
 
 
+# Number of archive indexes kept by get_index
+INDEX_CACHE_SIZE = 8
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+class ArchiveIndex(object):
+    """A tree of names of the files in an archive with their sizes.
+
+       Paths are normalized with :func:`os.path.normcase` and
+       :func:`os.path.normpath`. Directories are present in the index
+       regardless of whether the archive has entries for them.
+    """
+
+    def __init__(self, members):
+        """``members`` is an iterable of ``(name, size, is_dir)``."""
+        self.sizes = {}
+        self.children = {'': set()}
+        for name, size, is_dir in members:
+            path = os.path.normpath(os.path.normcase(name))
+            if path == os.curdir:
+                continue
+            parts = path.split(os.sep)
+            for i in xrange(len(parts)):
+                parent = os.sep.join(parts[:i])
+                self.children.setdefault(parent, set()).add(parts[i])
+            if is_dir:
+                self.children.setdefault(path, set())
+            else:
+                self.sizes[path] = size
+
+    def listdir(self, path=''):
+        """Returns a sorted list of names in directory ``path`` (the root
+           of the archive by default).
+        """
+        return sorted(self.children.get(os.path.normpath(path)
+                                         if path else '', ()))
+
+    def isdir(self, path):
+        return os.path.normpath(path) in self.children
+
+    def exists(self, path):
+        path = os.path.normpath(path)
+        return path in self.children or path in self.sizes
+
+    def size(self, path=''):
+        """Returns the total size of the files in the subtree ``path``."""
+        if not path:
+            return sum(self.sizes.itervalues())
+        path = os.path.normpath(path)
+        prefix = path + os.sep
+        return sum(size for name, size in self.sizes.iteritems()
+                   if name == path or name.startswith(prefix))
+
+
+def get_index(path, ext=''):
+    """Returns an :class:`ArchiveIndex` of the archive at ``path``.
+
+       Indexes of the recently used archives are cached, so that the
+       archive is scanned only once, even if it is inspected by many
+       problem package backends.
+    """
+    st = os.stat(path)
+    key = (os.path.realpath(path), ext, st.st_ino, st.st_size, st.st_mtime)
+    with _index_cache_lock:
+        index = _index_cache.pop(key, None)
+        if index is not None:
+            _index_cache[key] = index
+            return index
+    index = ArchiveIndex(Archive(path, ext=ext).members())
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
 def extract(path, to_path='', ext='', **kwargs):
     """
     Unpack the tar or zip file at the specified path to the directory
@@ -63,6 +143,7 @@ class Archive(object):
           given 'file'.  Should start with a dot, e.g. '.tar.gz'.
         """
         self.filename = file
+        self.ext = ext
         self._archive = self._archive_cls(file, ext=ext)(file)
 
     @staticmethod
@@ -97,6 +178,16 @@ class Archive(object):
     def filenames(self):
         return self._archive.filenames()
 
+    def members(self):
+        return self._archive.members()
+
+    def index(self):
+        """Returns a (possibly cached) :class:`ArchiveIndex` of the archive.
+        """
+        if isinstance(self.filename, basestring):
+            return get_index(self.filename, self.ext)
+        return ArchiveIndex(self.members())
+
     def extracted_size(self):
         return self._archive.extracted_size()
 
@@ -115,13 +206,31 @@ class BaseArchive(object):
         """
         raise NotImplementedError()
 
+    def members(self):
+        """
+        Return a list of ``(name, size, is_dir)`` of the archive members.
+        """
+        raise NotImplementedError()
+
+    def _select(self, paths):
+        """
+        Return the names of the members inside any of the given paths.
+        """
+        prefixes = [os.path.normpath(path) for path in paths]
+
+        def _selected(name):
+            name = os.path.normpath(name)
+            return any(name == prefix or name.startswith(prefix + os.sep)
+                       for prefix in prefixes)
+        return [name for name in self.filenames() if _selected(name)]
+
     def extracted_size(self):
         """
         Return total file size of extracted files in bytes.
         """
         raise NotImplementedError()
 
-    def _extract(self, to_path):
+    def _extract(self, to_path, names=None):
         """
         Performs the actual extraction.  Separate from 'extract' method so that
         we don't recurse when subclasses don't declare their own 'extract'
@@ -129,25 +238,32 @@ class BaseArchive(object):
         """
         self._archive.extractall(to_path)
 
-    def extract(self, to_path='', method='safe'):
+    def extract(self, to_path='', method='safe', paths=None):
+        """
+        Extract the archive to 'to_path'. If 'paths' are given, only the
+        members inside them are extracted.
+        """
+        names = self._select(paths) if paths is not None else None
         if method == 'safe':
-            self.check_files(to_path)
+            self.check_files(to_path, names)
         elif method == 'insecure':
             pass
         else:
             raise ValueError("Invalid method option")
-        self._extract(to_path)
+        self._extract(to_path, names)
 
-    def check_files(self, to_path=None):
+    def check_files(self, to_path=None, names=None):
         """
-        Check that all of the files contained in the archive are within the
-        target directory.
+        Check that all of the files contained in the archive (or only
+        'names' of them) are within the target directory.
         """
         if to_path:
             target_path = os.path.normpath(os.path.realpath(to_path))
         else:
             target_path = os.getcwd()
-        for filename in self.filenames():
+        if names is None:
+            names = self.filenames()
+        for filename in names:
             extract_path = os.path.join(target_path, filename)
             extract_path = os.path.normpath(os.path.realpath(extract_path))
             if not extract_path.startswith(target_path):
@@ -167,16 +283,32 @@ class TarArchive(BaseArchive):
     def filenames(self):
         return self._archive.getnames()
 
+    def members(self):
+        return [(member.name, member.size, member.isdir())
+                for member in self._archive]
+
     def extracted_size(self):
         total = 0
         for member in self._archive:
             total += member.size
         return total
 
-    def check_files(self, to_path=None):
-        BaseArchive.check_files(self, to_path)
+    def _extract(self, to_path, names=None):
+        members = None
+        if names is not None:
+            names = set(names)
+            members = [member for member in self._archive
+                       if member.name in names]
+        self._archive.extractall(to_path, members)
 
+    def check_files(self, to_path=None, names=None):
+        BaseArchive.check_files(self, to_path, names)
+
+        if names is not None:
+            names = set(names)
         for finfo in self._archive:
+            if names is not None and finfo.name not in names:
+                continue
             if finfo.issym():
                 raise UnsafeArchive("Archive contains symlink: " + finfo.name)
             if finfo.islnk():
@@ -197,6 +329,19 @@ class ZipArchive(BaseArchive):
     def filenames(self):
         return [name.rstrip('/') for name in self._archive.namelist()]
 
+    def members(self):
+        return [(info.filename.rstrip('/'), info.file_size,
+                 info.filename.endswith('/'))
+                for info in self._archive.infolist()]
+
+    def _extract(self, to_path, names=None):
+        if names is not None:
+            # Directory entries are listed with a trailing slash.
+            names = set(names)
+            names = [name for name in self._archive.namelist()
+                     if name.rstrip('/') in names]
+        self._archive.extractall(to_path, names)
+
 extension_map = {
     '.tar': TarArchive,
     '.tar.bz2': TarArchive,
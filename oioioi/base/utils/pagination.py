@@ -0,0 +1,147 @@
+"""Pagination of large querysets.
+
+   Counting all rows of a big joined queryset and skipping rows with
+   ``OFFSET`` both take time proportional to the number of rows, so
+   :class:`KeysetPaginator` caches the counts and, for querysets ordered by
+   descending primary key, selects pages by the values of the ordering
+   fields in their first row instead.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.sql.datastructures import EmptyResultSet
+
+COUNT_CACHE_KEY = 'pagination_count:%s'
+PAGE_START_CACHE_KEY = 'pagination_page_start:%s:%d:%d'
+
+
+def _query_key(queryset):
+    """Returns a hash identifying the SQL query of the queryset or ``None``
+       if the query matches nothing.
+    """
+    try:
+        sql = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    return hashlib.md5(repr((queryset.db, sql))).hexdigest()
+
+
+def cached_count(queryset):
+    """Returns ``queryset.count()``, cached for
+       ``settings.PAGINATION_COUNT_CACHE_TIMEOUT`` seconds, so it may be
+       slightly out of date.
+    """
+    query_key = _query_key(queryset)
+    if query_key is None:
+        return 0
+    key = COUNT_CACHE_KEY % query_key
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class KeysetPaginator(Paginator):
+    """A :class:`~django.core.paginator.Paginator` with the total count
+       cached by :func:`cached_count`.
+
+       If the queryset is ordered by descending primary key, possibly
+       preceded by another descending non-null field (e.g. ``('-date',
+       '-id')``), a page is selected by comparing these fields with the
+       values of its first row instead of with an offset. The first row of
+       the next page is fetched together with each page and remembered, so
+       moving to the next page is as fast as showing the first one. Only
+       jumping to a page not seen recently needs a query for the values at
+       its offset, which does not read any other columns.
+
+       Querysets with other orderings are paginated as usual.
+    """
+
+    def _keyset_fields(self):
+        """Returns names of the fields the queryset is ordered by (descending)
+           or ``None`` if the queryset cannot be paginated by them.
+        """
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.low_mark or query.high_mark is not None \
+                or self.object_list.model._meta.pk.name != 'id':
+            return None
+        # The admin changelist repeats fields when the model admin and its
+        # queryset both order by them, e.g. ['-id', '-id'].
+        ordering = []
+        for name in query.order_by:
+            if name == '-pk':
+                name = '-id'
+            if name not in ordering:
+                ordering.append(name)
+        if not ordering or ordering[-1] != '-id' or len(ordering) > 2:
+            return None
+        fields = []
+        for name in ordering[:-1]:
+            if not name.startswith('-') or '__' in name:
+                return None
+            try:
+                field = self.object_list.model._meta.get_field(name[1:])
+            except FieldDoesNotExist:
+                return None
+            if field.null:
+                return None
+            fields.append(field.name)
+        return fields + ['pk']
+
+    def _get_count(self):
+        if self._count is None:
+            if hasattr(self.object_list, 'query'):
+                self._count = cached_count(self.object_list)
+            else:
+                self._count = len(self.object_list)
+        return self._count
+    count = property(_get_count)
+
+    def _page_start_key(self, query_key, number):
+        return PAGE_START_CACHE_KEY % (query_key, self.per_page, number)
+
+    def _filter_from(self, queryset, fields, start):
+        """Returns rows of ``queryset`` not before the row with values
+           ``start`` of ``fields``.
+        """
+        condition = Q(**{fields[-1] + '__lte': start[-1]})
+        for name, value in reversed(zip(fields[:-1], start[:-1])):
+            condition = Q(**{name + '__lt': value}) | \
+                    (Q(**{name: value}) & condition)
+        return queryset.filter(condition)
+
+    def page(self, number):
+        fields = self._keyset_fields()
+        if fields is None:
+            return super(KeysetPaginator, self).page(number)
+        number = self.validate_number(number)
+        query_key = _query_key(self.object_list)
+        if query_key is None:
+            return self._get_page([], number, self)
+
+        queryset = self.object_list
+        if number > 1:
+            start = cache.get(self._page_start_key(query_key, number))
+            if start is None:
+                bottom = (number - 1) * self.per_page
+                starts = list(queryset.values_list(*fields)
+                              [bottom:bottom + 1])
+                if not starts:
+                    return self._get_page([], number, self)
+                start = starts[0]
+            queryset = self._filter_from(queryset, fields, start)
+
+        rows = list(queryset[:self.per_page + 1])
+        if len(rows) > self.per_page:
+            next_row = rows[self.per_page]
+            cache.set(self._page_start_key(query_key, number + 1),
+                      tuple(getattr(next_row, name) for name in fields),
+                      settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+            rows = rows[:self.per_page]
+        return self._get_page(rows, number, self)
@@ -10,7 +10,13 @@ from oioioi.base.utils.execute import execute
 from oioioi.filetracker.utils import stream_file
 
 
-def generate_pdf(tex_code, filename, extra_args=[], num_passes=3):
+def compile_pdf(tex_chunks, extra_args=[], num_passes=3):
+    """Compiles LaTeX code, given as an iterable of unicode strings, with
+       ``pdflatex`` and returns an open file with the resulting PDF.
+
+       The code is written to disk as the chunks come, so it does not need
+       to fit in memory at once.
+    """
     # Create temporary file and folder
     tmp_folder = tempfile.mkdtemp()
     try:
@@ -18,7 +24,8 @@ def generate_pdf(tex_code, filename, extra_args=[], num_passes=3):
         tex_path = os.path.join(tmp_folder, tex_filename)
 
         with codecs.open(tex_path, 'w', 'utf-8') as f:
-            f.write(tex_code)
+            for chunk in tex_chunks:
+                f.write(chunk)
 
         command = ['pdflatex']
         command.extend(extra_args)
@@ -26,8 +33,12 @@ def generate_pdf(tex_code, filename, extra_args=[], num_passes=3):
         for _i in xrange(num_passes):
             execute(command, cwd=tmp_folder)
 
-        # Get PDF file contents
-        pdf_file = open(os.path.splitext(tex_path)[0] + '.pdf')
-        return stream_file(File(pdf_file), filename)
+        # The file stays readable after the folder is removed.
+        return open(os.path.splitext(tex_path)[0] + '.pdf', 'rb')
     finally:
         shutil.rmtree(tmp_folder)
+
+
+def generate_pdf(tex_code, filename, extra_args=[], num_passes=3):
+    pdf_file = compile_pdf([tex_code], extra_args, num_passes)
+    return stream_file(File(pdf_file), filename)
@@ -0,0 +1,182 @@
+"""A zip archive writer which produces its output as a stream of chunks.
+
+   Unlike :class:`zipfile.ZipFile`, it never seeks in the output, so the
+   archive may be sent straight to the client (e.g. from
+   a :class:`~django.http.StreamingHttpResponse`) without staging anything
+   on disk. Only one chunk of one member is kept in memory at a time.
+
+   Member sizes and checksums are written in data descriptors after the
+   member's data and every member carries a Zip64 extra field, so that
+   members and archives larger than 4 GiB are supported.
+"""
+
+import binascii
+import struct
+import time
+import zlib
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+_LOCAL_HEADER = struct.Struct('<LHHHHHLLLHH')
+_LOCAL_SIGNATURE = 0x04034b50
+_DATA_DESCRIPTOR = struct.Struct('<LLQQ')
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+_CENTRAL_HEADER = struct.Struct('<LHHHHHHLLLHHHHHLL')
+_CENTRAL_SIGNATURE = 0x02014b50
+_END_RECORD = struct.Struct('<LHHHHLLH')
+_END_SIGNATURE = 0x06054b50
+_ZIP64_END_RECORD = struct.Struct('<LQHHLLQQQQ')
+_ZIP64_END_SIGNATURE = 0x06064b50
+_ZIP64_LOCATOR = struct.Struct('<LLQL')
+_ZIP64_LOCATOR_SIGNATURE = 0x07064b50
+_ZIP64_EXTRA_ID = 0x0001
+
+_ZIP64_VERSION = 45
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_LIMIT32 = 0xffffffff
+_LIMIT16 = 0xffff
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_date = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_date, dos_time
+
+
+def _encode_name(arcname):
+    if isinstance(arcname, unicode):
+        try:
+            return arcname.encode('ascii'), 0
+        except UnicodeEncodeError:
+            return arcname.encode('utf-8'), _FLAG_UTF8
+    return arcname, 0
+
+
+class _Member(object):
+    def __init__(self, name, flags, compression, dos_date, dos_time, offset):
+        self.name = name
+        self.flags = flags
+        self.compression = compression
+        self.dos_date = dos_date
+        self.dos_time = dos_time
+        self.offset = offset
+        self.crc = 0
+        self.compressed_size = 0
+        self.size = 0
+
+
+def stream_zip(files, compression=zipfile.ZIP_DEFLATED,
+        chunk_size=CHUNK_SIZE):
+    """Generates a zip archive containing the given files, chunk by chunk.
+
+       ``files`` is an iterable of ``(arcname, fileobj)`` pairs. It is
+       consumed lazily, so it may be a generator opening files on demand.
+       Each ``fileobj`` is read in chunks of ``chunk_size`` bytes and closed
+       once it has been written.
+    """
+    if compression not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        raise ValueError("Unsupported compression method: %r"
+                % (compression,))
+
+    members = []
+    offset = 0
+    now = time.time()
+
+    for arcname, fileobj in files:
+        name, flags = _encode_name(arcname)
+        flags |= _FLAG_DATA_DESCRIPTOR
+        dos_date, dos_time = _dos_datetime(now)
+        member = _Member(name, flags, compression, dos_date, dos_time, offset)
+
+        extra = struct.pack('<HHQQ', _ZIP64_EXTRA_ID, 16, 0, 0)
+        header = _LOCAL_HEADER.pack(_LOCAL_SIGNATURE, _ZIP64_VERSION, flags,
+                compression, dos_time, dos_date, 0, _LIMIT32, _LIMIT32,
+                len(name), len(extra)) + name + extra
+        offset += len(header)
+        yield header
+
+        if compression == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                    zlib.DEFLATED, -15)
+        else:
+            compressor = None
+
+        crc = 0
+        try:
+            while True:
+                data = fileobj.read(chunk_size)
+                if not data:
+                    break
+                crc = binascii.crc32(data, crc)
+                member.size += len(data)
+                if compressor:
+                    data = compressor.compress(data)
+                    if not data:
+                        continue
+                member.compressed_size += len(data)
+                yield data
+        finally:
+            fileobj.close()
+
+        if compressor:
+            data = compressor.flush()
+            member.compressed_size += len(data)
+            yield data
+        member.crc = crc & _LIMIT32
+        offset += member.compressed_size
+
+        descriptor = _DATA_DESCRIPTOR.pack(_DATA_DESCRIPTOR_SIGNATURE,
+                member.crc, member.compressed_size, member.size)
+        offset += len(descriptor)
+        yield descriptor
+        members.append(member)
+
+    central_offset = offset
+    central_size = 0
+    for member in members:
+        zip64_fields = []
+        size = member.size
+        compressed_size = member.compressed_size
+        member_offset = member.offset
+        if size >= _LIMIT32:
+            zip64_fields.append(size)
+            size = _LIMIT32
+        if compressed_size >= _LIMIT32:
+            zip64_fields.append(compressed_size)
+            compressed_size = _LIMIT32
+        if member_offset >= _LIMIT32:
+            zip64_fields.append(member_offset)
+            member_offset = _LIMIT32
+        if zip64_fields:
+            extra = struct.pack('<HH%dQ' % len(zip64_fields),
+                    _ZIP64_EXTRA_ID, 8 * len(zip64_fields), *zip64_fields)
+        else:
+            extra = ''
+
+        header = _CENTRAL_HEADER.pack(_CENTRAL_SIGNATURE, _ZIP64_VERSION,
+                _ZIP64_VERSION, member.flags, member.compression,
+                member.dos_time, member.dos_date, member.crc,
+                compressed_size, size, len(member.name), len(extra), 0, 0, 0,
+                0644 << 16, member_offset) + member.name + extra
+        central_size += len(header)
+        yield header
+
+    count = len(members)
+    if count >= _LIMIT16 or central_offset >= _LIMIT32 \
+            or central_size >= _LIMIT32:
+        zip64_end_offset = central_offset + central_size
+        yield _ZIP64_END_RECORD.pack(_ZIP64_END_SIGNATURE,
+                _ZIP64_END_RECORD.size - 12, _ZIP64_VERSION, _ZIP64_VERSION,
+                0, 0, count, count, central_size, central_offset)
+        yield _ZIP64_LOCATOR.pack(_ZIP64_LOCATOR_SIGNATURE, 0,
+                zip64_end_offset, 1)
+        count = min(count, _LIMIT16)
+        central_size = min(central_size, _LIMIT32)
+        central_offset = min(central_offset, _LIMIT32)
+
+    yield _END_RECORD.pack(_END_SIGNATURE, 0, 0, count, count, central_size,
+            central_offset, 0)
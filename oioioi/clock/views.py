@@ -9,7 +9,8 @@ from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from oioioi.base.utils.redirect import safe_redirect
 
-from oioioi.contests.models import Round
+from oioioi.contests.utils import rounds_times, has_round_time_extensions, \
+        contest_timing_cached_per_second
 from oioioi.status import status_registry
 from oioioi.su.utils import is_real_superuser
 
@@ -35,26 +36,13 @@ def get_times_status(request, response):
         response['is_time_admin'] = True
         response['sync_time'] = min(10000, response.get('sync_time', 10000))
 
-    next_rounds_times = None
-    current_rounds_times = None
-
     if timestamp and contest:
-        rtimes = [contest.controller.get_round_times(request, round)
-                    for round in Round.objects.filter(contest=contest)]
-        next_rounds_times = [rt for rt in rtimes if rt.is_future(timestamp)]
-        next_rounds_times.sort(key=lambda rt: rt.get_start())
-        current_rounds_times = [rt for rt in rtimes
-                                if rt.is_active(timestamp) and rt.get_end()]
-        current_rounds_times.sort(key=lambda rt: rt.get_end())
-
-    if current_rounds_times:
-        response['round_start_date'] = time.mktime((timezone
-            .localtime(current_rounds_times[0].get_start())).timetuple())
-        response['round_end_date'] = time.mktime((timezone
-            .localtime(current_rounds_times[0].get_end())).timetuple())
-    elif next_rounds_times:
-        response['round_start_date'] = time.mktime((timezone
-            .localtime(next_rounds_times[0].get_start())).timetuple())
+        if has_round_time_extensions(request):
+            response.update(_round_dates(request))
+        else:
+            # The same for all users, so computed once per second.
+            response.update(contest_timing_cached_per_second(request,
+                    'status_round_dates', lambda: _round_dates(request)))
 
     if 'admin_time' in request.session:
         response['is_admin_time_set'] = True
@@ -67,6 +55,30 @@ def get_times_status(request, response):
     return response
 
 
+def _round_dates(request):
+    timestamp = request.timestamp
+    contest = request.contest
+    rtimes = [contest.controller.get_round_times(request, round)
+              for round in sorted(rounds_times(request),
+                                  key=lambda r: (r.start_date, r.id))]
+    next_rounds_times = [rt for rt in rtimes if rt.is_future(timestamp)]
+    next_rounds_times.sort(key=lambda rt: rt.get_start())
+    current_rounds_times = [rt for rt in rtimes
+                            if rt.is_active(timestamp) and rt.get_end()]
+    current_rounds_times.sort(key=lambda rt: rt.get_end())
+
+    result = {}
+    if current_rounds_times:
+        result['round_start_date'] = time.mktime((timezone
+            .localtime(current_rounds_times[0].get_start())).timetuple())
+        result['round_end_date'] = time.mktime((timezone
+            .localtime(current_rounds_times[0].get_end())).timetuple())
+    elif next_rounds_times:
+        result['round_start_date'] = time.mktime((timezone
+            .localtime(next_rounds_times[0].get_start())).timetuple())
+    return result
+
+
 def admin_time(request, next_page=None):
     if 'next' in request.REQUEST:
         next_page = request.REQUEST['next']
@@ -7,11 +7,17 @@ from django.template.loader import render_to_string
 from django.template.response import TemplateResponse
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
+from django.core.cache import cache
 
 from oioioi.base.utils import ObjectWithMixins
-from oioioi.contestexcl.models import ExclusivenessConfig
+from oioioi.contestexcl.utils import active_exclusive_contests
 from oioioi.contests.middleware import activate_contest
 from oioioi.contests.models import Contest
+from oioioi.contests.utils import contest_membership_version
+
+
+SELECTION_SESSION_KEY = 'contestexcl_selection'
+ANONYMOUS_SELECTION_CACHE_KEY = 'contestexcl_anonymous_selection:%s'
 
 
 class ExclusiveContestsMiddleware(ObjectWithMixins):
@@ -25,13 +31,15 @@ class ExclusiveContestsMiddleware(ObjectWithMixins):
           into account.
        #. All contests with active
           :class:`~oioioi.contestexcl.models.ExclusivenessConfig` instance are
-          acquired from the database.
+          acquired (see
+          :func:`~oioioi.contestexcl.utils.active_exclusive_contests`).
        #. They are filtered with a special selector function, which by default
           checks if the user is not a contest admin. In addition,
           ``process_view`` accepts another selector function as an argument.
           If it is present, the contest list is filtered with a logical
           conjunction of the default selector and the selector passed
-          as an argument (it may be useful with mixins).
+          as an argument (it may be useful with mixins). The result is
+          cached in the session.
        #. If there is only one contest left, the ``request.contest`` variable
           is set to this contest or a redirect is made if necessary.
        #. If there is more than one contest left, the user is logged out,
@@ -54,22 +62,20 @@ class ExclusiveContestsMiddleware(ObjectWithMixins):
                 _default_selector(user, contest) and selector(user, contest)
 
         if settings.ONLY_DEFAULT_CONTEST:
-            qs = [Contest.objects.get(id=settings.DEFAULT_CONTEST)]
+            contest_ids = [settings.DEFAULT_CONTEST]
         else:
-            qs = ExclusivenessConfig.objects.get_active(request.timestamp) \
-                 .select_related('contest')
-            qs = [ex_cf.contest for ex_cf in qs]
-            qs = [cnst for cnst in qs if final_selector(request.user, cnst)]
+            contest_ids = self._selected_contest_ids(request, final_selector)
 
-        if len(qs) > 1:
+        if len(contest_ids) > 1:
+            qs = Contest.objects.filter(id__in=contest_ids)
             self._send_error_email(request, qs)
             activate_contest(request, None)
             auth.logout(request)
             return TemplateResponse(request,
                     'contestexcl/exclusive_contests_error.html')
-        elif len(qs) == 1:
-            contest = qs[0]
-            if request.contest != contest:
+        elif len(contest_ids) == 1:
+            contest_id = contest_ids[0]
+            if request.contest is None or request.contest.id != contest_id:
                 if request.is_ajax():
                     raise PermissionDenied
                 else:
@@ -80,11 +86,48 @@ class ExclusiveContestsMiddleware(ObjectWithMixins):
                             " other contests.")
                     )
                     return redirect(reverse('default_contest_view',
-                                            kwargs={'contest_id': contest.id}))
+                                            kwargs={'contest_id': contest_id}))
             request.contest_exclusive = True
         else:
             request.contest_exclusive = False
 
+    def _selected_contest_ids(self, request, selector):
+        """Returns ids of contests with active exclusiveness configs which
+           pass the selector for the current user.
+
+           The result is kept in the session (or, for anonymous users, in
+           the cache) until the active configs change or, as selectors
+           check permissions and participations, the user's memberships in
+           contests change.
+        """
+        version, contest_ids = active_exclusive_contests(request.timestamp)
+        if not contest_ids:
+            return []
+
+        user = request.user
+        if user.is_anonymous():
+            key = ANONYMOUS_SELECTION_CACHE_KEY % version
+            selected = cache.get(key)
+            if selected is None:
+                selected = self._select(user, contest_ids, selector)
+                cache.set(key, selected,
+                          settings.CONTEST_EXCLUSIVENESS_CACHE_TIMEOUT)
+            return selected
+
+        # Lists, as sessions are serialized to JSON.
+        state = [user.id, version, contest_membership_version(user.id)]
+        cached = request.session.get(SELECTION_SESSION_KEY)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        selected = self._select(user, contest_ids, selector)
+        request.session[SELECTION_SESSION_KEY] = [state, selected]
+        return selected
+
+    def _select(self, user, contest_ids, selector):
+        return [contest.id for contest
+                in Contest.objects.filter(id__in=contest_ids).order_by('id')
+                if selector(user, contest)]
+
     def _check_requirements(self, request):
         if not hasattr(request, 'timestamp'):
             raise ImproperlyConfigured(
@@ -1,6 +1,8 @@
 from django.core.exceptions import ValidationError, ImproperlyConfigured
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
@@ -72,3 +74,11 @@ class ExclusivenessConfig(models.Model):
         if self.end_date is not None and self.start_date > self.end_date:
             raise ValidationError(_("The start date should"
                                     " precede the end date"))
+
+
+@receiver(post_save, sender=ExclusivenessConfig)
+@receiver(post_delete, sender=ExclusivenessConfig)
+@receiver(post_save, sender=Contest)
+def _invalidate_active_configs(sender, **kwargs):
+    from oioioi.contestexcl.utils import invalidate_active_configs
+    invalidate_active_configs()
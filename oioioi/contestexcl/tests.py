@@ -1,7 +1,8 @@
 from datetime import datetime
 from django.core import mail
+from django.db import connection
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import override_settings, CaptureQueriesContext
 from django.utils.timezone import utc
 
 from oioioi.base.tests import fake_time
@@ -117,3 +118,52 @@ class TestExclusiveContests(TestCase, ContestIdViewCheckMixin):
         with fake_time(datetime(2012, 1, 1, 12, tzinfo=utc)):
             self._assertContestVisible('c1')
             self._assertContestVisible('c2')
+
+    def test_end_date_boundary(self):
+        ex_conf = ExclusivenessConfig()
+        ex_conf.contest = self.c2
+        ex_conf.start_date = datetime(2012, 1, 1, 10, tzinfo=utc)
+        ex_conf.end_date = datetime(2012, 1, 1, 14, tzinfo=utc)
+        ex_conf.save()
+
+        with fake_time(datetime(2012, 1, 1, 14, tzinfo=utc)):
+            self._assertContestRedirects('c1', '/c/c2/')
+        with fake_time(datetime(2012, 1, 1, 14, 0, 0, 1, tzinfo=utc)):
+            self._assertContestVisible('c1')
+        with fake_time(datetime(2012, 1, 1, 10, tzinfo=utc)):
+            self._assertContestRedirects('c1', '/c/c2/')
+        with fake_time(datetime(2012, 1, 1, 9, 59, 59, 999999, tzinfo=utc)):
+            self._assertContestVisible('c1')
+
+    def test_noncontest_url(self):
+        ex_conf = ExclusivenessConfig()
+        ex_conf.contest = self.c2
+        ex_conf.start_date = datetime(2012, 1, 1, 10, tzinfo=utc)
+        ex_conf.end_date = datetime(2012, 1, 1, 14, tzinfo=utc)
+        ex_conf.save()
+
+        with fake_time(datetime(2012, 1, 1, 11, tzinfo=utc)):
+            response = self.client.get('/noncontest_id/')
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('/c/c2/', response['Location'])
+
+    def test_cached_selection(self):
+        ex_conf = ExclusivenessConfig()
+        ex_conf.contest = self.c2
+        ex_conf.start_date = datetime(2012, 1, 1, 10, tzinfo=utc)
+        ex_conf.end_date = datetime(2012, 1, 1, 14, tzinfo=utc)
+        ex_conf.save()
+
+        for username in (None, 'test_user'):
+            if username:
+                self.assertTrue(self.client.login(username=username))
+            with fake_time(datetime(2012, 1, 1, 11, tzinfo=utc)):
+                self._assertContestVisible('c2')
+                with CaptureQueriesContext(connection) as queries:
+                    self._assertContestRedirects('c1', '/c/c2/')
+                    self._assertContestVisible('c2')
+                self.assertFalse([query for query in queries.captured_queries
+                        if 'contestexcl_exclusivenessconfig' in query['sql']])
+
+            with fake_time(datetime(2012, 1, 1, 15, tzinfo=utc)):
+                self._assertContestVisible('c1')
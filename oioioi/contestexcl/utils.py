@@ -0,0 +1,68 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from oioioi.contestexcl.models import ExclusivenessConfig
+
+
+ACTIVE_CONFIGS_CACHE_KEY = 'contestexcl_active_configs'
+
+
+def invalidate_active_configs():
+    """Makes the cached result of :func:`active_exclusive_contests` out of
+       date. Called when exclusiveness configs or contests change.
+    """
+    cache.delete(ACTIVE_CONFIGS_CACHE_KEY)
+
+
+def _active_window(configs, timestamp):
+    """Returns ids of contests whose configs are active at ``timestamp``
+       and the period ``[start, end)`` around it in which they stay the
+       same (``None`` meaning unbounded).
+    """
+    contest_ids = []
+    start = end = None
+    for contest_id, start_date, end_date in configs:
+        if start_date <= timestamp and \
+                (end_date is None or end_date >= timestamp):
+            contest_ids.append(contest_id)
+        changes = [start_date]
+        if end_date is not None:
+            # A config is still active at its end date.
+            changes.append(end_date + timedelta(microseconds=1))
+        for change in changes:
+            if change <= timestamp:
+                start = change if start is None else max(start, change)
+            else:
+                end = change if end is None else min(end, change)
+    return sorted(contest_ids), start, end
+
+
+def active_exclusive_contests(timestamp):
+    """Returns a pair ``(version, contest_ids)``, where ``contest_ids`` is
+       a list of ids of contests with an
+       :class:`~oioioi.contestexcl.models.ExclusivenessConfig` active at
+       ``timestamp``.
+
+       The ids are cached together with the period in which they stay the
+       same, so they are recomputed only when configs change, the next
+       config starts or ends, or after
+       ``settings.CONTEST_EXCLUSIVENESS_CACHE_TIMEOUT`` seconds.
+       ``version`` changes whenever they are recomputed.
+    """
+    cached = cache.get(ACTIVE_CONFIGS_CACHE_KEY)
+    if cached is not None:
+        version, contest_ids, start, end = cached
+        if (start is None or start <= timestamp) and \
+                (end is None or timestamp < end):
+            return version, contest_ids
+
+    configs = ExclusivenessConfig.objects.filter(enabled=True) \
+            .values_list('contest_id', 'start_date', 'end_date')
+    contest_ids, start, end = _active_window(configs, timestamp)
+    version = uuid.uuid4().hex
+    cache.set(ACTIVE_CONFIGS_CACHE_KEY, (version, contest_ids, start, end),
+              settings.CONTEST_EXCLUSIVENESS_CACHE_TIMEOUT)
+    return version, contest_ids
@@ -5,6 +5,9 @@ from django.conf.urls import patterns
 from django.contrib.admin import AllValuesFieldListFilter, SimpleListFilter
 from django.contrib.admin.sites import NotRegistered
 from django.contrib.admin.util import unquote, quote
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, SEARCH_VAR
+from django.core.paginator import InvalidPage
 from django.core.urlresolvers import reverse
 from django.forms.models import modelform_factory
 from django.http import HttpResponseRedirect, Http404
@@ -15,6 +18,7 @@ from django.utils.encoding import force_unicode
 
 from oioioi.base import admin
 from oioioi.base.utils import make_html_links, make_html_link
+from oioioi.base.utils.pagination import KeysetPaginator, cached_count
 from oioioi.contests.forms import ProblemInstanceForm, SimpleContestForm, \
         TestsSelectionForm
 from oioioi.contests.menu import contest_admin_menu_registry, \
@@ -22,7 +26,8 @@ from oioioi.contests.menu import contest_admin_menu_registry, \
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
         Submission, ContestAttachment, RoundTimeExtension, ContestPermission, \
         submission_kinds, ContestLink, SubmissionReport
-from oioioi.contests.utils import is_contest_admin, is_contest_observer
+from oioioi.contests.utils import is_contest_admin, is_contest_observer, \
+        contest_submitters
 from oioioi.contests.current_contest import set_cc_id
 from oioioi.programs.models import Test, TestReport
 from oioioi.problems.models import ProblemSite
@@ -343,11 +348,7 @@ class UserListFilter(SimpleListFilter):
 
     def lookups(self, request, model_admin):
         # Unique users that have submitted something in this contest
-        users = list(Submission.objects
-                .filter(problem_instance__contest=request.contest)
-                .distinct()
-                .order_by('user__username')
-                .values_list('user__id', 'user__username'))
+        users = contest_submitters(request.contest.id)
         if (None, None) in users:
             users = [x for x in users if x != (None, None)]
             users.append(('None', _("(None)")))
@@ -412,6 +413,40 @@ class SubmissionRoundListFilter(SimpleListFilter):
             return queryset
 
 
+class SubmissionChangeList(ChangeList):
+    """Like :class:`~django.contrib.admin.views.main.ChangeList`, but
+       the total number of submissions of the contest, which Django counts
+       on every request when any filter is applied, comes from
+       :func:`~oioioi.base.utils.pagination.cached_count`.
+    """
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(request, self.queryset,
+                self.list_per_page)
+        result_count = paginator.count
+        if self.get_filters_params() or self.params.get(SEARCH_VAR):
+            full_result_count = cached_count(self.root_queryset)
+        else:
+            full_result_count = result_count
+        can_show_all = result_count <= self.list_max_show_all
+        multi_page = result_count > self.list_per_page
+
+        if (self.show_all and can_show_all) or not multi_page:
+            result_list = self.queryset._clone()
+        else:
+            try:
+                result_list = paginator.page(self.page_num + 1).object_list
+            except InvalidPage:
+                raise IncorrectLookupParameters
+
+        self.result_count = result_count
+        self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = can_show_all
+        self.multi_page = multi_page
+        self.paginator = paginator
+
+
 class SubmissionAdmin(admin.ModelAdmin):
     list_display = ['id', 'user_login', 'user_full_name', 'date',
             'problem_instance_display', 'status_display', 'score_display']
@@ -421,6 +456,8 @@ class SubmissionAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     actions = ['rejudge_action']
     search_fields = ['user__username', 'user__last_name']
+    ordering = ['-id']
+    paginator = KeysetPaginator
 
     def get_urls(self):
         urls = patterns('',
@@ -556,6 +593,9 @@ class SubmissionAdmin(admin.ModelAdmin):
         queryset = queryset.order_by('-id')
         return queryset
 
+    def get_changelist(self, request, **kwargs):
+        return SubmissionChangeList
+
     def lookup_allowed(self, key, value):
         if key == 'user__username':
             return True
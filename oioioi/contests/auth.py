@@ -1,5 +1,6 @@
 from django.utils.translation import ugettext_lazy as _
 from oioioi.contests.models import ContestPermission, Contest
+from oioioi.contests.utils import cached_user_permissions
 
 
 class ContestPermissionsAuthBackend(object):
@@ -14,8 +15,21 @@ class ContestPermissionsAuthBackend(object):
             return False
         if obj is None or not isinstance(obj, Contest):
             return False
+        return (obj.id, perm) in self._get_permissions(user_obj)
+
+    def contests_with_perm(self, user_obj, perm):
+        """Returns ids of contests for which the user has the permission."""
+        if not user_obj.is_authenticated() or not user_obj.is_active:
+            return set()
+        return set(contest_id for contest_id, contest_perm
+                   in self._get_permissions(user_obj)
+                   if contest_perm == perm)
+
+    def _get_permissions(self, user_obj):
         if not hasattr(user_obj, '_contest_perms_cache'):
-            user_obj._contest_perms_cache = set(ContestPermission.objects
-                .filter(user=user_obj)
-                .values_list('contest', 'permission'))
-        return (obj.id, perm) in user_obj._contest_perms_cache
+            user_obj._contest_perms_cache = cached_user_permissions(user_obj,
+                    'contest_permissions',
+                    lambda: frozenset(ContestPermission.objects
+                        .filter(user=user_obj)
+                        .values_list('contest', 'permission')))
+        return user_obj._contest_perms_cache
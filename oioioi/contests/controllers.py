@@ -24,7 +24,7 @@ from oioioi.contests.models import Submission, Round, UserResultForRound, \
 from oioioi.contests.scores import ScoreValue
 from oioioi.contests.utils import visible_problem_instances, rounds_times, \
         is_contest_admin, is_contest_observer, last_break_between_rounds, \
-        has_any_active_round
+        has_any_active_round, contests_with_permission
 from oioioi.problems.controllers import ProblemController
 from oioioi import evalmgr
 
@@ -41,22 +41,40 @@ def export_entries(registry, values):
 
 
 def submission_template_context(request, submission):
-    controller = submission.problem_instance.controller
-    can_see_status = controller.can_see_submission_status(request, submission)
-    can_see_score = controller.can_see_submission_score(request, submission)
-    can_see_comment = controller.can_see_submission_comment(request,
-            submission)
+    return submissions_template_context(request, [submission])[0]
 
-    valid_kinds = controller.valid_kinds_for_submission(submission)
-    valid_kinds.remove(submission.kind)
-    valid_kinds_for_submission = export_entries(submission_kinds,
-            valid_kinds)
 
-    return {'submission': submission,
-            'can_see_status': can_see_status,
-            'can_see_score': can_see_score,
-            'can_see_comment': can_see_comment,
-            'valid_kinds_for_submission': valid_kinds_for_submission}
+def submissions_template_context(request, submissions):
+    """Returns :func:`submission_template_context` for each of the
+       submissions, e.g. of one page of a list.
+
+       The permission checks of all submissions are evaluated here at once,
+       with one controller per problem instance, so the template only reads
+       their results and the cost of rendering the list depends on
+       the number of the given submissions only.
+    """
+    controllers = {}
+    result = []
+    for submission in submissions:
+        problem_instance = submission.problem_instance
+        controller = controllers.get(problem_instance.id)
+        if controller is None:
+            controller = controllers[problem_instance.id] = \
+                    problem_instance.controller
+        valid_kinds = controller.valid_kinds_for_submission(submission)
+        valid_kinds.remove(submission.kind)
+        result.append({
+            'submission': submission,
+            'can_see_status':
+                controller.can_see_submission_status(request, submission),
+            'can_see_score':
+                controller.can_see_submission_score(request, submission),
+            'can_see_comment':
+                controller.can_see_submission_comment(request, submission),
+            'valid_kinds_for_submission':
+                export_entries(submission_kinds, valid_kinds),
+        })
+    return result
 
 
 class RegistrationController(RegisteredSubclassesBase, ObjectWithMixins):
@@ -87,6 +105,35 @@ class RegistrationController(RegisteredSubclassesBase, ObjectWithMixins):
         queryset = User.objects.filter(id=request.user.id)
         return bool(self.filter_participants(queryset))
 
+    @classmethod
+    def filter_visible_contests(cls, request, contests):
+        """Returns ids of the contests from the given list, all using this
+           registration controller, which the current user can enter, i.e.
+           for which :meth:`can_enter_contest` returns ``True``.
+
+           Used by :func:`~oioioi.contests.utils.visible_contests`. The
+           default implementation calls :meth:`can_enter_contest` for each
+           contest, so subclasses should do it with a query if possible
+           (see :meth:`contests_entered_by_permission`).
+        """
+        return [contest.id for contest in contests
+                if cls(contest).can_enter_contest(request)]
+
+    @classmethod
+    def contests_entered_by_permission(cls, request, contests):
+        """Returns a set of ids of the contests from the given list which
+           the current user can enter thanks to their permissions, as in
+           :meth:`can_enter_contest`.
+        """
+        if request.user.is_anonymous():
+            return set()
+        ids = set(contest.id for contest in contests)
+        if request.user.is_superuser and request.user.is_active:
+            return ids
+        return ids & contests_with_permission(request.user,
+                ['contests.contest_admin', 'contests.contest_observer',
+                 'contests.personal_data'])
+
     def anonymous_can_enter_contest(self):
         """Determines if an anonymous user can enter the contest.
 
@@ -158,6 +205,10 @@ class PublicContestRegistrationController(RegistrationController):
     def can_enter_contest(self, request):
         return True
 
+    @classmethod
+    def filter_visible_contests(cls, request, contests):
+        return [contest.id for contest in contests]
+
     def anonymous_can_enter_contest(self):
         return True
 
@@ -269,6 +320,41 @@ class ContestController(RegisteredSubclassesBase, ObjectWithMixins):
         """
         return rounds_times(request)[round]
 
+    def get_visibility_boundaries(self, request):
+        """Returns a list of moments at which the results of
+           :meth:`can_see_round`, :meth:`can_see_problem` and
+           :meth:`can_submit` may change for the user doing the request.
+
+           Results of these methods are cached across requests between
+           consecutive boundaries, so controllers basing them on other
+           moments should extend the list.
+
+           The default implementation returns the dates of rounds, adjusted
+           by the user's round time extensions.
+        """
+        result = []
+        for rtimes in rounds_times(request).itervalues():
+            result.extend([rtimes.get_start(), rtimes.get_end(),
+                           rtimes.show_results, rtimes.show_public_results])
+            if rtimes.show_results and rtimes.extra_time:
+                result.append(rtimes.show_results +
+                              timedelta(minutes=rtimes.extra_time))
+        return result
+
+    def visibility_cache_key(self, request):
+        """Returns a string identifying everything about the user doing
+           the request, other than time, which the results of
+           :meth:`can_see_round`, :meth:`can_see_problem` and
+           :meth:`can_submit` depend on.
+
+           These results are cached across requests under this key, so
+           controllers basing them on something else should extend it.
+
+           The default implementation identifies the user and whether they
+           are a contest admin.
+        """
+        return '%s:%d' % (request.user.id, is_contest_admin(request))
+
     def separate_public_results(self):
         """Determines if there should be two separate dates for personal
            results (when participants can see their scores for a given round)
@@ -784,19 +870,40 @@ class PastRoundsHiddenContestControllerMixin(object):
         return super(PastRoundsHiddenContestControllerMixin, self) \
                 .can_see_round(request, round)
 
+    def get_visibility_boundaries(self, request):
+        result = super(PastRoundsHiddenContestControllerMixin, self) \
+                .get_visibility_boundaries(request)
+        left, right = last_break_between_rounds(request)
+        if left is not None and right is not None:
+            result.append(right - min(timedelta(minutes=30),
+                                      (right - left) // 2))
+        return result
+
 
 class NotificationsMixinForContestController(object):
 
     def users_to_receive_public_message_notification(self):
-        """Decide if all users particiapting in a contest should be
-           notified about a new global message.
+        """Returns the users (a list or a queryset) who receive
+           notifications about new public messages in the contest.
 
-           This should be disabled for contest with many users
-           because of performance reasons - for each user, a single
-           query to database is executed while sending a notification.
+           Notifications are broadcast once per contest, and only sockets
+           of these users are subscribed to the broadcasts (see
+           :meth:`is_public_message_notification_recipient`). By default
+           nobody receives them.
         """
         return []
 
+    def is_public_message_notification_recipient(self, user):
+        """Checks if the user is one of
+           :meth:`users_to_receive_public_message_notification`.
+
+           Called once when the user connects to the Notifications Server.
+        """
+        users = self.users_to_receive_public_message_notification()
+        if hasattr(users, 'filter'):
+            return users.filter(id=user.id).exists()
+        return user in users
+
     def get_notification_message_submission_judged(self, submission):
         """Return a message to show in a notification when a
            submission has been judged.
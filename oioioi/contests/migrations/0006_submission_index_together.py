@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0005_auto_20150531_2248'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='submission',
+            index_together=set([('problem_instance', 'id'), ('user', 'problem_instance'), ('problem_instance', 'status', 'kind')]),
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Max
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.text import get_valid_filename
@@ -321,6 +321,11 @@ class Submission(models.Model):
         verbose_name = _("submission")
         verbose_name_plural = _("submissions")
         get_latest_by = 'date'
+        # For lists of submissions of a contest (newest first), optionally
+        # filtered by user, status or kind.
+        index_together = (('problem_instance', 'id'),
+                          ('user', 'problem_instance'),
+                          ('problem_instance', 'status', 'kind'))
 
     def is_scored(self):
         return self.score is not None
@@ -457,6 +462,34 @@ class RoundTimeExtension(models.Model):
     def __unicode__(self):
         return unicode(self.round) + ': ' + unicode(self.user)
 
+
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+def _invalidate_contest_timing(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_timing
+    invalidate_contest_timing(instance.id)
+
+
+@receiver(post_save, sender=Round)
+@receiver(post_delete, sender=Round)
+@receiver(post_save, sender=ProblemInstance)
+@receiver(post_delete, sender=ProblemInstance)
+def _invalidate_contest_timing_of_contest(sender, instance, **kwargs):
+    if instance.contest_id:
+        from oioioi.contests.utils import invalidate_contest_timing
+        invalidate_contest_timing(instance.contest_id)
+
+
+@receiver(post_save, sender=RoundTimeExtension)
+@receiver(post_delete, sender=RoundTimeExtension)
+def _invalidate_contest_timing_of_round(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_timing
+    # The round may be already deleted if the extension is deleted with it.
+    for contest_id in Round.objects.filter(id=instance.round_id) \
+            .values_list('contest_id', flat=True):
+        invalidate_contest_timing(contest_id)
+
+
 contest_permissions = EnumRegistry()
 contest_permissions.register('contests.contest_admin', _("Admin"))
 contest_permissions.register('contests.contest_observer', _("Observer"))
@@ -478,6 +511,32 @@ class ContestPermission(models.Model):
         return u'%s/%s: %s' % (self.contest, self.permission, self.user)
 
 
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+def _invalidate_visible_contests(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_visible_contests
+    invalidate_visible_contests()
+
+
+@receiver(post_save, sender=ContestPermission)
+@receiver(post_delete, sender=ContestPermission)
+def _invalidate_contest_membership(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_membership
+    invalidate_contest_membership(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def _invalidate_contest_membership_of_user(sender, instance, update_fields,
+        **kwargs):
+    # Superusers and inactive users are treated specially when checking
+    # permissions. Logging in only updates last_login, which changes
+    # neither.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    from oioioi.contests.utils import invalidate_contest_membership
+    invalidate_contest_membership(instance.id)
+
+
 class ContestView(models.Model):
     user = models.ForeignKey(User)
     contest = models.ForeignKey(Contest)
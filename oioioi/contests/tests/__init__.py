@@ -5,7 +5,8 @@ from django.core import mail
 from collections import defaultdict
 
 from django.test import TestCase, RequestFactory
-from django.test.utils import override_settings
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.db import connection
 from django.template import Template, RequestContext
 from django.http import HttpResponse
 from django.core.exceptions import ValidationError
@@ -16,6 +17,7 @@ from django.contrib.auth.models import User, AnonymousUser
 from django.contrib.admin.util import quote
 
 from oioioi.base.tests import check_not_accessible, fake_time, TestsUtilsMixin
+from oioioi.base.utils.pagination import KeysetPaginator
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
         UserResultForContest, Submission, ContestAttachment, \
         RoundTimeExtension, ContestPermission, UserResultForProblem, \
@@ -25,7 +27,9 @@ from oioioi.contests.controllers import ContestController, \
         RegistrationController, PastRoundsHiddenContestControllerMixin
 from oioioi.contests.date_registration import date_registry
 from oioioi.contests.utils import is_contest_admin, is_contest_observer, \
-        can_enter_contest, rounds_times, can_see_personal_data
+        can_enter_contest, rounds_times, can_see_personal_data, \
+        visible_problem_instances, submittable_problem_instances, \
+        has_any_active_round, visible_contests, contest_submitters
 from oioioi.contests.current_contest import ContestMode
 from oioioi.filetracker.tests import TestStreamingMixin
 from oioioi.problems.models import Problem, ProblemStatement, ProblemAttachment
@@ -817,6 +821,86 @@ class TestRejudgeTypesView(TestCase):
         self.assertNotIn('Tests:', response.content)
 
 
+class TestSubmissionsPagination(TestCase):
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+                'test_problem_instance', 'test_submission']
+
+    def setUp(self):
+        problem_instance = ProblemInstance.objects.get()
+        user = User.objects.get(username='test_user2')
+        for _i in xrange(4):
+            Submission.objects.create(problem_instance=problem_instance,
+                                      user=user)
+
+    def test_keyset_paginator(self):
+        queryset = Submission.objects.order_by('-id')
+        ids = list(queryset.values_list('id', flat=True))
+        paginator = KeysetPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual([s.id for s in paginator.page(1)], ids[:2])
+        # The first row of the next page is remembered.
+        with self.assertNumQueries(1):
+            self.assertEqual([s.id for s in paginator.page(2)], ids[2:4])
+        self.assertEqual([s.id for s in KeysetPaginator(queryset, 2).page(3)],
+                         ids[4:])
+
+        Submission.objects.create(
+                problem_instance=ProblemInstance.objects.get())
+        self.assertEqual(KeysetPaginator(queryset, 2).count, 5)
+
+        duplicated = Submission.objects.order_by('-id', '-pk')
+        self.assertEqual(KeysetPaginator(duplicated, 2)._keyset_fields(),
+                         ['pk'])
+
+    def test_changelist(self):
+        self.client.login(username='test_admin')
+        self.client.get('/c/c/')  # 'c' becomes the current contest
+        url = reverse('oioioiadmin:contests_submission_changelist')
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+        self.assertContains(response, 'test_user2')
+        # The changelist is paginated by the primary key, not by offset.
+        self.assertEqual(response.context['cl'].paginator._keyset_fields(),
+                         ['pk'])
+
+        # New submitters appear in the filter after the cached list is
+        # refreshed.
+        Submission.objects.create(problem_instance=ProblemInstance.objects
+                .get(), user=User.objects.get(username='test_admin'))
+        response = self.client.get(url + '?user=1000')
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertEqual(response.context['cl'].full_result_count, 6)
+        self.assertNotIn((1000, 'test_admin'), contest_submitters('c'))
+        with self.settings(CONTEST_SUBMITTERS_REFRESH_INTERVAL=-1):
+            contest_submitters('c')
+        self.assertIn((1000, 'test_admin'), contest_submitters('c'))
+
+        # Lists which were not refreshed in the background for too long
+        # are recomputed immediately.
+        Submission.objects.create(problem_instance=ProblemInstance.objects
+                .get(), user=User.objects.get(username='test_user3'))
+        self.assertNotIn((1003, 'test_user3'), contest_submitters('c'))
+        with self.settings(CONTEST_SUBMITTERS_MAX_AGE=-1):
+            self.assertIn((1003, 'test_user3'), contest_submitters('c'))
+
+    @override_settings(SUBMISSIONS_ON_PAGE=3)
+    def test_my_submissions(self):
+        ids = list(Submission.objects.filter(user__username='test_user2')
+                   .order_by('-id').values_list('id', flat=True))
+        self.client.login(username='test_user2')
+        url = reverse('my_submissions', kwargs={'contest_id': 'c'})
+        response = self.client.get(url)
+        self.assertEqual([s['submission'].id
+                          for s in response.context['submissions']], ids[:3])
+        self.assertEqual(response.context['paginator'].count, 4)
+        response = self.client.get(url + '?page=2')
+        self.assertEqual([s['submission'].id
+                          for s in response.context['submissions']], ids[3:])
+        response = self.client.get(url + '?page=3')
+        self.assertEqual(response.status_code, 404)
+
+
 class TestContestAdmin(TestCase):
     fixtures = ['test_users']
 
@@ -1305,6 +1389,92 @@ class TestRoundExtension(TestCase, SubmitFileMixin):
         self.assertEqual(rext.extra_time, 27182818)
 
 
+class TestContestTimingCache(TestCase):
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+                'test_problem_instance']
+
+    def _request(self, timestamp, username='test_user'):
+        request = RequestFactory().request()
+        request.contest = Contest.objects.get()
+        request.user = User.objects.get(username=username)
+        request.timestamp = timestamp
+        return request
+
+    def _submittable(self, timestamp, username='test_user'):
+        return [pi.id for pi in submittable_problem_instances(
+                self._request(timestamp, username))]
+
+    def test_visibility_cache(self):
+        round = Round.objects.get()
+        round.end_date = datetime(2012, 7, 31, 20, 0, tzinfo=utc)
+        round.save()
+        pi = ProblemInstance.objects.get()
+        before = datetime(2011, 7, 30, tzinfo=utc)
+        during = datetime(2012, 1, 1, tzinfo=utc)
+        after = datetime(2012, 8, 1, tzinfo=utc)
+
+        self.assertEqual(visible_problem_instances(self._request(before)), [])
+        self.assertEqual(visible_problem_instances(self._request(during)),
+                         [pi])
+        self.assertEqual(self._submittable(round.end_date), [pi.id])
+        self.assertEqual(self._submittable(after), [])
+
+        # Another request in the same period reuses the cached results.
+        with CaptureQueriesContext(connection) as queries:
+            request = self._request(datetime(2012, 2, 1, tzinfo=utc))
+            self.assertEqual(visible_problem_instances(request), [pi])
+            self.assertTrue(has_any_active_round(request))
+        for query in queries.captured_queries:
+            self.assertNotIn('contests_round', query['sql'])
+            self.assertNotIn('contests_probleminstance', query['sql'])
+
+        RoundTimeExtension.objects.create(user=User.objects.get(
+                username='test_user'), round=round, extra_time=10 * 24 * 60)
+        self.assertEqual(self._submittable(after), [pi.id])
+        self.assertEqual(self._submittable(after, 'test_user2'), [])
+
+        round.start_date = datetime(2012, 3, 1, tzinfo=utc)
+        round.save()
+        self.assertEqual(visible_problem_instances(self._request(during)), [])
+
+
+class TestVisibleContestsCache(TestCase):
+    fixtures = ['test_users', 'test_contest']
+
+    def _visible(self, username):
+        request = RequestFactory().request()
+        request.user = User.objects.get(username=username)
+        return [contest.id for contest in visible_contests(request)]
+
+    def test_visible_contests_cache(self):
+        Contest.objects.create(id='private', name='Private Contest',
+            controller_name='oioioi.contests.tests.PrivateContestController')
+        user = User.objects.get(username='test_user')
+        self.assertEqual(self._visible('test_user'), ['c'])
+
+        ContestPermission.objects.create(user=user,
+                contest_id='private', permission='contests.contest_observer')
+        self.assertEqual(self._visible('test_user'), ['private', 'c'])
+        self.assertEqual(self._visible('test_user2'), ['c'])
+
+        request = RequestFactory().request()
+        request.user = user
+        with self.assertNumQueries(1):
+            self.assertEqual(len(visible_contests(request)), 2)
+
+        ContestPermission.objects.all().delete()
+        self.assertEqual(self._visible('test_user'), ['c'])
+        user.is_superuser = True
+        user.save()
+        self.assertEqual(self._visible('test_user'), ['private', 'c'])
+
+        Contest.objects.create(id='private2', name='Another Private Contest',
+            controller_name='oioioi.contests.tests.PrivateContestController')
+        self.assertEqual(self._visible('test_user'),
+                         ['private2', 'private', 'c'])
+        self.assertEqual(self._visible('test_user2'), ['c'])
+
+
 class TestPermissions(TestCase):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
             'test_problem_instance', 'test_submissions', 'test_permissions']
@@ -1379,6 +1549,27 @@ class TestPermissions(TestCase):
         self.assertTrue(test_user.has_perm('contests.contest_observer',
             self.contest))
 
+    def test_permissions_cache(self):
+        observer = User.objects.get(username='test_observer')
+        self.assertTrue(observer.has_perm('contests.contest_observer',
+            self.contest))
+        self.assertFalse(observer.has_perm('contests.contest_admin',
+            self.contest))
+
+        # Another request gets a new user object, but the permissions are
+        # still cached.
+        observer = User.objects.get(username='test_observer')
+        with self.assertNumQueries(0):
+            self.assertTrue(observer.has_perm('contests.contest_observer',
+                self.contest))
+            self.assertFalse(observer.has_perm('contests.contest_admin',
+                self.contest))
+
+        ContestPermission.objects.filter(user=observer).delete()
+        observer = User.objects.get(username='test_observer')
+        self.assertFalse(observer.has_perm('contests.contest_observer',
+            self.contest))
+
     def test_menu(self):
         self.client.login(username='test_contest_admin')
         response = self.client.get(reverse('default_contest_view',
@@ -1,11 +1,45 @@
+import calendar
+import time
+import uuid
+
+from celery.task import task
+
+from django.conf import settings
+from django.contrib.auth import get_backends
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from oioioi.base.permissions import make_request_condition
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
         Submission, RoundTimeExtension
 from oioioi.base.utils import request_cached
 from datetime import timedelta
 
+# Rounds, problem instances and the results of visibility checks of
+# a contest are cached across requests under keys containing the contest's
+# version, which changes whenever any of them is modified.
+CONTEST_TIMING_VERSION_KEY = 'contest_timing_version:%s'
+CONTEST_TIMING_CACHE_KEY = 'contest_timing:%s:%s:%s'
+# Results computed by contest_timing_cached_per_second are kept for this
+# number of seconds.
+PER_SECOND_CACHE_TIMEOUT = 2
+
+# Results of visible_contests are cached under keys containing versions of
+# the list of contests and of the user's memberships in contests.
+VISIBLE_CONTESTS_VERSION_KEY = 'visible_contests_version'
+CONTEST_MEMBERSHIP_VERSION_KEY = 'contest_membership_version:%s'
+VISIBLE_CONTESTS_CACHE_KEY = 'visible_contests:%s:%s:%s'
+# Contest permissions of users, as reported by authentication backends, are
+# cached under keys containing the version of the user's memberships.
+USER_PERMISSIONS_CACHE_KEY = 'user_contest_permissions:%s:%s:%s'
+
+# Users who submitted something in a contest, shown in the submissions
+# admin filter, are cached and refreshed in the background.
+CONTEST_SUBMITTERS_CACHE_KEY = 'contest_submitters:%s'
+CONTEST_SUBMITTERS_REFRESH_KEY = 'contest_submitters_refresh:%s'
+CONTEST_SUBMITTERS_CACHE_TIMEOUT = 24 * 3600
+
 
 class RoundTimes(object):
     def __init__(self, start, end, contest, show_results=None,
@@ -80,23 +114,142 @@ class RoundTimes(object):
             return self.end
 
 
+def invalidate_contest_timing(contest_id):
+    """Makes everything cached by :func:`contest_timing_cached` for
+       the contest out of date.
+
+       Called when rounds, problem instances or round time extensions of
+       the contest change.
+    """
+    cache.delete(CONTEST_TIMING_VERSION_KEY % contest_id)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
 @request_cached
-def rounds_times(request):
-    if not hasattr(request, 'contest'):
-        return {}
+def _contest_timing_version(request):
+    return _get_version(CONTEST_TIMING_VERSION_KEY % request.contest.id)
+
+
+def contest_timing_cached(request, name, fn, timeout=None):
+    """Returns ``fn()``, cached across requests until rounds, problem
+       instances or round time extensions of the current contest change
+       (see :func:`invalidate_contest_timing`).
+
+       ``name`` must identify everything the result depends on, besides
+       the contest.
+    """
+    key = CONTEST_TIMING_CACHE_KEY % (request.contest.id,
+            _contest_timing_version(request), name)
+    value = cache.get(key)
+    if value is None:
+        value = fn()
+        cache.set(key, value,
+                  timeout or settings.CONTEST_TIMING_CACHE_TIMEOUT)
+    return value
+
+
+def contest_timing_cached_per_second(request, name, fn):
+    """Like :func:`contest_timing_cached`, but for results depending on
+       ``request.timestamp``, which are shared by all requests to
+       the contest made within the same second.
+
+       Meant for user-independent parts of responses to frequently
+       polled views.
+    """
+    return contest_timing_cached(request,
+            '%s:%d' % (name, _timestamp(request.timestamp)), fn,
+            timeout=PER_SECOND_CACHE_TIMEOUT)
+
+
+def _contest_rounds(request):
+    return contest_timing_cached(request, 'rounds',
+            lambda: list(Round.objects.filter(contest=request.contest)
+                         .select_related('contest')))
+
 
-    rounds = [r for r in Round.objects.filter(contest=request.contest)
-              .select_related('contest')]
-    rids = [r.id for r in rounds]
+def _contest_problem_instances(request):
+    return contest_timing_cached(request, 'problem_instances',
+            lambda: list(ProblemInstance.objects
+                         .filter(contest=request.contest)
+                         .select_related('problem', 'round')))
+
+
+def _round_time_extensions(request):
     if not request.user or request.user.is_anonymous():
-        rtexts = {}
-    else:
-        rtexts = dict((x['round_id'], x) for x in RoundTimeExtension.objects
-                      .filter(user=request.user, round__id__in=rids).values())
+        return {}
+    return contest_timing_cached(request,
+            'extensions:%d' % request.user.id,
+            lambda: dict(RoundTimeExtension.objects
+                         .filter(user=request.user,
+                                 round__contest=request.contest)
+                         .values_list('round_id', 'extra_time')))
+
+
+def has_round_time_extensions(request):
+    """Checks if the current user has any round time extensions in
+       the current contest, so that their round times differ from
+       the other users'.
+    """
+    return bool(_round_time_extensions(request))
+
+
+@request_cached
+def rounds_times(request):
+    if getattr(request, 'contest', None) is None:
+        return {}
 
+    rtexts = _round_time_extensions(request)
     return dict((r, RoundTimes(r.start_date, r.end_date, r.contest,
-        r.results_date, r.public_results_date,
-        rtexts[r.id]['extra_time'] if r.id in rtexts else 0)) for r in rounds)
+        r.results_date, r.public_results_date, rtexts.get(r.id, 0)))
+        for r in _contest_rounds(request))
+
+
+def _timestamp(value):
+    return calendar.timegm(value.utctimetuple())
+
+
+@request_cached
+def _visibility_period(request):
+    """Returns a string identifying the period between the moments at
+       which visibility of rounds and problems may change for the user
+       (see :meth:`~oioioi.contests.controllers.ContestController.\
+       get_visibility_boundaries`), which contains ``request.timestamp``,
+       and the number of seconds until it ends, if it ends.
+    """
+    now = request.timestamp
+    boundaries = set(b for b in request.contest.controller
+                     .get_visibility_boundaries(request) if b is not None)
+    previous = max([b for b in boundaries if b <= now] or [None])
+    following = min([b for b in boundaries if b > now] or [None])
+    period = '%s-%s-%d' % (
+            _timestamp(previous) if previous else '',
+            _timestamp(following) if following else '',
+            previous == now)
+    if following is None:
+        return period, None
+    return period, (following - timezone.now()).total_seconds()
+
+
+def _visibility_cached(request, name, fn):
+    """Caches the result of a visibility check of the current contest
+       across requests of users with the same
+       :meth:`~oioioi.contests.controllers.ContestController.\
+       visibility_cache_key` until the next round boundary.
+    """
+    period, remaining = _visibility_period(request)
+    timeout = settings.CONTEST_TIMING_CACHE_TIMEOUT
+    if remaining is not None and remaining > 0:
+        timeout = min(timeout, int(remaining) + 1)
+    key = 'visibility:%s:%s:%s' % (name,
+            request.contest.controller.visibility_cache_key(request), period)
+    return contest_timing_cached(request, key, fn, timeout)
 
 
 @make_request_condition
@@ -113,11 +266,14 @@ def has_any_rounds(request):
 @request_cached
 def has_any_active_round(request):
     controller = request.contest.controller
-    for round in Round.objects.filter(contest=request.contest):
-        rtimes = controller.get_round_times(request, round)
-        if rtimes.is_active(request.timestamp):
-            return True
-    return False
+
+    def _check():
+        for round in _contest_rounds(request):
+            rtimes = controller.get_round_times(request, round)
+            if rtimes.is_active(request.timestamp):
+                return True
+        return False
+    return _visibility_cached(request, 'has_any_active_round', _check)
 
 
 @make_request_condition
@@ -127,11 +283,14 @@ def all_public_results_visible(request):
        public.
     """
     controller = request.contest.controller
-    for round in Round.objects.filter(contest=request.contest):
-        rtimes = controller.get_round_times(request, round)
-        if not rtimes.public_results_visible(request.timestamp):
-            return False
-    return True
+
+    def _check():
+        for round in _contest_rounds(request):
+            rtimes = controller.get_round_times(request, round)
+            if not rtimes.public_results_visible(request.timestamp):
+                return False
+        return True
+    return _visibility_cached(request, 'all_public_results_visible', _check)
 
 
 @make_request_condition
@@ -149,24 +308,31 @@ def has_any_visible_problem_instance(request):
 @request_cached
 def submittable_problem_instances(request):
     controller = request.contest.controller
-    queryset = ProblemInstance.objects.filter(contest=request.contest) \
-            .select_related('problem').prefetch_related('round')
-    return [pi for pi in queryset if controller.can_submit(request, pi)]
+    problem_instances = _contest_problem_instances(request)
+    ids = _visibility_cached(request, 'submittable_problem_instances',
+            lambda: set(pi.id for pi in problem_instances
+                        if controller.can_submit(request, pi)))
+    return [pi for pi in problem_instances if pi.id in ids]
 
 
 @request_cached
 def visible_problem_instances(request):
     controller = request.contest.controller
-    queryset = ProblemInstance.objects.filter(contest=request.contest) \
-            .select_related('problem').prefetch_related('round')
-    return [pi for pi in queryset if controller.can_see_problem(request, pi)]
+    problem_instances = _contest_problem_instances(request)
+    ids = _visibility_cached(request, 'visible_problem_instances',
+            lambda: set(pi.id for pi in problem_instances
+                        if controller.can_see_problem(request, pi)))
+    return [pi for pi in problem_instances if pi.id in ids]
 
 
 @request_cached
 def visible_rounds(request):
     controller = request.contest.controller
-    queryset = Round.objects.filter(contest=request.contest)
-    return [r for r in queryset if controller.can_see_round(request, r)]
+    rounds = _contest_rounds(request)
+    ids = _visibility_cached(request, 'visible_rounds',
+            lambda: set(r.id for r in rounds
+                        if controller.can_see_round(request, r)))
+    return [r for r in rounds if r.id in ids]
 
 
 def aggregate_statuses(statuses):
@@ -179,14 +345,107 @@ def aggregate_statuses(statuses):
         return 'OK'
 
 
+def invalidate_visible_contests():
+    """Makes the cached results of :func:`visible_contests` of all users
+       out of date. Called when contests are added, changed or deleted.
+    """
+    cache.delete(VISIBLE_CONTESTS_VERSION_KEY)
+
+
+def invalidate_contest_membership(user_id):
+    """Makes the cached result of :func:`visible_contests` and the cached
+       permissions (see :func:`cached_user_permissions`) of the user out
+       of date. Called when the user's participations, permissions or other
+       memberships in contests change.
+    """
+    cache.delete(CONTEST_MEMBERSHIP_VERSION_KEY % user_id)
+
+
+def contest_membership_version(user_id):
+    """Returns a value which changes whenever
+       :func:`invalidate_contest_membership` is called for the user.
+    """
+    return _get_version(CONTEST_MEMBERSHIP_VERSION_KEY % user_id)
+
+
+def cached_user_permissions(user, name, fn):
+    """Returns the result of ``fn()``, which should compute permissions
+       of the user, caching it under ``name`` across requests until
+       :func:`invalidate_contest_membership` is called for the user.
+
+       Used by authentication backends, so that checking permissions does
+       not hit the database on every request.
+    """
+    key = USER_PERMISSIONS_CACHE_KEY % (name, user.id,
+            contest_membership_version(user.id))
+    result = cache.get(key)
+    if result is None:
+        result = fn()
+        cache.set(key, result, settings.CONTEST_PERMISSIONS_CACHE_TIMEOUT)
+    return result
+
+
+def contests_with_permission(user, perms):
+    """Returns a set of ids of contests for which the user has any of
+       the given permissions, as reported by the ``contests_with_perm``
+       methods of authentication backends.
+
+       Superusers are not taken into account.
+    """
+    result = set()
+    for backend in get_backends():
+        if hasattr(backend, 'contests_with_perm'):
+            for perm in perms:
+                result.update(backend.contests_with_perm(user, perm))
+    return result
+
+
+def _visible_contest_ids(request):
+    all_ids = set()
+    by_controller = {}
+    for contest in Contest.objects.all():
+        all_ids.add(contest.id)
+        rcontroller_class = \
+                type(contest.controller.registration_controller())
+        by_controller.setdefault(rcontroller_class, []).append(contest)
+    ids = set()
+    for rcontroller_class, contests in by_controller.iteritems():
+        ids.update(rcontroller_class.filter_visible_contests(request,
+                                                             contests))
+    return ids, all_ids
+
+
 @request_cached
 def visible_contests(request):
-    contests = []
-    for contest in Contest.objects.order_by('-creation_date'):
-        rcontroller = contest.controller.registration_controller()
-        if rcontroller.can_enter_contest(request):
-            contests.append(contest)
-    return contests
+    """Returns the list of contests the user can enter, the newest first.
+
+       Ids of these contests (or of the other ones, if there are fewer of
+       them) are cached until contests or the user's memberships change, so
+       usually only one query is needed.
+    """
+    if request.user.is_anonymous():
+        user_id = membership_version = ''
+    else:
+        user_id = request.user.id
+        membership_version = contest_membership_version(user_id)
+    key = VISIBLE_CONTESTS_CACHE_KEY % (user_id,
+            _get_version(VISIBLE_CONTESTS_VERSION_KEY), membership_version)
+    cached = cache.get(key)
+    if cached is None:
+        ids, all_ids = _visible_contest_ids(request)
+        if len(all_ids) - len(ids) < len(ids):
+            cached = ('exclude', sorted(all_ids - ids))
+        else:
+            cached = ('include', sorted(ids))
+        cache.set(key, cached, settings.VISIBLE_CONTESTS_CACHE_TIMEOUT)
+
+    mode, ids = cached
+    contests = Contest.objects.order_by('-creation_date')
+    if mode == 'include':
+        contests = contests.filter(id__in=ids)
+    elif ids:
+        contests = contests.exclude(id__in=ids)
+    return list(contests)
 
 
 @make_request_condition
@@ -233,6 +492,24 @@ def get_submission_or_error(request, submission_id,
     return submission
 
 
+def my_visible_submissions(request):
+    """Returns a queryset of submissions of the current user in the current
+       contest, which they can see, the newest first.
+
+       The queryset is ordered by ``('-date', '-id')``, so it may be
+       paginated by :class:`~oioioi.base.utils.pagination.KeysetPaginator`.
+    """
+    queryset = Submission.objects \
+            .filter(problem_instance__contest=request.contest) \
+            .order_by('-date', '-id') \
+            .select_related('user', 'problem_instance',
+                            'problem_instance__contest',
+                            'problem_instance__round',
+                            'problem_instance__problem')
+    return request.contest.controller \
+            .filter_my_visible_submissions(request, queryset)
+
+
 @request_cached
 def last_break_between_rounds(request):
     """Returns the end_date of the latest past round and the start_date
@@ -250,3 +527,46 @@ def last_break_between_rounds(request):
     min_start = min(starts) if starts else None
 
     return max_end, min_start
+
+
+def _compute_contest_submitters(contest_id):
+    users = list(Submission.objects
+            .filter(problem_instance__contest=contest_id)
+            .distinct()
+            .order_by('user__username')
+            .values_list('user__id', 'user__username'))
+    cache.set(CONTEST_SUBMITTERS_CACHE_KEY % contest_id, (time.time(), users),
+              CONTEST_SUBMITTERS_CACHE_TIMEOUT)
+    return users
+
+
+@task(ignore_result=True)
+def refresh_contest_submitters_job(contest_id):
+    _compute_contest_submitters(contest_id)
+
+
+def contest_submitters(contest_id):
+    """Returns a list of ``(id, username)`` of users who submitted
+       something in the contest, sorted by username. ``(None, None)`` stands
+       for submissions without a user.
+
+       The list is cached. When it is older than
+       ``settings.CONTEST_SUBMITTERS_REFRESH_INTERVAL`` seconds, it is still
+       returned, but recomputed in the background by
+       :func:`refresh_contest_submitters_job`. A list older than
+       ``settings.CONTEST_SUBMITTERS_MAX_AGE`` seconds, which the background
+       job failed to refresh (e.g. because no worker consumes its queue),
+       is recomputed immediately.
+    """
+    cached = cache.get(CONTEST_SUBMITTERS_CACHE_KEY % contest_id)
+    if cached is None:
+        return _compute_contest_submitters(contest_id)
+    computed_at, users = cached
+    age = time.time() - computed_at
+    if age > settings.CONTEST_SUBMITTERS_MAX_AGE:
+        return _compute_contest_submitters(contest_id)
+    interval = settings.CONTEST_SUBMITTERS_REFRESH_INTERVAL
+    if age > interval and cache.add(
+            CONTEST_SUBMITTERS_REFRESH_KEY % contest_id, True, interval):
+        refresh_contest_submitters_job.delay(contest_id)
+    return users
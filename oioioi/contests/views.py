@@ -7,6 +7,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
+from django.core.paginator import InvalidPage
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.http import HttpResponseRedirect, HttpResponse
@@ -24,14 +25,15 @@ from oioioi.base.permissions import not_anonymous, enforce_condition
 from oioioi.base.utils.redirect import safe_redirect
 from oioioi.base.utils.user_selection import get_user_hints_view
 from oioioi.base.main_page import register_main_page_view
-from oioioi.contests.controllers import submission_template_context
+from oioioi.base.utils.pagination import KeysetPaginator
+from oioioi.contests.controllers import submissions_template_context
 from oioioi.contests.forms import SubmissionForm, GetUserInfoForm
-from oioioi.contests.models import Contest, ProblemInstance, Submission, \
+from oioioi.contests.models import Contest, ProblemInstance, \
         SubmissionReport, ContestAttachment
 from oioioi.contests.utils import visible_contests, can_enter_contest, \
         can_see_personal_data, is_contest_admin, has_any_submittable_problem, \
         visible_rounds, visible_problem_instances, contest_exists, \
-        get_submission_or_error, is_contest_observer
+        get_submission_or_error, is_contest_observer, my_visible_submissions
 from oioioi.filetracker.utils import stream_file
 from oioioi.problems.models import ProblemStatement, ProblemAttachment
 from oioioi.problems.utils import query_statement, query_zip
@@ -145,22 +147,21 @@ def submit_view(request):
         reverse('my_submissions'), order=400)
 @enforce_condition(not_anonymous & contest_exists & can_enter_contest)
 def my_submissions_view(request):
-    queryset = Submission.objects \
-            .filter(problem_instance__contest=request.contest) \
-            .order_by('-date') \
-            .select_related('user', 'problem_instance',
-                            'problem_instance__contest',
-                            'problem_instance__round',
-                            'problem_instance__problem')
+    queryset = my_visible_submissions(request)
     controller = request.contest.controller
-    queryset = controller.filter_my_visible_submissions(request, queryset)
     header = controller.render_my_submissions_header(request, queryset.all())
-    submissions = [submission_template_context(request, s) for s in queryset]
+    paginator = KeysetPaginator(queryset,
+            getattr(settings, 'SUBMISSIONS_ON_PAGE', 100))
+    try:
+        page = paginator.page(request.page(''))
+    except InvalidPage:
+        raise Http404
+    submissions = submissions_template_context(request, page.object_list)
     show_scores = any(s['can_see_score'] for s in submissions)
     return TemplateResponse(request, 'contests/my_submissions.html',
         {'header': header,
          'submissions': submissions, 'show_scores': show_scores,
-         'submissions_on_page': getattr(settings, 'SUBMISSIONS_ON_PAGE', 100)})
+         'paginator': paginator, 'page_obj': page})
 
 
 def submission_view_unsafe(request, submission):
@@ -2,7 +2,9 @@ from datetime import datetime
 import json
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import utc
 from oioioi.base.tests import fake_time
 from oioioi.contests.models import Round, Contest, RoundTimeExtension
@@ -121,3 +123,23 @@ class TestCtimes(TestCase):
         url = reverse('ctimes', kwargs={'contest_id': 'c2'})
         response = self.client.get(url)
         self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+    def test_etag(self):
+        url = reverse('ctimes', kwargs={'contest_id': 'c1'})
+        with fake_time(datetime(2013, 10, 11, 7, 56, tzinfo=utc)):
+            response = self.client.get(url)
+            self.assertEqual(json.loads(response.content),
+                             self.round1_result)
+            etag = response['ETag']
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+            self.assertFalse([query for query in queries.captured_queries
+                              if 'contests_round' in query['sql']])
+
+        with fake_time(datetime(2013, 10, 22, 11, 0, tzinfo=utc)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(json.loads(response.content),
+                             self.round2_result)
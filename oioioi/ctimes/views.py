@@ -3,19 +3,29 @@ import time
 
 from django.utils import timezone
 
-from oioioi.contests.models import Round
-from oioioi.base.utils import jsonify, allow_cross_origin
+from oioioi.base.utils import jsonify, allow_cross_origin, content_etag
+from oioioi.contests.utils import rounds_times, has_round_time_extensions, \
+        contest_timing_cached_per_second
 
 
 @allow_cross_origin
+@content_etag
 @jsonify
 def ctimes_view(request):
-    now = request.timestamp
-    contest = request.contest
-    if contest is None:
+    if request.contest is None:
         return {
             'status': 'NO_CONTEST'
         }
+    if has_round_time_extensions(request):
+        return _ctimes(request)
+    # The same for all users, so computed once per second.
+    return contest_timing_cached_per_second(request, 'ctimes',
+            lambda: _ctimes(request))
+
+
+def _ctimes(request):
+    now = request.timestamp
+    contest = request.contest
 
     def end_le(a, b):
         """Compare round ends. None means "round does not end",
@@ -24,7 +34,8 @@ def ctimes_view(request):
 
     ccontroller = contest.controller
     rtimes = [ccontroller.get_round_times(request, round)
-              for round in Round.objects.filter(contest=request.contest)]
+              for round in sorted(rounds_times(request),
+                                  key=lambda r: (r.start_date, r.id))]
     rtimes = [rtime for rtime in rtimes
               if end_le(now - timedelta(minutes=30), rtime.get_end())]
 
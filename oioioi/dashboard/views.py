@@ -10,11 +10,10 @@ from django.shortcuts import redirect
 
 from oioioi.base.menu import menu_registry
 from oioioi.base.permissions import enforce_condition
-from oioioi.contests.models import Submission
-from oioioi.contests.controllers import submission_template_context
+from oioioi.contests.controllers import submissions_template_context
 from oioioi.contests.utils import can_enter_contest, contest_exists, \
         has_any_submittable_problem, has_any_visible_problem_instance, \
-        is_contest_admin
+        is_contest_admin, my_visible_submissions
 from oioioi.dashboard.menu import top_links_registry
 from oioioi.dashboard.registry import dashboard_registry, \
         dashboard_headers_registry
@@ -104,17 +103,12 @@ def top_links_fragment(request):
 def submissions_fragment(request):
     if not request.user.is_authenticated():
         return None
-    submissions = Submission.objects \
-            .filter(problem_instance__contest=request.contest) \
-            .order_by('-date').select_related()
-    cc = request.contest.controller
-    submissions = cc.filter_my_visible_submissions(request, submissions)
+    submissions = my_visible_submissions(request)
     submissions = \
             submissions[:getattr(settings, 'NUM_DASHBOARD_SUBMISSIONS', 8)]
     if not submissions:
         return None
-    submissions = [submission_template_context(request, s)
-                   for s in submissions]
+    submissions = submissions_template_context(request, submissions)
     show_scores = any(s['can_see_score'] for s in submissions)
     context = {
         'submissions': submissions,
@@ -126,8 +120,8 @@ def submissions_fragment(request):
 
 @dashboard_registry.register_decorator(order=200)
 def messages_fragment(request):
-    messages = messages_template_context(request, visible_messages(request))
-    messages = messages[:getattr(settings, 'NUM_DASHBOARD_MESSAGES', 8)]
+    messages = messages_template_context(request, visible_messages(request),
+            limit=getattr(settings, 'NUM_DASHBOARD_MESSAGES', 8))
     if not messages:
         return None
     context = {
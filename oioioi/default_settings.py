@@ -5,6 +5,7 @@ if sys.version_info < (2, 6):
 
 import os
 import tempfile
+from datetime import timedelta
 
 os.environ.setdefault('CELERY_LOADER', 'oioioi.celery.loaders.OioioiLoader')
 import djcelery
@@ -13,7 +14,7 @@ djcelery.setup_loader()
 import oioioi
 from oioioi.contests.current_contest import ContestMode
 
-INSTALLATION_CONFIG_VERSION = 4
+INSTALLATION_CONFIG_VERSION = 6
 
 DEBUG = False
 TEMPLATE_DEBUG = DEBUG
@@ -95,6 +96,21 @@ PROBLEMSET_LINK_VISIBLE = True
 
 PROBLEM_TAGS_VISIBLE = False
 
+# Path of the full-text index of the problemset (an SQLite database). It is
+# updated by every web server and Celery worker which saves problems, so all
+# of them must use the same file -- with several nodes it has to be on
+# a shared filesystem with working file locking. It can be rebuilt with the
+# rebuild_problemset_index command. None disables full-text search, so
+# problems are searched by names and tags in the database.
+PROBLEMSET_SEARCH_INDEX = None
+# Searches taking longer than this number of seconds are aborted.
+PROBLEMSET_SEARCH_TIMEOUT = 0.5
+PROBLEMSET_SEARCH_MAX_RESULTS = 500
+# Number of characters of each statement which are indexed.
+PROBLEMSET_SEARCH_STATEMENT_LENGTH = 50000
+# Used to extract text from PDF statements, if installed.
+PROBLEMSET_SEARCH_PDFTOTEXT = 'pdftotext'
+
 TEMPLATE_CONTEXT_PROCESSORS = (
     'django.contrib.auth.context_processors.auth',
     'django.core.context_processors.debug',
@@ -266,10 +282,31 @@ RUN_LOCAL_WORKERS = False
 # execution (in a sandboxed environment, if USE_UNSAFE_EXEC is set to False).
 USE_SINOLPACK_MAKEFILES = True
 
+# Number of test files uploaded to Filetracker in parallel when unpacking
+# a sinolpack package.
+SINOLPACK_UPLOAD_THREADS = 4
+
 FILETRACKER_SERVER_ENABLED = False
 FILETRACKER_LISTEN_ADDR = '127.0.0.1'
 FILETRACKER_LISTEN_PORT = 9999
 
+# Used by oioioi.filetracker.client.remote_cache_factory on machines which
+# access a remote Filetracker server.
+FILETRACKER_URL = None
+FILETRACKER_CACHE_ROOT = None
+
+# Budget of the local Filetracker cache, enforced by the evictcache
+# management command. Least recently used files are evicted once the cache
+# is larger than FILETRACKER_CACHE_SIZE_LIMIT bytes and files are evicted
+# when unused for longer than FILETRACKER_CACHE_MAX_AGE. None disables
+# the respective limit. Tests of contests with rounds in progress or starting
+# within FILETRACKER_CACHE_PIN_AHEAD are never evicted.
+FILETRACKER_CACHE_CLEANER_ENABLED = False
+FILETRACKER_CACHE_SIZE_LIMIT = None
+FILETRACKER_CACHE_MAX_AGE = timedelta(days=30)
+FILETRACKER_CACHE_PIN_AHEAD = timedelta(days=1)
+FILETRACKER_CACHE_CLEANER_INTERVAL = 600  # seconds
+
 DEFAULT_CONTEST = None
 ONLY_DEFAULT_CONTEST = False
 
@@ -336,15 +373,20 @@ BROKER_URL = 'sqla+sqlite:///' + os.path.join(tempfile.gettempdir(),
 # pylint: disable=undefined-variable
 
 CELERY_IMPORTS += [
+    'oioioi.contests.utils',
     'oioioi.evalmgr',
     'oioioi.problems.unpackmgr',
     'oioioi.prizes.models',
+    'oioioi.oireports.reportsmgr',
 ]
 
 CELERY_ROUTES.update({
+    'oioioi.contests.utils.refresh_contest_submitters_job':
+        dict(queue='cachemgr'),
     'oioioi.evalmgr.evalmgr_job': dict(queue='evalmgr'),
     'oioioi.problems.unpackmgr.unpackmgr_job': dict(queue='unpackmgr'),
     'oioioi.prizes.models.prizesmgr_job': dict(queue='prizesmgr'),
+    'oioioi.oireports.reportsmgr.reportsmgr_job': dict(queue='reportsmgr'),
 })
 
 # Number of concurrently evaluated submissions
@@ -357,6 +399,24 @@ UNPACKMGR_CONCURRENCY = 1
 ENABLE_SPLITEVAL = False
 SPLITEVAL_EVALMGR = False
 
+# Celery queue in which model solutions are evaluated, e.g. 'evalmgr-models',
+# so that uploading problem packages does not delay contestants'
+# submissions. The queue must be consumed by a worker (the evalmgr-models
+# program in supervisord.conf). By default model solutions are evaluated
+# together with other submissions.
+MODEL_SOLUTIONS_EVALMGR_QUEUE = None
+MODEL_SOLUTIONS_EVALMGR_CONCURRENCY = 1
+# Queue of sioworkers jobs of model solutions, e.g. 'sioworkers-lowprio'.
+MODEL_SOLUTIONS_SIOWORKERS_QUEUE = None
+
+# Time limits suggested from the slowest correct model solution are
+# FACTOR * time + MARGIN ms. Current limits below TIGHT or above LOOSE times
+# the slowest time are flagged.
+MODEL_SOLUTIONS_TIME_LIMIT_FACTOR = 3
+MODEL_SOLUTIONS_TIME_LIMIT_MARGIN = 100
+MODEL_SOLUTIONS_TIGHT_LIMIT_FACTOR = 1.5
+MODEL_SOLUTIONS_LOOSE_LIMIT_FACTOR = 10
+
 SIOWORKERSD_URL = 'http://localhost:7889/'
 
 # ID of JotForm account for "Send Feedback" link.
@@ -380,6 +440,14 @@ MAIL_ADMINS_ON_GRADING_ERROR = True
 # a reply in a thread in which a new message was posted in the meantime.
 MEANTIME_ALERT_MESSAGE_SHORTCUT_LENGTH = 50
 
+# The page checking for such messages may wait up to this number of seconds
+# for a new reply (looking only at the cache) before it asks again. Without
+# gevent, waiting would occupy a whole web server worker, so it is done only
+# with UWSGI_USE_GEVENT, yielding to other requests with gevent.sleep.
+# 0 disables waiting, so the page simply polls.
+QUESTIONS_LONG_POLL_TIMEOUT = 0  # seconds
+QUESTIONS_LONG_POLL_INTERVAL = 1  # seconds
+
 # Zeus configuration
 ZEUS_INSTANCES = {
 }
@@ -404,6 +472,55 @@ CACHES = {
 
 RANKING_CACHE_TIMEOUT = 30  # seconds
 
+# Rounds, problem instances and the results of visibility checks of contests
+# are cached until they change or the next round boundary, but at most this
+# number of seconds.
+CONTEST_TIMING_CACHE_TIMEOUT = 3600
+
+# Ids of contests visible to a user are cached until contests or the user's
+# participations and permissions change, but at most this number of seconds.
+VISIBLE_CONTESTS_CACHE_TIMEOUT = 3600
+
+# Contest permissions of users are cached until they change, but at most this
+# number of seconds.
+CONTEST_PERMISSIONS_CACHE_TIMEOUT = 3600
+
+# Ids of contests with active exclusiveness configs (see oioioi.contestexcl)
+# are cached until the configs change or the next one starts or ends, but at
+# most this number of seconds.
+CONTEST_EXCLUSIVENESS_CACHE_TIMEOUT = 3600
+
+# Counts of rows of paginated lists (e.g. the submissions admin) are cached
+# for this number of seconds.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Users shown in the filter of the submissions admin are recomputed in
+# the background (in the "cachemgr" Celery queue) when older than this
+# number of seconds. If they are still not refreshed after MAX_AGE seconds
+# (e.g. the cachemgr program is not running), they are recomputed while
+# handling the request.
+CONTEST_SUBMITTERS_REFRESH_INTERVAL = 60
+CONTEST_SUBMITTERS_MAX_AGE = 600
+
+# IP and DNS autoauth mappings (see oioioi.ipdnsauth) are cached until they
+# change, but at most IPDNSAUTH_CACHE_TIMEOUT seconds. Reverse DNS lookups
+# of client addresses are cached for IPDNSAUTH_DNS_CACHE_TIMEOUT seconds.
+IPDNSAUTH_CACHE_TIMEOUT = 3600
+IPDNSAUTH_DNS_CACHE_TIMEOUT = 300
+
+# When the status (see oioioi.status) is requested more than
+# STATUS_TARGET_REQUESTS_RATE times per second, clients are told to poll it
+# proportionally less frequently, but at least every STATUS_MAX_SYNC_TIME
+# milliseconds.
+STATUS_TARGET_REQUESTS_RATE = 50
+STATUS_MAX_SYNC_TIME = 900000
+
+# OI reports (see oioioi.oireports) are generated for batches of
+# OIREPORTS_BATCH_SIZE users at a time, reading their source files with
+# OIREPORTS_SOURCE_THREADS concurrent threads.
+OIREPORTS_BATCH_SIZE = 100
+OIREPORTS_SOURCE_THREADS = 8
+
 # Notifications configuration (client)
 # This one is for JavaScript socket.io client.
 # It should contain actual URL available from remote machines.
@@ -421,6 +538,17 @@ NOTIFICATIONS_RABBITMQ_URL = 'amqp://localhost'
 # Port that the Notifications Server listens on
 NOTIFICATIONS_SERVER_PORT = 7887
 
+# Notifications are published to RabbitMQ in the background, in batches of
+# at most NOTIFICATIONS_BATCH_SIZE messages. At most NOTIFICATIONS_BUFFER_SIZE
+# messages wait in each process, newer ones are dropped. When RabbitMQ is
+# unavailable, publishing is retried every NOTIFICATIONS_RETRY_INTERVAL
+# seconds. On exit, processes wait up to NOTIFICATIONS_FLUSH_TIMEOUT seconds
+# for buffered messages to be published.
+NOTIFICATIONS_BUFFER_SIZE = 10000
+NOTIFICATIONS_BATCH_SIZE = 100
+NOTIFICATIONS_RETRY_INTERVAL = 30  # seconds
+NOTIFICATIONS_FLUSH_TIMEOUT = 5  # seconds
+
 # Balloons
 BALLOON_ACCESS_COOKIE_EXPIRES_DAYS = 7
 
@@ -0,0 +1,255 @@
+"""Management of the local cache of remote Filetracker clients.
+
+   A client talking to a remote Filetracker server keeps every fetched file
+   in its ``cache_dir``. :class:`CacheTrackingClient` records cache hits and
+   misses and marks every cached file it serves as recently used, which lets
+   :class:`CacheManager` evict the least recently used files once the cache
+   goes over its size or age budget.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+import filetracker
+from filetracker import split_name
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = 'filetracker_cache_stats:%s'
+STATS_FLUSH_INTERVAL = 60  # seconds
+
+
+class CacheStats(object):
+    """Counts cache events in-process and periodically adds them to the
+       counters kept in the Django cache, so that they are shared by all
+       processes of an installation.
+    """
+    counters = ('hits', 'misses', 'evicted_files', 'evicted_bytes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = dict.fromkeys(self.counters, 0)
+        self.last_flush = time.time()
+
+    def add(self, counter, value=1):
+        with self.lock:
+            self.pending[counter] += value
+            if time.time() - self.last_flush < STATS_FLUSH_INTERVAL:
+                return
+            pending = self.pending
+            self.pending = dict.fromkeys(self.counters, 0)
+            self.last_flush = time.time()
+        self._store(pending)
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = dict.fromkeys(self.counters, 0)
+            self.last_flush = time.time()
+        self._store(pending)
+
+    def _store(self, values):
+        for counter, value in values.iteritems():
+            if not value:
+                continue
+            key = STATS_CACHE_KEY % counter
+            # pylint: disable=broad-except
+            try:
+                if not cache.add(key, value, None):
+                    cache.incr(key, value)
+            except Exception:
+                logger.warning("Failed to store Filetracker cache stats",
+                        exc_info=True)
+
+    def get(self):
+        """Returns a dictionary with the totals of all counters and the
+           hit rate (``None`` if there were no reads).
+        """
+        self.flush()
+        result = dict((counter, cache.get(STATS_CACHE_KEY % counter) or 0)
+                      for counter in self.counters)
+        reads = result['hits'] + result['misses']
+        result['hit_rate'] = float(result['hits']) / reads if reads else None
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.pending = dict.fromkeys(self.counters, 0)
+        cache.delete_many([STATS_CACHE_KEY % counter
+                           for counter in self.counters])
+
+
+stats = CacheStats()
+
+
+def _local_path(local_store, name):
+    return local_store.dir + split_name(name)[0]
+
+
+def touch(local_store, name):
+    """Marks the cached file as recently used.
+
+       The access time is set explicitly, as it is often not maintained by
+       the filesystem (``noatime``). The modification time is preserved, as
+       Filetracker uses it as the file version.
+    """
+    path = _local_path(local_store, name)
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+
+class CacheTrackingClient(filetracker.Client):
+    """A :class:`filetracker.Client` which records cache hits and misses
+       in :data:`stats` and tracks the last access to cached files.
+    """
+
+    def _serves_locally(self, name, force_refresh):
+        if not self.local_store:
+            return False
+        _uname, version = split_name(name)
+        if self.remote_store and (version is None or force_refresh):
+            return False
+        # pylint: disable=broad-except
+        try:
+            return self.local_store.exists(name)
+        except Exception:
+            return False
+
+    def _record(self, name, hit):
+        stats.add('hits' if hit else 'misses')
+        if self.local_store:
+            touch(self.local_store, name)
+
+    def get_file(self, name, save_to, add_to_cache=True,
+                 force_refresh=False, _lock_exclusive=False):
+        if _lock_exclusive:
+            # Retry of a miss from within filetracker.Client.get_file.
+            return super(CacheTrackingClient, self).get_file(name, save_to,
+                    add_to_cache, force_refresh, _lock_exclusive)
+        hit = self._serves_locally(name, force_refresh)
+        vname = super(CacheTrackingClient, self).get_file(name, save_to,
+                add_to_cache, force_refresh)
+        self._record(vname, hit)
+        return vname
+
+    def get_stream(self, name, force_refresh=False):
+        hit = self._serves_locally(name, force_refresh)
+        result = super(CacheTrackingClient, self).get_stream(name,
+                force_refresh)
+        self._record(result[1], hit)
+        return result
+
+
+def pinned_files():
+    """Returns a set of unversioned Filetracker paths of files which should
+       not be evicted: tests and checkers of problems used in contests
+       with active rounds, or rounds starting within
+       ``settings.FILETRACKER_CACHE_PIN_AHEAD``.
+    """
+    from django.db.models import Q
+    from oioioi.contests.models import Round
+    from oioioi.programs.models import Test, OutputChecker
+    from oioioi.filetracker.utils import django_to_filetracker_path
+
+    now = timezone.now()
+    contest_ids = Round.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=now),
+            start_date__lte=now + settings.FILETRACKER_CACHE_PIN_AHEAD) \
+            .values_list('contest_id', flat=True)
+
+    result = set()
+
+    def _add(django_file):
+        if django_file:
+            result.add(split_name(django_to_filetracker_path(django_file))[0])
+
+    tests = Test.objects.filter(problem_instance__contest__in=contest_ids) \
+            .only('input_file', 'output_file')
+    for test in tests.iterator():
+        _add(test.input_file)
+        _add(test.output_file)
+    checkers = OutputChecker.objects.filter(
+            problem__probleminstance__contest__in=contest_ids) \
+            .only('exe_file').distinct()
+    for checker in checkers.iterator():
+        _add(checker.exe_file)
+    return result
+
+
+class CacheManager(object):
+    """Keeps the local store of ``client`` within a size and age budget.
+
+       Files not used for longer than ``max_age`` seconds are evicted, then
+       the least recently used files are evicted until the cache takes at
+       most ``size_limit`` bytes. Files whose paths are in ``pinned`` are
+       never evicted. Any of the limits may be ``None``.
+    """
+
+    def __init__(self, client, size_limit=None, max_age=None, pinned=()):
+        if not client.local_store or not client.remote_store:
+            raise ValueError("The Filetracker client has no remote store, "
+                    "so its local store is not a cache")
+        self.client = client
+        self.size_limit = size_limit
+        self.max_age = max_age
+        self.pinned = pinned
+
+    def _scan(self):
+        local_dir = self.client.local_store.dir
+        entries = []
+        for root, _dirs, files in os.walk(local_dir):
+            for basename in files:
+                path = os.path.join(root, basename)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                name = '/' + os.path.relpath(path, local_dir) \
+                        .replace(os.sep, '/')
+                entries.append((st.st_atime, st.st_size, name))
+        return entries
+
+    def evict(self, pretend=False):
+        """Evicts files over the budget and returns a list of ``(name,
+           size)`` of the evicted files.
+        """
+        entries = self._scan()
+        total_size = sum(size for _atime, size, _name in entries)
+        min_atime = time.time() - self.max_age \
+                if self.max_age is not None else None
+
+        evicted = []
+        # Least recently used first
+        for atime, size, name in sorted(entries):
+            too_old = min_atime is not None and atime < min_atime
+            too_big = self.size_limit is not None \
+                    and total_size > self.size_limit
+            if not too_old and not too_big:
+                break
+            if name in self.pinned:
+                continue
+            if not pretend:
+                lock = self.client.lock_manager.lock_for(name)
+                lock.lock_exclusive()
+                try:
+                    self.client.local_store.delete_file(name)
+                finally:
+                    lock.close()
+            evicted.append((name, size))
+            total_size -= size
+
+        if not pretend and evicted:
+            stats.add('evicted_files', len(evicted))
+            stats.add('evicted_bytes', sum(size for _name, size in evicted))
+            stats.flush()
+        logger.info("Evicted %d files (%d bytes) from Filetracker cache",
+                len(evicted), sum(size for _name, size in evicted))
+        return evicted
@@ -51,3 +51,16 @@ def media_root_factory():
     """A filetracker factory which sets up local client in
        ``settings.MEDIA_ROOT`` folder."""
     return filetracker.Client(cache_dir=settings.MEDIA_ROOT, remote_store=None)
+
+
+def remote_cache_factory():
+    """A filetracker factory which sets up a client of the remote server
+       at ``settings.FILETRACKER_URL``, caching files in
+       ``settings.FILETRACKER_CACHE_ROOT``.
+
+       The cache may be kept within a budget by the ``evictcache``
+       management command.
+    """
+    from oioioi.filetracker.cache import CacheTrackingClient
+    return CacheTrackingClient(cache_dir=settings.FILETRACKER_CACHE_ROOT,
+            remote_url=settings.FILETRACKER_URL)
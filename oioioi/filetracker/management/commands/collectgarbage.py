@@ -1,6 +1,11 @@
 import datetime
-import itertools
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
 import optparse
+from multiprocessing.pool import ThreadPool
 
 from django.core.management.base import BaseCommand
 from django.db.models.loading import cache
@@ -10,6 +15,14 @@ from oioioi.filetracker.client import get_client
 from filetracker import split_name
 
 
+def _unversioned_path(name):
+    return '/' + split_name(name)[0].lstrip('/')
+
+
+def _top_dir(path):
+    return path.lstrip('/').split('/', 1)[0]
+
+
 class Command(BaseCommand):
     help = _("Delete all orphaned files older than specified number of days.")
     base_options = (
@@ -22,59 +35,219 @@ class Command(BaseCommand):
                              dest='pretend', default=False,
                              help=_("If set, the orphaned files will only be "
                                     "displayed, not deleted.")),
+        optparse.make_option('-c', '--chunk-size', action='store', type='int',
+                             dest='chunk_size', default=5000,
+                             help=_("Number of database rows fetched and "
+                                    "files deleted at once. Default value "
+                                    "is 5000."),
+                             metavar=_("SIZE")),
+        optparse.make_option('-j', '--jobs', action='store', type='int',
+                             dest='jobs', default=4,
+                             help=_("Number of files deleted in parallel. "
+                                    "Default value is 4."),
+                             metavar=_("JOBS")),
+        optparse.make_option('-r', '--rate', action='store', type='float',
+                             dest='rate', default=0,
+                             help=_("Delete at most RATE files per second. "
+                                    "Unlimited by default."),
+                             metavar=_("RATE")),
+        optparse.make_option('--checkpoint', action='store', type='string',
+                             dest='checkpoint', default=None,
+                             help=_("A file to store the progress of "
+                                    "deletion in. If it exists, an "
+                                    "interrupted run is resumed."),
+                             metavar=_("FILE")),
     )
     option_list = BaseCommand.option_list + base_options
 
-    def _get_needed_files(self):
-        result = []
+    def _create_index(self, path):
+        db = sqlite3.connect(path)
+        db.text_factory = str
+        db.execute('CREATE TABLE needed (path TEXT PRIMARY KEY)')
+        db.execute('CREATE TABLE local (name TEXT PRIMARY KEY, path TEXT, '
+                   'mtime REAL, size INTEGER)')
+        return db
+
+    def _index_needed_files(self, db, chunk_size):
+        """Stores paths of all files referenced by ``FileField``\ s in the
+           on-disk index, fetching the rows in chunks of ``chunk_size``.
+
+           Returns a mapping from top-level directories to the names
+           of models keeping files in them.
+        """
+        dir_models = {}
         for app in cache.get_apps():
-            model_list = cache.get_models(app)
-            for model in model_list:
+            for model in cache.get_models(app):
                 file_fields = [field.name for field in model._meta.fields
                                if field.get_internal_type() == 'FileField']
+                if not file_fields:
+                    continue
+
+                label = '%s.%s' % (model._meta.app_label,
+                                   model._meta.object_name)
+                queryset = model._default_manager.order_by('pk') \
+                        .values_list('pk', *file_fields)
+                last_pk = None
+                while True:
+                    chunk = queryset
+                    if last_pk is not None:
+                        chunk = chunk.filter(pk__gt=last_pk)
+                    rows = list(chunk[:chunk_size])
+                    if not rows:
+                        break
+                    last_pk = rows[-1][0]
+                    paths = [_unversioned_path(name) for row in rows
+                             for name in row[1:] if name]
+                    db.executemany('INSERT OR IGNORE INTO needed VALUES (?)',
+                                   ((path,) for path in paths))
+                    for path in paths:
+                        dir_models.setdefault(_top_dir(path), set()) \
+                                .add(label)
+                db.commit()
+        return dir_models
+
+    def _index_local_files(self, db, chunk_size):
+        rows = []
+        for entry in get_client().list_local_files():
+            name, mtime, size = entry.name, entry.mtime, entry.size
+            rows.append((name, _unversioned_path(name), mtime, size))
+            if len(rows) >= chunk_size:
+                db.executemany('INSERT OR IGNORE INTO local '
+                               'VALUES (?, ?, ?, ?)', rows)
+                rows = []
+        db.executemany('INSERT OR IGNORE INTO local VALUES (?, ?, ?, ?)',
+                       rows)
+        db.commit()
+
+    def _orphans(self, db, max_mtime, after=None):
+        """Iterates over ``(name, size)`` of orphaned files sorted by name,
+           optionally only those after ``after``.
+        """
+        query = 'SELECT local.name, local.size FROM local ' \
+                'LEFT JOIN needed ON needed.path = local.path ' \
+                'WHERE needed.path IS NULL AND local.mtime < ?'
+        params = [max_mtime]
+        if after is not None:
+            query += ' AND local.name > ?'
+            params.append(after)
+        query += ' ORDER BY local.name'
+        return db.execute(query, params)
+
+    def _report(self, db, max_mtime, dir_models, verbosity):
+        # Top-level directory -> [number of files, bytes]
+        dir_stats = {}
+        files_count = 0
+        total_size = 0
+        for name, size in self._orphans(db, max_mtime):
+            stats = dir_stats.setdefault(_top_dir(name), [0, 0])
+            stats[0] += 1
+            stats[1] += size or 0
+            files_count += 1
+            total_size += size or 0
+            if verbosity > 1:
+                print " ", name
 
-                if len(file_fields) > 0:
-                    files = model.objects.all().values_list(*file_fields)
-                    result.extend([split_name(file)[0] for file in itertools.
-                                  chain.from_iterable(files)])
-        return result
+        if verbosity == 0:
+            return
+        if files_count == 0:
+            print _("No files to delete.")
+            return
+
+        print ungettext("%(count)d file (%(size)d bytes) scheduled for "
+                        "deletion.",
+                        "%(count)d files (%(size)d bytes) scheduled for "
+                        "deletion.",
+                        files_count) % {'count': files_count,
+                                        'size': total_size}
+
+        # A directory may keep files of several models, so an orphaned file
+        # is counted for each of them.
+        model_stats = {}
+        print _("Files and bytes per directory (with models keeping files "
+                "in it):")
+        for top_dir, (count, size) in sorted(dir_stats.iteritems(),
+                key=lambda item: -item[1][1]):
+            models = sorted(dir_models.get(top_dir, ())) or [_("unknown")]
+            print "  %s/ (%s): %d, %d" % (top_dir, ', '.join(models), count,
+                                          size)
+            for model in models:
+                stats = model_stats.setdefault(model, [0, 0])
+                stats[0] += count
+                stats[1] += size
+
+        print _("Files and bytes reclaimable per model:")
+        for model, (count, size) in sorted(model_stats.iteritems(),
+                key=lambda item: -item[1][1]):
+            print "  %s: %d, %d" % (model, count, size)
+
+    def _read_checkpoint(self, checkpoint):
+        if checkpoint and os.path.isfile(checkpoint):
+            with open(checkpoint, 'r') as f:
+                return f.read().strip() or None
+        return None
+
+    def _write_checkpoint(self, checkpoint, name):
+        tmp_name = checkpoint + '.tmp'
+        with open(tmp_name, 'w') as f:
+            f.write(name)
+        os.rename(tmp_name, checkpoint)
+
+    def _delete(self, db, max_mtime, options):
+        verbosity = int(options['verbosity'])
+        checkpoint = options['checkpoint']
+        chunk_size = max(options['chunk_size'], 1)
+        rate = options['rate']
+        after = self._read_checkpoint(checkpoint)
+        if after is not None and verbosity > 0:
+            print _("Resuming after %s") % after
+
+        client = get_client()
+        pool = ThreadPool(max(options['jobs'], 1))
+        orphans = self._orphans(db, max_mtime, after)
+        files_count = 0
+        try:
+            while True:
+                batch = [name for name, _size
+                         in orphans.fetchmany(chunk_size)]
+                if not batch:
+                    break
+                started = time.time()
+                if verbosity > 1:
+                    for name in batch:
+                        print " ", name
+                pool.map(client.delete_file, batch)
+                files_count += len(batch)
+                if checkpoint:
+                    self._write_checkpoint(checkpoint, batch[-1])
+                if rate > 0:
+                    time.sleep(max(0, len(batch) / rate -
+                                   (time.time() - started)))
+        finally:
+            pool.close()
+            pool.join()
+
+        if checkpoint and os.path.isfile(checkpoint):
+            os.unlink(checkpoint)
+        if verbosity > 0:
+            print ungettext("Deleted %d file.", "Deleted %d files.",
+                            files_count) % files_count
 
     def handle(self, *args, **options):
-        needed_files = self._get_needed_files()
-        all_files = get_client().list_local_files()
+        verbosity = int(options['verbosity'])
         max_date_to_delete = datetime.datetime.now() - datetime. \
             timedelta(days=options['days'])
+        max_mtime = time.mktime(max_date_to_delete.timetuple())
 
-        diff = set([f[0] for f in all_files]) - set(needed_files)
-        to_delete = [f[0] for f in all_files if f[0] in diff and datetime.
-                     datetime.fromtimestamp(f[1]) < max_date_to_delete]
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db = self._create_index(os.path.join(tmpdir, 'index.sqlite'))
+            dir_models = self._index_needed_files(db, options['chunk_size'])
+            self._index_local_files(db, options['chunk_size'])
 
-        files_count = len(to_delete)
-        if files_count == 0 and int(options['verbosity']) > 0:
-            print _("No files to delete.")
-        elif options['pretend']:
-            if int(options['verbosity']) > 1:
-                print ungettext("The following %d file is scheduled for "
-                                "deletion:",
-                                "The following %d files are scheduled for "
-                                "deletion:",
-                                files_count) % files_count
-                for file in to_delete:
-                    print " ", file
-            elif int(options['verbosity']) == 1:
-                print ungettext("%d file scheduled for deletion.",
-                                "%d files scheduled for deletion.",
-                                files_count) % files_count
-        else:
-            if int(options['verbosity']) > 1:
-                print ungettext("Deleting the following %d file:",
-                                "Deleting the following %d files:",
-                                files_count) % files_count
-            if int(options['verbosity']) == 1:
-                print ungettext("Deleting %d file",
-                                "Deleting %d files",
-                                files_count) % files_count
-            for file in to_delete:
-                if int(options['verbosity']) > 1:
-                    print " ", file
-                get_client().delete_file('/' + file)
+            if options['pretend']:
+                self._report(db, max_mtime, dir_models, verbosity)
+            else:
+                self._delete(db, max_mtime, options)
+            db.close()
+        finally:
+            shutil.rmtree(tmpdir)
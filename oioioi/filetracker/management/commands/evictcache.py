@@ -0,0 +1,84 @@
+import time
+import optparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext as _, ungettext
+
+from oioioi.filetracker.cache import CacheManager, pinned_files, stats
+from oioioi.filetracker.client import get_client
+
+
+class Command(BaseCommand):
+    help = _("Evict least recently used files from the local Filetracker "
+             "cache, keeping it within FILETRACKER_CACHE_SIZE_LIMIT and "
+             "FILETRACKER_CACHE_MAX_AGE.")
+    option_list = BaseCommand.option_list + (
+        optparse.make_option('-p', '--pretend', action='store_true',
+                             dest='pretend', default=False,
+                             help=_("If set, the files will only be "
+                                    "displayed, not deleted.")),
+        optparse.make_option('-l', '--loop', action='store_true',
+                             dest='loop', default=False,
+                             help=_("Run periodically, every "
+                                    "FILETRACKER_CACHE_CLEANER_INTERVAL "
+                                    "seconds.")),
+        optparse.make_option('-s', '--stats', action='store_true',
+                             dest='stats', default=False,
+                             help=_("Only print cache hit rate and eviction "
+                                    "statistics.")),
+    )
+
+    def _print_stats(self):
+        values = stats.get()
+        if values['hit_rate'] is None:
+            hit_rate = '-'
+        else:
+            hit_rate = '%.1f%%' % (100 * values['hit_rate'])
+        print _("Hits: %(hits)d, misses: %(misses)d, hit rate: %(rate)s") % \
+                dict(hits=values['hits'], misses=values['misses'],
+                     rate=hit_rate)
+        print _("Evicted files: %(files)d, evicted bytes: %(bytes)d") % \
+                dict(files=values['evicted_files'],
+                     bytes=values['evicted_bytes'])
+
+    def _evict(self, options):
+        max_age = settings.FILETRACKER_CACHE_MAX_AGE
+        if max_age is not None:
+            max_age = max_age.total_seconds()
+        try:
+            manager = CacheManager(get_client(),
+                    size_limit=settings.FILETRACKER_CACHE_SIZE_LIMIT,
+                    max_age=max_age, pinned=pinned_files())
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        evicted = manager.evict(pretend=options['pretend'])
+        verbosity = int(options['verbosity'])
+        if verbosity > 1:
+            for name, size in evicted:
+                print " ", name, size
+        if verbosity > 0:
+            files_count = len(evicted)
+            if options['pretend']:
+                msg = ungettext("%(count)d file (%(bytes)d bytes) would be "
+                                "evicted.",
+                                "%(count)d files (%(bytes)d bytes) would be "
+                                "evicted.", files_count)
+            else:
+                msg = ungettext("Evicted %(count)d file (%(bytes)d bytes).",
+                                "Evicted %(count)d files (%(bytes)d bytes).",
+                                files_count)
+            print msg % dict(count=files_count,
+                             bytes=sum(size for _name, size in evicted))
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        while True:
+            self._evict(options)
+            if not options['loop']:
+                break
+            time.sleep(settings.FILETRACKER_CACHE_CLEANER_INTERVAL)
@@ -6,16 +6,26 @@ from django.core.urlresolvers import reverse
 from django.core.files.base import ContentFile
 from django.db.models.fields.files import FieldFile, FileField
 from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test.utils import override_settings
+from oioioi.filetracker.cache import CacheManager, CacheTrackingClient, \
+        stats
 from oioioi.filetracker.models import TestFileModel
 from oioioi.filetracker.storage import FiletrackerStorage
 from oioioi.filetracker.utils import django_to_filetracker_path, \
-        filetracker_to_django_file, make_content_disposition_header
+        filetracker_to_django_file, make_content_disposition_header, \
+        save_content_addressed
 import filetracker
 import filetracker.dummy
+from filetracker import split_name, versioned_name
 
+import os
+import sys
 import tempfile
 import shutil
 import datetime
+import time
+from StringIO import StringIO
 
 
 class TestFileField(TestCase):
@@ -119,6 +129,25 @@ class TestFileStorage(unittest.TestCase):
         finally:
             shutil.rmtree(dir)
 
+    def test_save_content_addressed(self):
+        dir = tempfile.mkdtemp()
+        try:
+            client = filetracker.Client(cache_dir=dir, remote_store=None)
+            storage = FiletrackerStorage(client=client)
+            first = save_content_addressed(ContentFile('data', name='a.in'),
+                    storage=storage)
+            second = save_content_addressed(ContentFile('data', name='b.out'),
+                    storage=storage)
+            other = save_content_addressed(ContentFile('other'),
+                    storage=storage)
+            self.assertEqual(first.name.versioned_name,
+                    second.name.versioned_name)
+            self.assertNotEqual(first.name, other.name)
+            self.assertEqual(len(client.list_local_files()), 2)
+            self.assertEqual(storage.open(first.name, 'rb').read(), 'data')
+        finally:
+            shutil.rmtree(dir)
+
 
 class TestStreamingMixin(object):
     def assertStreamingEqual(self, response, content):
@@ -174,3 +203,120 @@ class TestFileUtils(unittest.TestCase):
         self.assertEqual(value.lower(),
                 'attachment; filename="rates.txt"; '
                 'filename*=utf-8\'\'%e2%82%ac%20rates.txt')
+
+
+def _local_client_factory():
+    return filetracker.Client(cache_dir=TestCollectGarbage.cache_dir,
+            remote_store=None)
+
+
+class TestCollectGarbage(TestCase):
+    cache_dir = None
+
+    def setUp(self):
+        TestCollectGarbage.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _put(self, client, name, content):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(content)
+            f.flush()
+            client.put_file(name, f.name)
+
+    @override_settings(FILETRACKER_CLIENT_FACTORY=
+            'oioioi.filetracker.tests._local_client_factory')
+    def test_collectgarbage(self):
+        from oioioi.filetracker.client import get_client
+        client = get_client()
+        self._put(client, '/tests/needed.txt', 'needed')
+        self._put(client, '/tests/orphan1.txt', 'orphan')
+        self._put(client, '/other/orphan2.txt', 'orphan')
+        model = TestFileModel(file_field='tests/needed.txt')
+        model.save()
+
+        def local_files():
+            return sorted(split_name(f[0])[0]
+                          for f in client.list_local_files())
+
+        call_command('collectgarbage', days=-1, pretend=True, verbosity=0)
+        self.assertEqual(len(local_files()), 3)
+
+        stdout = sys.stdout
+        sys.stdout = output = StringIO()
+        try:
+            call_command('collectgarbage', days=-1, pretend=True)
+        finally:
+            sys.stdout = stdout
+        report = output.getvalue()
+        self.assertIn('2 files (12 bytes)', report)
+        self.assertIn('tests/ (filetracker.TestFileModel): 1, 6', report)
+        self.assertIn('other/ (unknown): 1, 6', report)
+        self.assertIn('filetracker.TestFileModel: 1, 6', report)
+
+        checkpoint = os.path.join(self.cache_dir, 'checkpoint')
+        call_command('collectgarbage', days=-1, chunk_size=1, jobs=2,
+                checkpoint=checkpoint, verbosity=0)
+        self.assertEqual(local_files(), ['/tests/needed.txt'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class TestCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = CacheTrackingClient(cache_dir=self.cache_dir,
+                remote_store=filetracker.dummy.DummyDataStore())
+        stats.reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _put(self, name, content, atime):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(content)
+            f.flush()
+            self.client.put_file(name, f.name)
+        path = self.client.local_store.dir + name
+        os.utime(path, (atime, os.stat(path).st_mtime))
+
+    def _cached(self):
+        return sorted(split_name(f[0])[0]
+                      for f in self.client.list_local_files())
+
+    def test_lru_eviction(self):
+        now = time.time()
+        for i, name in enumerate(['/a', '/b', '/c', '/d']):
+            self._put(name, '0123456789', now + i)
+
+        manager = CacheManager(self.client, size_limit=25, pinned={'/a'})
+        self.assertEqual(manager.evict(pretend=True),
+                [('/b', 10), ('/c', 10)])
+        self.assertEqual(len(self._cached()), 4)
+        manager.evict()
+        self.assertEqual(self._cached(), ['/a', '/d'])
+        self.assertEqual(stats.get()['evicted_bytes'], 20)
+
+    def test_age_eviction(self):
+        now = time.time()
+        self._put('/old', 'old', now - 3600)
+        self._put('/new', 'new', now)
+        CacheManager(self.client, max_age=60).evict()
+        self.assertEqual(self._cached(), ['/new'])
+
+    def test_access_tracking(self):
+        self._put('/file', 'content', time.time() - 3600)
+        vname = versioned_name('/file',
+                self.client.local_store.file_version('/file'))
+        self.assertEqual(self.client.get_stream(vname)[0].read(), 'content')
+        CacheManager(self.client, max_age=60).evict()
+        self.assertEqual(self._cached(), ['/file'])
+        values = stats.get()
+        self.assertEqual(values['hits'], 1)
+        self.assertEqual(values['misses'], 0)
+
+    def test_local_only_client(self):
+        client = filetracker.Client(cache_dir=self.cache_dir,
+                remote_store=None)
+        with self.assertRaises(ValueError):
+            CacheManager(client)
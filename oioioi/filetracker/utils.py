@@ -1,3 +1,4 @@
+import hashlib
 import mimetypes
 import urllib
 
@@ -5,7 +6,9 @@ from django.core.servers.basehttp import FileWrapper
 from django.core.files.storage import default_storage
 from django.core.files import File
 from django.http import StreamingHttpResponse
+from filetracker import FiletrackerError
 
+from oioioi.base.utils.streaming_zip import stream_zip
 from oioioi.filetracker.filename import FiletrackerFilename
 
 
@@ -64,6 +67,41 @@ def filetracker_to_django_file(filetracker_path, storage=None):
             FiletrackerFilename(filetracker_path[prefix_len + 1:]))
 
 
+def save_content_addressed(django_file, prefix='blobs', storage=None):
+    """Saves ``django_file`` in Filetracker under a path derived only from
+       the SHA-256 of its content, so that identical files share a single
+       Filetracker file, whatever their names.
+
+       If an identical file has already been stored, it is not uploaded
+       again. Returns a :class:`~django.core.files.File` which should be
+       assigned to a :class:`~django.db.models.FileField`. As its name
+       is meaningless, views serving it should give the file a name.
+
+       The shared files are never deleted together with the referring
+       objects -- they are removed by the ``collectgarbage`` management
+       command only once no ``FileField`` refers to them.
+    """
+    if storage is None:
+        storage = default_storage
+
+    digest = hashlib.sha256()
+    for chunk in django_file.chunks():
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    path = '%s/%s/%s' % (prefix, digest[:2], digest)
+
+    try:
+        version = storage.client.file_version(
+                storage._make_filetracker_path(path))
+        path = '%s@%d' % (path, version)
+    # A missing file is reported by the local store with an OSError.
+    except (FiletrackerError, EnvironmentError):
+        django_file.seek(0)
+        path = storage.save(path, django_file).versioned_name
+    return filetracker_to_django_file(storage._make_filetracker_path(path),
+            storage)
+
+
 def make_content_disposition_header(disposition, filename):
     """Returns a Content-Disposition header field per RFC 6266.
 
@@ -117,3 +155,18 @@ def stream_file(django_file, name=None, showable=None):
     response['Content-Disposition'] = \
         make_content_disposition_header(disposition, name)
     return response
+
+
+def stream_zip_file(files, name):
+    """Returns a :class:`StreamingHttpResponse` with a zip archive of
+       ``files`` built on the fly.
+
+       ``files`` is an iterable of ``(arcname, django_file)`` pairs. The files
+       are read from Filetracker one by one while the response is being
+       sent, so neither the members nor the archive touch the local disk.
+    """
+    response = StreamingHttpResponse(stream_zip(files),
+        content_type='application/zip')
+    response['Content-Disposition'] = \
+        make_content_disposition_header('attachment', name)
+    return response
@@ -6,7 +6,8 @@ from django.utils.translation import ugettext_lazy as _, ungettext_lazy
 
 from oioioi.base import admin
 from oioioi.base.utils import make_html_link
-from oioioi.forum.models import Category, Forum, Thread, Post
+from oioioi.forum.models import Category, Forum, Thread, Post, \
+        update_counters
 from oioioi.contests.admin import contest_site
 from oioioi.contests.utils import is_contest_admin
 
@@ -31,9 +32,7 @@ class ForumAdmin(admin.ModelAdmin):
     readonly_fields = ('categories', 'add_category', 'posts_admin')
 
     def categories(self, obj):
-        slist = [make_list_elem(c) for c in obj.category_set
-                    .prefetch_related('thread_set', 'thread_set__post_set')
-                    .all()]
+        slist = [make_list_elem(c) for c in obj.category_set.all()]
         ret = "".join(slist)
         if not ret:
             ret = '<li>' + _("Empty forum") + '</li>'
@@ -81,8 +80,7 @@ class CategoryAdmin(admin.ModelAdmin):
     readonly_fields = ('threads',)
 
     def threads(self, obj):
-        slist = [make_list_elem(t) for t in obj.thread_set
-                    .prefetch_related('post_set').all()]
+        slist = [make_list_elem(t) for t in obj.thread_set.all()]
         ret = "".join(slist)
         if not ret:
             ret = '<li>' + _("Empty category") + '</li>'
@@ -238,6 +236,11 @@ class PostAdmin(admin.ModelAdmin):
         return super(PostAdmin, self) \
             .formfield_for_foreignkey(db_field, request, **kwargs)
 
+    def _update_counters(self, threads):
+        # Bulk updates bypass the signals maintaining the counters.
+        update_counters(category_ids=set(c for _t, c in threads),
+                        thread_ids=set(t for t, _c in threads))
+
     def hide_action(self, request, queryset):
         queryset.update(hidden=True)
 
@@ -251,9 +254,12 @@ class PostAdmin(admin.ModelAdmin):
     hide_action.short_description = _("Hide selected posts")
 
     def unreport_action(self, request, queryset):
-        queryset.update(reported=False)
+        # The queryset may be filtered by the reported status, so it has to
+        # be evaluated before the update.
+        threads = set(queryset.values_list('thread', 'thread__category'))
+        counter = queryset.update(reported=False)
+        self._update_counters(threads)
 
-        counter = queryset.count()
         self.message_user(
             request,
             ungettext_lazy("\"Reported\" status removed from one post.",
@@ -0,0 +1,53 @@
+import optparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext as _, ungettext
+
+from oioioi.contests.models import Contest
+from oioioi.forum.models import Category, Thread, update_counters
+
+
+class Command(BaseCommand):
+    help = _("Recompute the numbers of threads, posts and reported posts and "
+             "the last posts stored in forum categories and threads.")
+    option_list = BaseCommand.option_list + (
+        optparse.make_option('-c', '--contest', action='store',
+                             dest='contest_id', default=None,
+                             help=_("Only reconcile the forum of the contest "
+                                    "with this id.")),
+    )
+
+    def _snapshot(self, categories, threads):
+        return set(categories.values_list('id', 'thread_count', 'post_count',
+                                          'reported_count', 'last_post')), \
+                set(threads.values_list('id', 'post_count', 'reported_count',
+                                        'last_post'))
+
+    def handle(self, *args, **options):
+        categories = Category.objects.all()
+        threads = Thread.objects.all()
+        if options['contest_id']:
+            if not Contest.objects.filter(id=options['contest_id']).exists():
+                raise CommandError(_("Contest %s does not exist")
+                                   % options['contest_id'])
+            categories = categories.filter(
+                    forum__contest=options['contest_id'])
+            threads = threads.filter(
+                    category__forum__contest=options['contest_id'])
+
+        categories_before, threads_before = \
+                self._snapshot(categories, threads)
+        update_counters(category_ids=[c for c, _t, _p, _r, _l
+                                      in categories_before],
+                        thread_ids=[t for t, _p, _r, _l in threads_before])
+        categories_after, threads_after = self._snapshot(categories, threads)
+
+        if int(options['verbosity']) > 0:
+            fixed = len(categories_after - categories_before)
+            print ungettext("Fixed %(count)d category.",
+                            "Fixed %(count)d categories.", fixed) \
+                    % {'count': fixed}
+            fixed = len(threads_after - threads_before)
+            print ungettext("Fixed %(count)d thread.",
+                            "Fixed %(count)d threads.", fixed) \
+                    % {'count': fixed}
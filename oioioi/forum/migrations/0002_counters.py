@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+def compute_counters(apps, schema_editor):
+    """Fills in counters and last posts of existing categories and threads.
+    """
+    Category = apps.get_model('forum', 'Category')
+    Thread = apps.get_model('forum', 'Thread')
+    Post = apps.get_model('forum', 'Post')
+    for thread in Thread.objects.all():
+        posts = Post.objects.filter(thread=thread)
+        thread.post_count = posts.count()
+        thread.reported_count = posts.filter(reported=True).count()
+        thread.save()
+    for category in Category.objects.all():
+        posts = Post.objects.filter(thread__category=category)
+        category.thread_count = Thread.objects \
+                .filter(category=category).count()
+        category.post_count = posts.count()
+        category.reported_count = posts.filter(reported=True).count()
+        category.last_post = posts.order_by('-id').first()
+        category.save()
+
+
+def drop_counters(apps, schema_editor):
+    """Nothing to undo, as the counters are removed with their fields.
+    """
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='last_post',
+            field=models.ForeignKey(related_name='last_post_of_category', on_delete=django.db.models.deletion.SET_NULL, editable=False, to='forum.Post', null=True, verbose_name='last post'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.IntegerField(default=0, verbose_name='posts count', editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='reported_count',
+            field=models.IntegerField(default=0, verbose_name='reported posts count', editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='thread_count',
+            field=models.IntegerField(default=0, verbose_name='threads count', editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='post_count',
+            field=models.IntegerField(default=0, verbose_name='posts count', editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='reported_count',
+            field=models.IntegerField(default=0, verbose_name='reported posts count', editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(compute_counters, drop_counters),
+    ]
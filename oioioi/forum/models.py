@@ -1,5 +1,6 @@
 import datetime
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
@@ -56,6 +57,17 @@ class Category(models.Model):
 
     forum = models.ForeignKey(Forum, verbose_name=_("forum"))
     name = models.CharField(max_length=255, verbose_name=_("category"))
+    # The counters and the last post are maintained when posts and threads
+    # are saved or deleted, see update_counters().
+    thread_count = models.IntegerField(default=0, editable=False,
+            verbose_name=_("threads count"))
+    post_count = models.IntegerField(default=0, editable=False,
+            verbose_name=_("posts count"))
+    reported_count = models.IntegerField(default=0, editable=False,
+            verbose_name=_("reported posts count"))
+    last_post = models.ForeignKey('Post', null=True, editable=False,
+            on_delete=models.SET_NULL, verbose_name=_("last post"),
+            related_name='last_post_of_category')
 
     class Meta(object):
         verbose_name = _("category")
@@ -65,21 +77,15 @@ class Category(models.Model):
         return '%(name)s' % dict(name=self.name)
 
     def count_threads(self):
-        return self.thread_set.count()
+        return self.thread_count
     count_threads.short_description = _("Threads count")
 
     def count_posts(self):
-        ret = 0
-        for t in self.thread_set.all():
-            ret += t.count_posts()
-        return ret
+        return self.post_count
     count_posts.short_description = _("Posts count")
 
     def count_reported(self):
-        ret = 0
-        for t in self.thread_set.all():
-            ret += t.count_reported()
-        return ret
+        return self.reported_count
     count_reported.short_description = _("Reported posts count")
 
     def get_admin_url(self):
@@ -93,26 +99,34 @@ class Thread(models.Model):
     name = models.CharField(max_length=255, verbose_name=_("thread"))
     last_post = models.ForeignKey('Post', null=True, on_delete=models.SET_NULL,
             verbose_name=_("last post"), related_name='last_post_of')
+    post_count = models.IntegerField(default=0, editable=False,
+            verbose_name=_("posts count"))
+    reported_count = models.IntegerField(default=0, editable=False,
+            verbose_name=_("reported posts count"))
 
     class Meta(object):
         ordering = ('-last_post__id',)
         verbose_name = _("thread")
         verbose_name_plural = _("threads")
 
+    def __init__(self, *args, **kwargs):
+        super(Thread, self).__init__(*args, **kwargs)
+        # The category the posts of the thread are counted in.
+        self._counted_category_id = self.__dict__.get('category_id')
+
     def __unicode__(self):
         return '%(name)s' % dict(name=self.name)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super(Thread, self).save(*args, **kwargs)
+
     def count_posts(self):
-        return self.post_set.count()
+        return self.post_count
     count_posts.short_description = _("Posts count")
 
     def count_reported(self):
-        # Although it may be done by:
-        #   self.post_set.filter(reported=true).count()
-        # such solution produces O(|threads|) queries on a forum/category view.
-        # Moreover, it's not possible to prefetch them (like in count_posts):
-        # http://stackoverflow.com/a/12974801/2874777
-        return len([p for p in self.post_set.all() if p.reported])
+        return self.reported_count
     count_reported.short_description = _("Reported posts count")
 
     def get_admin_url(self):
@@ -132,10 +146,23 @@ class Post(models.Model):
     reported = models.BooleanField(verbose_name=_("reported"), default=False)
     hidden = models.BooleanField(verbose_name=_("hidden"), default=False)
 
+    def __init__(self, *args, **kwargs):
+        super(Post, self).__init__(*args, **kwargs)
+        # The thread the post is counted in and whether it is counted as
+        # reported, None if unknown (the field was deferred).
+        self._counted_thread_id = self.__dict__.get('thread_id')
+        self._counted_reported = self.__dict__.get('reported')
+
     @property
     def edited(self):
         return bool(self.last_edit_date)
 
+    def save(self, *args, **kwargs):
+        # Counters are updated by post_save receivers, which should be
+        # a part of the same transaction.
+        with transaction.atomic():
+            super(Post, self).save(*args, **kwargs)
+
     class Meta(object):
         index_together = (('thread', 'add_date'),)
         ordering = ('add_date', )
@@ -163,23 +190,105 @@ class Post(models.Model):
                     < datetime.timedelta(minutes=15))
 
 
+def update_counters(category_ids=(), thread_ids=()):
+    """Recomputes counters and last posts of the given categories and
+       threads from scratch.
+
+       Used by the ``reconcile_forum_counters`` command and after bulk
+       updates of posts, which bypass the signals maintaining them.
+    """
+    with transaction.atomic():
+        for thread_id in thread_ids:
+            posts = Post.objects.filter(thread=thread_id)
+            Thread.objects.filter(id=thread_id).update(
+                    post_count=posts.count(),
+                    reported_count=posts.filter(reported=True).count(),
+                    last_post=posts.order_by('-id').first())
+        for category_id in category_ids:
+            posts = Post.objects.filter(thread__category=category_id)
+            Category.objects.filter(id=category_id).update(
+                    thread_count=Thread.objects
+                        .filter(category=category_id).count(),
+                    post_count=posts.count(),
+                    reported_count=posts.filter(reported=True).count(),
+                    last_post=posts.order_by('-id').first())
+
+
+def _add_to_counters(thread_id, category_id, posts=0, reported=0):
+    Thread.objects.filter(id=thread_id).update(
+            post_count=F('post_count') + posts,
+            reported_count=F('reported_count') + reported)
+    Category.objects.filter(id=category_id).update(
+            post_count=F('post_count') + posts,
+            reported_count=F('reported_count') + reported)
+
+
+@receiver(post_save, sender=Thread)
+def _count_thread(sender, instance, created, **kwargs):
+    if created:
+        Category.objects.filter(id=instance.category_id) \
+                .update(thread_count=F('thread_count') + 1)
+    elif instance._counted_category_id is None:
+        update_counters(category_ids=[instance.category_id])
+    elif instance.category_id != instance._counted_category_id:
+        update_counters(category_ids=[instance._counted_category_id,
+                                      instance.category_id])
+    instance._counted_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Thread)
+def _uncount_thread(sender, instance, **kwargs):
+    # Posts of the thread have already been deleted (and uncounted) here.
+    Category.objects.filter(id=instance.category_id) \
+            .update(thread_count=F('thread_count') - 1)
+
+
 @receiver(post_save, sender=Post)
 def _set_as_new_last_post(sender, instance, created, **kwargs):
+    thread = instance.thread
     if created:
-        thread = instance.thread
+        _add_to_counters(thread.id, thread.category_id, posts=1,
+                         reported=int(instance.reported))
+        Thread.objects.filter(id=thread.id).update(last_post=instance)
+        Category.objects.filter(id=thread.category_id) \
+                .update(last_post=instance)
         thread.last_post = instance
-        thread.save()
+    elif instance._counted_reported is None or \
+            instance._counted_thread_id != thread.id:
+        # The post was moved to another thread or it is not known how it
+        # was counted.
+        thread_ids = set([thread.id, instance._counted_thread_id])
+        thread_ids.discard(None)
+        update_counters(thread_ids=thread_ids,
+                category_ids=set(Thread.objects.filter(id__in=thread_ids)
+                                 .values_list('category', flat=True)))
+    elif instance.reported != instance._counted_reported:
+        _add_to_counters(thread.id, thread.category_id,
+                         reported=1 if instance.reported else -1)
+    instance._counted_thread_id = thread.id
+    instance._counted_reported = instance.reported
 
 
 @receiver(post_delete, sender=Post)
 def _update_last_post(sender, instance, **kwargs):
     try:
-        thread = instance.thread
+        thread = Thread.objects.get(id=instance.thread_id)
     except Thread.DoesNotExist:
         # This may happen during cascade model deleting
         return
-    try:
-        thread.last_post = thread.post_set.latest('id')
-    except Post.DoesNotExist:
-        thread.last_post = None
-    thread.save()
+    if instance._counted_reported is None or \
+            instance._counted_thread_id != thread.id:
+        update_counters(category_ids=[thread.category_id],
+                        thread_ids=[thread.id])
+    else:
+        _add_to_counters(thread.id, thread.category_id, posts=-1,
+                         reported=-int(instance._counted_reported))
+    if thread.last_post_id is None:
+        # The deleted post was the last one and the pointer has just been
+        # cleared by on_delete.
+        thread.last_post = thread.post_set.order_by('-id').first()
+        thread.save(update_fields=['last_post'])
+    Category.objects.filter(id=thread.category_id, last_post__isnull=True) \
+            .update(last_post=Post.objects
+                    .filter(thread__category=thread.category_id)
+                    .order_by('-id').first())
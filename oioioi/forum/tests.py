@@ -1,4 +1,7 @@
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
@@ -208,3 +211,107 @@ class TestThread(TestCase):
         # user tries to remove post p0 but can't (added earlier than 15min ago)
         response = self.try_to_remove_post(p0)
         self.assertEqual(403, response.status_code)
+
+
+class TestCounters(TestCase):
+    fixtures = ['test_users', 'test_contest']
+
+    def setUp(self):
+        self.cont = get_contest_with_forum()
+        self.cat = Category(forum=self.cont.forum, name='test_category')
+        self.cat.save()
+        self.user = User.objects.get(username='test_user')
+
+    def assertCounters(self, obj, expected):
+        obj = obj.__class__.objects.get(id=obj.id)
+        counters = [obj.post_count, obj.reported_count, obj.last_post_id]
+        if isinstance(obj, Category):
+            counters.insert(0, obj.thread_count)
+        self.assertEqual(counters, expected)
+
+    def test_counters(self):
+        thr1 = Thread(category=self.cat, name='thread1')
+        thr1.save()
+        thr2 = Thread(category=self.cat, name='thread2')
+        thr2.save()
+        p1 = Post(thread=thr1, content='p1', author=self.user)
+        p1.save()
+        p2 = Post(thread=thr1, content='p2', author=self.user, reported=True)
+        p2.save()
+        p3 = Post(thread=thr2, content='p3', author=self.user)
+        p3.save()
+        self.assertCounters(thr1, [2, 1, p2.id])
+        self.assertCounters(self.cat, [2, 3, 1, p3.id])
+
+        p3 = Post.objects.get(id=p3.id)
+        p3.reported = True
+        p3.save()
+        p2.hidden = True
+        p2.reported = False
+        p2.save()
+        self.assertCounters(thr1, [2, 0, p2.id])
+        self.assertCounters(self.cat, [2, 3, 1, p3.id])
+
+        p3.delete()
+        self.assertCounters(thr2, [0, 0, None])
+        self.assertCounters(self.cat, [2, 2, 0, p2.id])
+
+        p2.thread = thr2
+        p2.save()
+        self.assertCounters(thr1, [1, 0, p1.id])
+        self.assertCounters(thr2, [1, 0, p2.id])
+
+        thr1.delete()
+        self.assertCounters(self.cat, [1, 1, 0, p2.id])
+
+    def test_unreport_action(self):
+        thr = Thread(category=self.cat, name='thread')
+        thr.save()
+        p1 = Post(thread=thr, content='p1', author=self.user, reported=True)
+        p1.save()
+        p2 = Post(thread=thr, content='p2', author=self.user, reported=True)
+        p2.save()
+        self.assertCounters(thr, [2, 2, p2.id])
+
+        self.client.login(username='test_admin')
+        self.client.get('/c/c/')  # 'c' becomes the current contest
+        url = reverse('oioioiadmin:forum_post_changelist') + \
+                '?reported__exact=1'
+        response = self.client.post(url, {
+            'action': 'unreport_action',
+            '_selected_action': [p1.id, p2.id],
+        })
+        self.assertEqual(302, response.status_code)
+        self.assertFalse(Post.objects.filter(reported=True).exists())
+        self.assertCounters(thr, [2, 0, p2.id])
+        self.assertCounters(self.cat, [1, 2, 0, p2.id])
+
+    def test_reconcile(self):
+        thr = Thread(category=self.cat, name='thread')
+        thr.save()
+        Post(thread=thr, content='p', author=self.user).save()
+        Post.objects.update(reported=True)
+        Category.objects.update(post_count=10)
+        call_command('reconcile_forum_counters', verbosity=0)
+        self.assertCounters(thr, [1, 1, thr.last_post_id])
+        self.assertCounters(self.cat, [1, 1, 1, thr.last_post_id])
+
+    def test_forum_queries(self):
+        self.client.login(username='test_user')
+        url = reverse('forum', kwargs={'contest_id': self.cont.id})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+
+        for i in xrange(5):
+            category = Category(forum=self.cont.forum, name='cat%d' % i)
+            category.save()
+            for j in xrange(3):
+                thread = Thread(category=category, name='thread%d' % j)
+                thread.save()
+                Post(thread=thread, content='p', author=self.user).save()
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.get(url)
+        self.assertIn('cat4', response.content)
+        self.assertEqual(len(single.captured_queries),
+                         len(full.captured_queries))
@@ -28,9 +28,7 @@ from oioioi.forum.utils import forum_exists_and_visible, is_proper_forum, \
 @enforce_condition(forum_exists_and_visible & is_proper_forum)
 def forum_view(request):
     msgs = get_msgs(request)
-    category_set = request.contest.forum.category_set \
-        .prefetch_related('thread_set', 'thread_set__post_set') \
-        .all()
+    category_set = request.contest.forum.category_set.all()
     return TemplateResponse(request, 'forum/forum.html', {
         'forum': request.contest.forum, 'msgs': msgs,
         'is_locked': forum_is_locked(request), 'category_set': category_set
@@ -43,7 +41,6 @@ def category_view(request, category_id):
     category = get_object_or_404(Category, id=category_id)
     msgs = get_msgs(request)
     threads = category.thread_set \
-        .prefetch_related('post_set') \
         .select_related('last_post', 'last_post__author') \
         .all()
     return TemplateResponse(request, 'forum/category.html',
@@ -1,13 +1,109 @@
 import socket
 import logging
+import uuid
 
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils.ipv6 import clean_ipv6_address
 from django.utils.translation import ugettext_lazy as _
 
 
 logger = logging.getLogger(__name__)
 
+MAPPINGS_VERSION_KEY = 'ipdnsauth_mappings_version'
+MAPPINGS_CACHE_KEY = 'ipdnsauth_mappings:%s'
+HOSTNAME_CACHE_KEY = 'ipdnsauth_hostname:%s'
+
+# The version and the mappings last loaded by this process.
+_local_mappings = (None, None)
+
+
+def invalidate_mappings():
+    cache.delete(MAPPINGS_VERSION_KEY)
+
+
+def _mappings_version():
+    version = cache.get(MAPPINGS_VERSION_KEY)
+    if version is None:
+        cache.add(MAPPINGS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(MAPPINGS_VERSION_KEY)
+    return version
+
+
+def get_mappings():
+    """Returns a pair of dictionaries mapping IP addresses and DNS
+       hostnames to ids of users (see :class:`IpToUser` and
+       :class:`DnsToUser`).
+
+       They are loaded all at once and kept in memory and in the cache
+       until any mapping changes, but at most
+       ``settings.IPDNSAUTH_CACHE_TIMEOUT`` seconds.
+    """
+    from oioioi.ipdnsauth.models import IpToUser, DnsToUser
+    global _local_mappings
+
+    version = _mappings_version()
+    if _local_mappings[0] == version:
+        return _local_mappings[1]
+    key = MAPPINGS_CACHE_KEY % version
+    mappings = cache.get(key)
+    if mappings is None:
+        mappings = (dict(IpToUser.objects.values_list('ip_addr', 'user')),
+                    dict(DnsToUser.objects.values_list('dns_name', 'user')))
+        cache.set(key, mappings, settings.IPDNSAUTH_CACHE_TIMEOUT)
+    _local_mappings = (version, mappings)
+    return mappings
+
+
+def _normalize_ip(ip_addr):
+    # The same as GenericIPAddressField(unpack_ipv4=True) does.
+    if ip_addr and ':' in ip_addr:
+        try:
+            return clean_ipv6_address(ip_addr, unpack_ipv4=True)
+        except ValidationError:
+            return None
+    return ip_addr
+
+
+def resolve_hostname(ip):
+    """Returns the DNS hostname of the IP address or ``None``.
+
+       Results, also negative ones, are cached for
+       ``settings.IPDNSAUTH_DNS_CACHE_TIMEOUT`` seconds.
+    """
+    if not ip:
+        return None
+    key = HOSTNAME_CACHE_KEY % ip
+    name = cache.get(key)
+    if name is None:
+        try:
+            logger.info("DNS Q %s", ip)
+            name = socket.gethostbyaddr(ip)[0]
+            logger.info("DNS + %s -> %s.", ip, name)
+        except socket.herror:
+            logger.info("DNS - %s", ip)
+            name = ''
+        cache.set(key, name, settings.IPDNSAUTH_DNS_CACHE_TIMEOUT)
+    return name or None
+
+
+def mapped_user_id(ip_addr=None, dns_name=None):
+    """Returns the id of the user mapped to the IP address or, if there
+       is none, to the DNS hostname (resolved from the IP address if not
+       given), or ``None``.
+    """
+    ip_mappings, dns_mappings = get_mappings()
+    ip_addr = _normalize_ip(ip_addr)
+    if ip_addr and ip_addr in ip_mappings:
+        return ip_mappings[ip_addr]
+    if not dns_mappings:
+        return None
+    hostname = dns_name or resolve_hostname(ip_addr)
+    return dns_mappings.get(hostname)
+
 
 class IpDnsBackend(ModelBackend):
     """Authenticates users by their ip or dns hostname.
@@ -21,30 +117,13 @@ class IpDnsBackend(ModelBackend):
     supports_authentication = True
 
     def authenticate(self, dns_name=None, ip_addr=None):
-        if ip_addr:
-            try:
-                return User.objects.get(iptouser__ip_addr=ip_addr)
-            except User.DoesNotExist:
-                pass
-
-        hostname = dns_name or self._resolve_hostname(ip_addr)
-        if hostname:
-            try:
-                return User.objects.get(dnstouser__dns_name=hostname)
-            except User.DoesNotExist:
-                pass
-
-        return None
+        user_id = mapped_user_id(ip_addr=ip_addr, dns_name=dns_name)
+        if user_id is None:
+            return None
+        try:
+            return User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return None
 
     def _resolve_hostname(self, ip):
-        if ip:
-            try:
-                logger.info("DNS Q %s", ip)
-                name = socket.gethostbyaddr(ip)[0]
-                logger.info("DNS + %s -> %s.", ip, name)
-                return name
-            except socket.herror:
-                logger.info("DNS - %s", ip)
-                pass
-
-        return None
+        return resolve_hostname(ip)
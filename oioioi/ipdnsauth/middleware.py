@@ -1,6 +1,7 @@
 from oioioi.contests.utils import is_contest_admin
 from oioioi.participants.models import Participant
 from oioioi.su.utils import is_under_su, reset_to_real_user
+from oioioi.ipdnsauth.backends import mapped_user_id
 
 from django.contrib import auth
 from django.core.exceptions import ImproperlyConfigured
@@ -29,6 +30,16 @@ class IpDnsAuthMiddleware(object):
         if not dns_name and not ip_addr:
             return
 
+        user_id = mapped_user_id(ip_addr=ip_addr, dns_name=dns_name)
+        if user_id is None:
+            return
+
+        # Logging in again would needlessly rotate the session.
+        if request.session.get(auth.SESSION_KEY) == user_id and \
+                request.session.get(auth.BACKEND_SESSION_KEY) == \
+                'oioioi.ipdnsauth.backends.IpDnsBackend':
+            return
+
         user = auth.authenticate(ip_addr=ip_addr, dns_name=dns_name)
         if user:
             auth.login(request, user)
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 
+from oioioi.ipdnsauth.backends import invalidate_mappings
+
 
 class IpToUser(models.Model):
     """Represents mapping for automatic authorization based on IP address."""
@@ -29,3 +33,11 @@ class DnsToUser(models.Model):
 
     def __unicode__(self):
         return self.dns_name
+
+
+@receiver(post_save, sender=IpToUser)
+@receiver(post_delete, sender=IpToUser)
+@receiver(post_save, sender=DnsToUser)
+@receiver(post_delete, sender=DnsToUser)
+def _invalidate_mappings(sender, **kwargs):
+    invalidate_mappings()
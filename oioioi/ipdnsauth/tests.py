@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test.utils import override_settings
 from oioioi.test_settings import AUTHENTICATION_BACKENDS, MIDDLEWARE_CLASSES
+from oioioi.ipdnsauth.backends import HOSTNAME_CACHE_KEY
 from oioioi.ipdnsauth.management.commands.ipdnsauth import Command
 from oioioi.ipdnsauth.models import IpToUser, DnsToUser
 import socket
@@ -35,6 +38,33 @@ class TestAutoAuthorization(TestCase):
             dns_name=socket.getfqdn('localhost'))
         response = self.client.get('/')
         self._assertBackend(response, self.test_user2)
+        self.assertEqual(cache.get(HOSTNAME_CACHE_KEY % '127.0.0.1'),
+                         socket.getfqdn('localhost'))
+
+    def test_session_kept(self):
+        self.test_user.iptouser_set.create(ip_addr='127.0.0.1')
+        self.client.get('/')
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        response = self.client.get('/')
+        self._assertBackend(response, self.test_user)
+        self.assertEqual(
+                self.client.cookies[settings.SESSION_COOKIE_NAME].value,
+                session_key)
+
+    def test_mapping_change(self):
+        mapping = self.test_user.iptouser_set.create(ip_addr='127.0.0.1')
+        response = self.client.get('/')
+        self._assertBackend(response, self.test_user)
+
+        mapping.user = self.test_user2
+        mapping.save()
+        response = self.client.get('/')
+        self._assertBackend(response, self.test_user2)
+
+        mapping.delete()
+        self.client.logout()
+        self.client.get('/')
+        self.assertNotIn('_auth_user_id', self.client.session)
 
     def _assertBackend(self, response, user):
         session = self.client.session
@@ -39,9 +39,12 @@ def notification_processor(request):
     def generator():
         notifications_session_id = get_notifications_session(
                 request.session).uid
+        contest = getattr(request, 'contest', None)
         return render_to_string('notifications/notifications.html',
                                 dict(notif_server_url=
                                      settings.NOTIFICATIONS_SERVER_URL,
                                      notifications_session_id=
-                                     notifications_session_id))
+                                     notifications_session_id,
+                                     contest_id=contest.id if contest
+                                                else ''))
     return {'extra_navbar_right_notifications': lazy(generator, unicode)()}
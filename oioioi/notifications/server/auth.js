@@ -5,6 +5,10 @@ var queuemanager = require('./queuemanager');
 var sockets = {};
 // maps users to socket collections
 var users = {};
+// maps contests to collections of sockets receiving their broadcasts
+var contests = {};
+// maps sockets to ids of contests whose broadcasts they receive
+var socketContests = {};
 
 var session_id_cache = {};
 var CONFIG;
@@ -22,10 +26,12 @@ function init(config) {
 // Parameters:
 // socket - a valid socket.js socket instance
 // sessionId - value of Django sessionid cookie (string)
+// contestId - id of the contest whose broadcasts the socket wants
+// (may be empty), they are passed only if OIOIOI allows it
 // onCompleted - callback called with associated user name
 // or null if login failed
-function login(socket, sessionId, onCompleted) {
-    auth(sessionId, function(userName) {
+function login(socket, sessionId, contestId, onCompleted) {
+    auth(sessionId, contestId, function(userName, allowedContests) {
         if (!userName) {
             onCompleted(null);
             return;
@@ -36,6 +42,14 @@ function login(socket, sessionId, onCompleted) {
             queuemanager.subscribe(userName);
         }
         users[userName][socket.dict_id] = socket;
+        socketContests[socket.dict_id] = allowedContests;
+        for (var i in allowedContests) {
+            var contest = allowedContests[i];
+            if (!contests[contest]) {
+                contests[contest] = {};
+            }
+            contests[contest][socket.dict_id] = socket;
+        }
         onCompleted(userName);
     });
 
@@ -44,18 +58,20 @@ function login(socket, sessionId, onCompleted) {
 // Operation actually performing communication with OIOIOI instance
 // in order to determine user's identity.
 // Parameters: see login function
-function auth(sessionId, onCompleted) {
-    if (session_id_cache[sessionId]) {
-        if (Date.now() < session_id_cache[sessionId].expires) {
-            console.log('User ' + session_id_cache[sessionId].user + ' logged in from cache');
-            onCompleted(session_id_cache[sessionId].user);
+function auth(sessionId, contestId, onCompleted) {
+    var cacheKey = sessionId + ':' + (contestId || '');
+    if (session_id_cache[cacheKey]) {
+        if (Date.now() < session_id_cache[cacheKey].expires) {
+            console.log('User ' + session_id_cache[cacheKey].user + ' logged in from cache');
+            onCompleted(session_id_cache[cacheKey].user,
+                        session_id_cache[cacheKey].contests);
             return;
         }
     }
 
     request.post(
         CONFIG ? CONFIG['oioioi-url'] : 'bogus-url',
-        { form: { nsid: sessionId } },
+        { form: { nsid: sessionId, contest: contestId || '' } },
         function (error, response, body) {
             if (!error && response.statusCode === 200) {
                 body = JSON.parse(body);
@@ -64,12 +80,14 @@ function auth(sessionId, onCompleted) {
                     onCompleted(null);
                 } else {
                     console.log('Authorized user: ' + body.user);
-                    session_id_cache[sessionId] = {
+                    var allowedContests = (body.contests || []).map(String);
+                    session_id_cache[cacheKey] = {
                         user: body.user,
+                        contests: allowedContests,
                         expires: Date.now() +
                             AUTH_CACHE_EXPIRATION_SECONDS * 1000
                     };
-                    onCompleted(body.user);
+                    onCompleted(body.user, allowedContests);
                 }
             } else {
                 if (error) {
@@ -95,6 +113,11 @@ function getClientsForUser(userName) {
     return users[userName];
 }
 
+// Returns socket.io sockets which receive broadcasts of given contest.
+function getClientsForContest(contestId) {
+    return contests[contestId];
+}
+
 // Removes a socket and, if it's the last socket associated with given user name,
 // it unsubscribes from a queue for that user.
 function logout(socket) {
@@ -109,6 +132,16 @@ function logout(socket) {
         }
     }
     delete sockets[socket.dict_id];
+    for (var i in socketContests[socket.dict_id]) {
+        var contest = socketContests[socket.dict_id][i];
+        if (contests[contest]) {
+            delete contests[contest][socket.dict_id];
+            if (Object.keys(contests[contest]).length === 0) {
+                delete contests[contest];
+            }
+        }
+    }
+    delete socketContests[socket.dict_id];
 }
 
 exports.init = init;
@@ -116,3 +149,4 @@ exports.login = login;
 exports.logout = logout;
 exports.resolveUserName = resolveUserName;
 exports.getClientsForUser = getClientsForUser;
+exports.getClientsForContest = getClientsForContest;
@@ -48,6 +48,7 @@ function runServer(config) {
     queuemanager.init(rabbit.createContext(CONFIG.amqp), function() {
         app = http.createServer(httpRequestHandler);
         queuemanager.on('message', onMessageReceived);
+        queuemanager.on('broadcast', onBroadcastReceived);
         io.listen(app).sockets.on('connection', onSocketConnected);
         app.listen(CONFIG.port);
         console.log('Notifications Server listening on port ' + CONFIG.port);
@@ -82,6 +83,16 @@ function onMessageReceived(userName, message) {
     }
 }
 
+// Called whenever a contest-wide message is received. It is passed to all
+// sockets allowed to receive broadcasts of the contest.
+function onBroadcastReceived(contestId, message) {
+    console.log('Broadcast to contest ' + contestId + ': ' + JSON.stringify(message));
+    var clients = auth.getClientsForContest(contestId);
+    for (var clientId in clients) {
+        clients[clientId].emit("message", message);
+    }
+}
+
 /* Called whenever an authentication is requested by socket.
    Upon successful completion, all messages addressed to associated user
    will be forwarded to this socket until it disconnects.
@@ -91,7 +102,7 @@ function onAuthenticateRequested(data, _, socket, onCompleted) {
     if (!data || !data.session_id) {
         return {status: 'ERR_INVALID_MESSAGE'};
     }
-    auth.login(socket, data.session_id, function(userName) {
+    auth.login(socket, data.session_id, data.contest_id, function(userName) {
         onCompleted(userName ? {status: 'OK'} : {status: 'ERR_AUTH_FAILED'});
         // when a new user logs in, let him know what's up!
         retransmitNotifications(userName);
@@ -128,4 +139,5 @@ function onAckNotsRequested(nots, userName, _, onCompleted) {
 
 exports.onSocketConnected = onSocketConnected;
 exports.onMessageReceived = onMessageReceived;
+exports.onBroadcastReceived = onBroadcastReceived;
 exports.runServer = runServer;
\ No newline at end of file
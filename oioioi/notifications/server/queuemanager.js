@@ -4,7 +4,13 @@ var eventEmitter = new EventEmitter();
 var context;
 var workers = {};
 var unackMessages = {};
+var broadcasts;
 var QUEUE_PREFIX = '_notifs_';
+// Contest-wide notifications are published once to this topic exchange,
+// with routing keys 'contest.<contest id>' (see NotificationHandler in
+// oioioi/base/notification.py).
+var BROADCAST_EXCHANGE = '_notifs_broadcast';
+var BROADCAST_TOPIC = 'contest.*';
 /* Initializes the QueueManager.
    Parameters: _context - RabbitMQ context,
                onCompleted - callback called with no arguments
@@ -16,6 +22,7 @@ function init(_context, onCompleted) {
     context = _context;
 
     context.on('ready', function() {
+        subscribeBroadcasts();
         onCompleted();
     });
     context.on('error', function(e) {
@@ -51,6 +58,26 @@ function subscribe(userId) {
     });
 }
 
+// Subscribes (once for the whole server) to contest-wide notifications.
+// They are emitted as 'broadcast' events with the contest id and the message
+// and are not acknowledged, as they are not kept for offline users.
+function subscribeBroadcasts() {
+    if (broadcasts) {
+        return;
+    }
+    broadcasts = context.socket('SUBSCRIBE', {routing: 'topic'});
+    broadcasts.connect(BROADCAST_EXCHANGE, BROADCAST_TOPIC);
+    broadcasts.on('data', function(data) {
+        try {
+            data = JSON.parse(data);
+        } catch(obj) {
+            console.log('Bad broadcast message format arrived!');
+            return;
+        }
+        eventEmitter.emit('broadcast', String(data.contest), data);
+    });
+}
+
 // Unsubscribes from queue associated with given userId.
 function unsubscribe(userId) {
     if (!workers[userId]) {
@@ -92,5 +119,7 @@ exports.subscribe = subscribe;
 exports.unsubscribe = unsubscribe;
 exports.acknowledge = acknowledge;
 exports.unsubscribeAll = unsubscribeAll;
+exports.subscribeBroadcasts = subscribeBroadcasts;
+exports.BROADCAST_EXCHANGE = BROADCAST_EXCHANGE;
 exports.getQueueNameForUser = getQueueNameForUser;
 exports.on = eventEmitter.on.bind(eventEmitter);
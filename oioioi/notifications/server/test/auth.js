@@ -14,6 +14,10 @@ describe('Authentication Module', function() {
         poster.withArgs(sinon.match.any,
             sinon.match({form:{nsid: 'TEST_USER_SID'}}))
             .yields(null, {statusCode: 200}, '{"status": "OK", "user": "test_user"}');
+        poster.withArgs(sinon.match.any,
+            sinon.match({form:{nsid: 'TEST_CONTEST_SID', contest: 'c'}}))
+            .yields(null, {statusCode: 200},
+                    '{"status": "OK", "user": "test_user", "contests": ["c"]}');
         queuemanager.init(rabbit.createContext('amqp://localhost'), done);
     });
 
@@ -25,7 +29,7 @@ describe('Authentication Module', function() {
     afterEach(queuemanager.unsubscribeAll);
 
     it('should not auth an invalid user', function(done) {
-        auth.login({dict_id: 1}, '12345', function(userName) {
+        auth.login({dict_id: 1}, '12345', null, function(userName) {
             assert.equal(userName, null);
             done();
         });
@@ -33,7 +37,7 @@ describe('Authentication Module', function() {
 
     it('should auth a valid user', function(done) {
         var socket = {dict_id: 1};
-        auth.login(socket, 'TEST_USER_SID', function(userName) {
+        auth.login(socket, 'TEST_USER_SID', null, function(userName) {
             assert.equal(userName, "test_user");
             auth.logout(socket);
             done();
@@ -43,8 +47,8 @@ describe('Authentication Module', function() {
     it ('when 2 sockets log in, then log out, user should be sub/unsubscribed once', function(done) {
         subSpy = sinon.spy(queuemanager, "subscribe");
         unsubSpy = sinon.spy(queuemanager, "unsubscribe");
-        auth.login({dict_id: 1}, 'TEST_USER_SID', function() {
-            auth.login({dict_id: 2}, 'TEST_USER_SID', function() {
+        auth.login({dict_id: 1}, 'TEST_USER_SID', null, function() {
+            auth.login({dict_id: 2}, 'TEST_USER_SID', null, function() {
                 assert.ok(subSpy.calledOnce);
                 auth.logout({dict_id: 1});
                 assert.ok(!unsubSpy.called);
@@ -57,5 +61,15 @@ describe('Authentication Module', function() {
 
 
     });
-});
 
+    it('should receive broadcasts only of allowed contests', function(done) {
+        var socket = {dict_id: 3};
+        auth.login(socket, 'TEST_CONTEST_SID', 'c', function(userName) {
+            assert.equal(userName, "test_user");
+            assert.ok(auth.getClientsForContest('c')[3] === socket);
+            auth.logout(socket);
+            assert.equal(auth.getClientsForContest('c'), undefined);
+            done();
+        });
+    });
+});
@@ -1,6 +1,6 @@
 var notificationsClient;
 
-function NotificationsClient(serverUrl, sessionId) {
+function NotificationsClient(serverUrl, sessionId, contestId) {
     this.NUMBER_BADGE_ID = "#notifications_number";
     this.TABLE_NOTIFICATIONS_ID = "#balloon_table_notifications";
     this.NO_NOTIFICATIONS_ID = "#info_no_notifications";
@@ -14,6 +14,8 @@ function NotificationsClient(serverUrl, sessionId) {
     this.DEBUG = true;
     this.NOTIF_SERVER_URL = serverUrl;
     this.NOTIF_SESSION = sessionId;
+    // Broadcast notifications of this contest are received as well.
+    this.NOTIF_CONTEST = contestId;
     this.CONTENT_ENTRY = '<tr><td class="%(notclass)s"><a href="%(address)s" ' + '' +
         'id="notif_msg_%(id)s">...</a><br/>' +
         '<span class="notification-details">%(details)s</span>' +
@@ -90,7 +92,8 @@ NotificationsClient.prototype.resolveMessageText =
 NotificationsClient.prototype.authenticate = function() {
     var me = this;
     var sid = this.NOTIF_SESSION;
-    this.socket.emits("authenticate", {session_id: sid});
+    this.socket.emits("authenticate", {session_id: sid,
+                                       contest_id: this.NOTIF_CONTEST});
     this.socket.on("authenticate", function(result)
     {
         if (result.status !== 'OK') {
@@ -1,12 +1,15 @@
 import json
 from django.core.urlresolvers import reverse_lazy
 from django.test import TestCase
+from django.contrib.auth.models import User
+from oioioi.contests.models import Contest
+from oioioi.participants.models import Participant
 from oioioi.notifications.processors import get_notifications_session
 from oioioi.notifications.views import notifications_authenticate_view
 
 
 class TestNotifications(TestCase):
-    fixtures = ['test_users']
+    fixtures = ['test_users', 'test_contest']
 
     def test_notifications(self):
         self.client.login(username='test_user')
@@ -23,3 +26,21 @@ class TestNotifications(TestCase):
         })
         resp_obj = json.loads(response.content)
         self.assertEqual(resp_obj['status'], 'UNAUTHORIZED')
+
+    def test_broadcast_contests(self):
+        self.client.login(username='test_user')
+        url = reverse_lazy(notifications_authenticate_view)
+        nsid = get_notifications_session(self.client.session).uid
+        contest = Contest.objects.get()
+        contest.controller_name = 'oioioi.acm.controllers.ACMContestController'
+        contest.save()
+        Participant.objects.create(contest=contest,
+                user=User.objects.get(username='test_user'))
+        response = self.client.post(url, {'nsid': nsid, 'contest': 'c'})
+        self.assertEqual(json.loads(response.content)['contests'], ['c'])
+        self.client.login(username='test_user2')
+        nsid2 = get_notifications_session(self.client.session).uid
+        response = self.client.post(url, {'nsid': nsid2, 'contest': 'c'})
+        self.assertEqual(json.loads(response.content)['contests'], [])
+        response = self.client.post(url, {'nsid': nsid})
+        self.assertEqual(json.loads(response.content)['contests'], [])
@@ -1,7 +1,9 @@
+from django.contrib.auth.models import User
 from django.contrib.sessions.models import Session
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from oioioi.base.utils import jsonify
+from oioioi.contests.models import Contest
 
 
 @csrf_exempt
@@ -12,6 +14,24 @@ def notifications_authenticate_view(request):
         session = Session.objects.get(notificationssession__uid=
                                       request.POST['nsid'])
         user_id = session.get_decoded().get('_auth_user_id')
-        return {'user': user_id, 'status': 'OK'}
     except Session.DoesNotExist:
         return {'status': 'UNAUTHORIZED'}
+    return {'user': user_id, 'status': 'OK',
+            'contests': _broadcast_contests(user_id,
+                                            request.POST.get('contest'))}
+
+
+def _broadcast_contests(user_id, contest_id):
+    """Returns a list with ids of contests (the given one or none) whose
+       broadcast notifications the user may receive.
+    """
+    if not contest_id or user_id is None:
+        return []
+    try:
+        contest = Contest.objects.get(id=contest_id)
+        user = User.objects.get(id=user_id)
+    except (Contest.DoesNotExist, User.DoesNotExist):
+        return []
+    if contest.controller.is_public_message_notification_recipient(user):
+        return [contest.id]
+    return []
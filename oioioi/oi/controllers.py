@@ -37,6 +37,10 @@ class OIRegistrationController(ParticipantsController):
     def can_enter_contest(self, request):
         return True
 
+    @classmethod
+    def filter_visible_contests(cls, request, contests):
+        return [contest.id for contest in contests]
+
     def can_register(self, request):
         return True
 
@@ -116,6 +120,10 @@ class OIContestController(ProgrammingContestController):
         return super(OIContestController, self) \
                 .can_submit(request, problem_instance, check_round_times)
 
+    def visibility_cache_key(self, request):
+        return '%s:%d' % (super(OIContestController, self)
+                .visibility_cache_key(request), is_participant(request))
+
     def can_see_stats(self, request):
         return is_contest_admin(request) or is_contest_observer(request)
 
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import oioioi.oireports.models
+import oioioi.filetracker.fields
+import django.utils.timezone
+from django.conf import settings
+import oioioi.base.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0006_submission_index_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfReport',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='creation date')),
+                ('filename', models.CharField(max_length=255, verbose_name='filename')),
+                ('status', oioioi.base.fields.EnumField(default=b'?', max_length=64, verbose_name='status', choices=[(b'?', 'Pending report'), (b'OK', 'Ready'), (b'ERR', 'Error')])),
+                ('info', models.CharField(max_length=1000, null=True, verbose_name='information', blank=True)),
+                ('file', oioioi.filetracker.fields.FileField(upload_to=oioioi.oireports.models._make_report_filename, null=True, verbose_name='file', blank=True)),
+                ('celery_task_id', models.CharField(max_length=50, unique=True, null=True, blank=True)),
+                ('contest', models.ForeignKey(verbose_name='contest', to='contests.Contest')),
+                ('created_by', models.ForeignKey(verbose_name='created by', blank=True, to=settings.AUTH_USER_MODEL, null=True)),
+            ],
+            options={
+                'ordering': ['-creation_date'],
+                'verbose_name': 'PDF report',
+                'verbose_name_plural': 'PDF reports',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -1,3 +1,89 @@
+import os.path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import ugettext_lazy as _, pgettext_lazy
+
+from oioioi.base.fields import EnumRegistry, EnumField
 from oioioi.base.utils.deps import check_django_app_dependencies
+from oioioi.contests.models import Contest
+from oioioi.filetracker.fields import FileField
 
 check_django_app_dependencies(__name__, ['oioioi.oi'])
+
+
+report_statuses = EnumRegistry()
+report_statuses.register('?', pgettext_lazy("Pending", "Pending report"))
+report_statuses.register('OK', _("Ready"))
+report_statuses.register('ERR', _("Error"))
+
+REPORT_PROGRESS_CACHE_KEY = 'oireports_progress:%d'
+REPORT_PROGRESS_TIMEOUT = 24 * 60 * 60  # seconds
+
+
+def _make_report_filename(instance, filename):
+    return 'oireports/%s/%s' % (instance.contest.id,
+            get_valid_filename(os.path.basename(filename)))
+
+
+class PdfReport(models.Model):
+    """A PDF report generated in the background by
+       :func:`~oioioi.oireports.reportsmgr.reportsmgr_job`.
+    """
+    contest = models.ForeignKey(Contest, verbose_name=_("contest"))
+    created_by = models.ForeignKey(User, verbose_name=_("created by"),
+            null=True, blank=True)
+    creation_date = models.DateTimeField(default=timezone.now,
+            verbose_name=_("creation date"))
+    filename = models.CharField(max_length=255, verbose_name=_("filename"))
+    status = EnumField(report_statuses, default='?',
+            verbose_name=_("status"))
+    info = models.CharField(max_length=1000, null=True, blank=True,
+            verbose_name=_("information"))
+    file = FileField(upload_to=_make_report_filename, null=True, blank=True,
+            verbose_name=_("file"))
+    # The job generating a pending report. Clearing it cancels the job.
+    celery_task_id = models.CharField(max_length=50, unique=True, null=True,
+            blank=True)
+
+    class Meta(object):
+        verbose_name = _("PDF report")
+        verbose_name_plural = _("PDF reports")
+        ordering = ['-creation_date']
+
+    def __unicode__(self):
+        return self.filename
+
+    def _progress_cache_key(self):
+        return REPORT_PROGRESS_CACHE_KEY % self.id
+
+    def set_progress(self, done, total):
+        """Records that reports of ``done`` of ``total`` users are
+           generated.
+        """
+        cache.set(self._progress_cache_key(), (done, total),
+                REPORT_PROGRESS_TIMEOUT)
+
+    @property
+    def progress(self):
+        """A tuple ``(done, total)`` set by :meth:`set_progress` or ``None``
+           if the report is not being generated.
+        """
+        return cache.get(self._progress_cache_key())
+
+    def clear_progress(self):
+        cache.delete(self._progress_cache_key())
+
+    def cancel(self):
+        """Marks a pending report as failed, so that its job, if it is
+           still queued (e.g. no worker consumes the ``reportsmgr`` queue),
+           does not generate it.
+        """
+        self.status = 'ERR'
+        self.info = _("Cancelled")
+        self.celery_task_id = None
+        self.save()
+        self.clear_progress()
@@ -0,0 +1,224 @@
+"""Generation of OI reports (see :mod:`oioioi.oireports.views`).
+
+   Reports are generated for batches of ``settings.OIREPORTS_BATCH_SIZE``
+   users: all results, compilation, test and group reports of a batch are
+   fetched with a few queries and source files are read from Filetracker
+   concurrently. The output is rendered in parts, so that it can be sent
+   or written while the following batches are being generated.
+"""
+
+import itertools
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+from operator import attrgetter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.template import Context
+from django.template.loader import get_template
+
+from oioioi.contests.models import ProblemInstance, UserResultForProblem
+from oioioi.oi.models import Region
+from oioioi.programs.models import CompilationReport, GroupReport, \
+        TestReport
+
+# Templates of the report formats: the head, a row for each user and
+# the foot.
+REPORT_TEMPLATES = {
+    'xml': ('oireports/xmlreport_head.xml', 'oireports/xmlreport_row.xml',
+            'oireports/xmlreport_foot.xml'),
+    'pdf': ('oireports/pdfreport_head.tex', 'oireports/pdfreport_row.tex',
+            'oireports/pdfreport_foot.tex'),
+}
+
+
+def report_users(contest, region=None, username=None):
+    """Returns a queryset of users to generate reports for: active
+       participants of the contest (from the given region) or the user with
+       the given username.
+    """
+    if username is not None:
+        return User.objects.filter(username=username)
+    queryset = User.objects.filter(participant__contest=contest,
+        participant__status='ACTIVE')
+    if region is not None:
+        queryset = queryset.filter(
+                participant__oi_oionsiteregistration__region=region)
+    return queryset
+
+
+def load_options(contest, options):
+    """Returns a tuple ``(users, test_groups)`` for ``options``, a
+       dictionary produced by :func:`~oioioi.oireports.views.report_options`.
+    """
+    region = None
+    if options['region'] is not None:
+        region = Region.objects.get(short_name=options['region'],
+                contest=contest)
+    users = report_users(contest, region, options['username'])
+    problem_instances = ProblemInstance.objects.in_bulk(
+            [int(pi_id) for pi_id in options['test_groups']])
+    test_groups = dict((problem_instances[int(pi_id)], groups)
+                       for pi_id, groups in options['test_groups'].iteritems()
+                       if int(pi_id) in problem_instances)
+    return users, test_groups
+
+
+def _read_source(source_file):
+    try:
+        return source_file.read()
+    finally:
+        source_file.close()
+
+
+def _read_sources(source_files):
+    if not source_files:
+        return []
+    pool = ThreadPool(min(settings.OIREPORTS_SOURCE_THREADS,
+                          len(source_files)))
+    try:
+        return pool.map(_read_source, source_files)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _serialize_batch(user_ids, test_groups):
+    """Returns dictionaries representing reports of the given users, in
+       the same order.
+
+       Each of them contains the ``user``, a list of ``resultsets``, one
+       for each problem instance with a result, and the ``sum`` of scores.
+    """
+    users = User.objects.in_bulk(user_ids)
+    results = list(UserResultForProblem.objects
+            .filter(user__in=user_ids,
+                    problem_instance__in=list(test_groups),
+                    submission_report__isnull=False)
+            .select_related('problem_instance__problem',
+                    'submission_report__submission__programsubmission'))
+    submission_ids = [r.submission_report.submission_id for r in results]
+    all_groups = set(itertools.chain(*test_groups.values()))
+
+    compilation_reports = dict((c.submission_report_id, c)
+            for c in CompilationReport.objects.filter(submission_report__in=
+                [r.submission_report_id for r in results]))
+
+    test_reports = defaultdict(list)
+    for test_report in TestReport.objects \
+            .filter(submission_report__submission__in=submission_ids,
+                    submission_report__status='ACTIVE',
+                    submission_report__kind__in=['INITIAL', 'NORMAL'],
+                    test_group__in=all_groups) \
+            .select_related('submission_report') \
+            .order_by('test__kind', 'test__order', 'test_name'):
+        test_reports[test_report.submission_report.submission_id] \
+                .append(test_report)
+
+    group_reports = dict(((g.submission_report.submission_id, g.group), g)
+            for g in GroupReport.objects
+            .filter(submission_report__submission__in=submission_ids,
+                    submission_report__status='ACTIVE',
+                    submission_report__kind__in=['INITIAL', 'NORMAL'],
+                    group__in=all_groups)
+            .select_related('submission_report'))
+
+    source_files = [r.submission_report.submission.programsubmission
+                    .source_file for r in results]
+    codes = _read_sources(source_files)
+
+    resultsets = defaultdict(list)
+    for r, source_file, code in zip(results, source_files, codes):
+        submission_id = r.submission_report.submission_id
+        groups_names = test_groups[r.problem_instance]
+        groups = []
+        for group_name, tests in itertools.groupby(
+                [t for t in test_reports[submission_id]
+                 if t.test_group in groups_names],
+                attrgetter('test_group')):
+            groups.append({'tests': list(tests),
+                'report': group_reports[(submission_id, group_name)]})
+
+        problem_score = None
+        max_problem_score = None
+        for group in groups:
+            group_score = group['report'].score
+            group_max_score = group['report'].max_score
+
+            if problem_score is None:
+                problem_score = group_score
+            elif group_score is not None:
+                problem_score += group_score
+
+            if max_problem_score is None:
+                max_problem_score = group_max_score
+            elif group_max_score is not None:
+                max_problem_score += group_max_score
+
+        resultsets[r.user_id].append(dict(
+            result=r,
+            score=problem_score,
+            max_score=max_problem_score,
+            compilation_report=compilation_reports.get(
+                    r.submission_report_id),
+            groups=groups,
+            code=code,
+            codefile=source_file.file.name
+        ))
+
+    rows = []
+    for user_id in user_ids:
+        total_score = None
+        for resultset in resultsets[user_id]:
+            if total_score is None:
+                total_score = resultset['score']
+            elif resultset['score'] is not None:
+                total_score += resultset['score']
+        rows.append({
+            'user': users[user_id],
+            'resultsets': resultsets[user_id],
+            'sum': total_score,
+        })
+    return rows
+
+
+def serialize_reports(users, test_groups, progress=None):
+    """Yields dictionaries representing reports of the users who have any
+       results, sorted by last name and first name.
+
+       :param users: a queryset of users to generate reports for
+       :type test_groups: dict(:cls:`oioioi.contests.ProblemInstance`
+                           -> list of str)
+       :param test_groups: dictionary mapping problem instances to include
+                           into lists of names of test groups to include
+       :param progress: if given, called with the numbers of processed and
+                        all users after each batch
+    """
+    user_ids = list(users.order_by('last_name', 'first_name', 'username')
+                    .values_list('id', flat=True))
+    batch_size = settings.OIREPORTS_BATCH_SIZE
+    for start in xrange(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        for row in _serialize_batch(batch, test_groups):
+            if row['resultsets']:
+                yield row
+        if progress is not None:
+            progress(start + len(batch), len(user_ids))
+
+
+def render_report(report_format, title, timestamp, rows):
+    """Yields the report in the given format (a key of
+       :data:`REPORT_TEMPLATES`) in parts.
+    """
+    head, row_template, foot = [get_template(name)
+            for name in REPORT_TEMPLATES[report_format]]
+    context = Context({'title': title, 'timestamp': timestamp})
+    yield head.render(context)
+    rows_found = False
+    for row in rows:
+        rows_found = True
+        context.update({'row': row})
+        yield row_template.render(context)
+        context.pop()
+    context.update({'rows_found': rows_found})
+    yield foot.render(context)
@@ -0,0 +1,62 @@
+import logging
+
+from celery.task import task
+from django.core.files.base import File
+from django.utils import translation
+
+from oioioi.base.utils.pdf import compile_pdf
+from oioioi.oireports.models import PdfReport
+from oioioi.oireports.reports import load_options, serialize_reports, \
+        render_report
+
+logger = logging.getLogger(__name__)
+
+
+@task
+def reportsmgr_job(report_id, options):
+    """Generates the file of a :class:`~oioioi.oireports.models.PdfReport`.
+
+       ``options`` is a dictionary produced by
+       :func:`~oioioi.oireports.views.report_options`.
+
+       Reports of users are generated in batches and written to the LaTeX
+       source as they come, so that the whole report is never kept in
+       memory. The progress is recorded with
+       :meth:`~oioioi.oireports.models.PdfReport.set_progress`.
+
+       The job does nothing if it is not the one recorded in
+       :attr:`~oioioi.oireports.models.PdfReport.celery_task_id`, e.g.
+       because the report was cancelled.
+    """
+    try:
+        report = PdfReport.objects.get(id=report_id)
+    except PdfReport.DoesNotExist:
+        logger.warning("PDF report %s got deleted before it was generated.",
+                report_id)
+        return
+    if report.celery_task_id != reportsmgr_job.request.id:
+        logger.info("PDF report %s was cancelled.", report_id)
+        return
+
+    try:
+        with translation.override(options['language']):
+            users, test_groups = load_options(report.contest, options)
+            rows = serialize_reports(users, test_groups,
+                    progress=report.set_progress)
+            pdf_file = compile_pdf(render_report('pdf', options['title'],
+                    report.creation_date, rows))
+            try:
+                report.file.save(report.filename, File(pdf_file), save=False)
+            finally:
+                pdf_file.close()
+        report.status = 'OK'
+    # pylint: disable=broad-except
+    except Exception as e:
+        logger.error("Generating PDF report %s failed", report_id,
+                exc_info=True)
+        report.status = 'ERR'
+        report.info = unicode(e)[:1000]
+    finally:
+        report.celery_task_id = None
+        report.save()
+        report.clear_progress()
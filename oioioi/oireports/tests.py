@@ -10,6 +10,8 @@ from django.utils.timezone import utc
 from oioioi.base.tests import fake_time
 from oioioi.contests.models import Contest
 from oioioi.filetracker.tests import TestStreamingMixin
+from oioioi.oireports.models import PdfReport
+from oioioi.oireports.reportsmgr import reportsmgr_job
 from oioioi.oireports.views import CONTEST_REPORT_KEY
 from oioioi.participants.models import Participant
 
@@ -47,6 +49,20 @@ class TestReportViews(TestCase, TestStreamingMixin):
         self.client.login(username='test_admin')
         with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
             response = self.client.post(url, post_vars)
+            self.assertRedirects(response, url)
+
+        report = PdfReport.objects.get()
+        self.assertEqual(report.status, 'OK')
+        self.assertIsNone(report.celery_task_id)
+        self.assertIsNone(report.progress)
+
+        response = self.client.get(url)
+        download_url = reverse('download_pdf_report',
+                kwargs={'contest_id': contest.id, 'report_id': report.id})
+        self.assertIn(download_url, response.content)
+
+        with fake_time(datetime(2015, 8, 5, tzinfo=utc)):
+            response = self.client.get(download_url)
             pages = slate.PDF(StringIO(self.streamingContent(response)))
             self.assertIn("test_user", pages[0])
             self.assertIn("Wynik:34", pages[0])
@@ -54,6 +70,37 @@ class TestReportViews(TestCase, TestStreamingMixin):
             self.assertIn("1bRuntimeerror0.00s/0.10sprogramexited", pages[0])
             self.assertNotIn("test_user2", pages.text())
 
+    def test_cancel_pdf_report(self):
+        contest = Contest.objects.get()
+        report = PdfReport.objects.create(contest=contest,
+                filename='report.pdf', celery_task_id='queued-task')
+        url = reverse('cancel_pdf_report',
+                kwargs={'contest_id': contest.id, 'report_id': report.id})
+
+        self.client.login(username='test_user')
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.login(username='test_admin')
+        response = self.client.get(reverse('oireports',
+                kwargs={'contest_id': contest.id}))
+        self.assertIn(url, response.content)
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('oireports',
+                kwargs={'contest_id': contest.id}))
+        report = PdfReport.objects.get()
+        self.assertEqual(report.status, 'ERR')
+        self.assertIsNone(report.celery_task_id)
+
+        # The job queued before cancelling does not generate the report.
+        reportsmgr_job.apply((report.id, {}), task_id='queued-task')
+        report = PdfReport.objects.get()
+        self.assertEqual(report.status, 'ERR')
+        self.assertFalse(report.file)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 404)
+
     def test_xml_view(self):
         contest = Contest.objects.get()
         url = reverse('oireports', kwargs={'contest_id': contest.id})
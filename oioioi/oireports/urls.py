@@ -2,6 +2,10 @@ from django.conf.urls import patterns, include, url
 
 contest_patterns = patterns('oioioi.oireports.views',
     url(r'^oireports/$', 'oireports_view', name='oireports'),
+    url(r'^oireports/pdf/(?P<report_id>\d+)/$', 'download_pdf_report_view',
+        name='download_pdf_report'),
+    url(r'^oireports/pdf/(?P<report_id>\d+)/cancel/$',
+        'cancel_pdf_report_view', name='cancel_pdf_report'),
     url(r'^get_report_users/$', 'get_report_users_view',
         name='get_report_users'),
 )
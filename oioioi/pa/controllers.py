@@ -40,6 +40,10 @@ class PARegistrationController(ParticipantsController):
     def can_enter_contest(self, request):
         return True
 
+    @classmethod
+    def filter_visible_contests(cls, request, contests):
+        return [contest.id for contest in contests]
+
     def can_register(self, request):
         return True
 
@@ -106,6 +110,10 @@ class PAContestController(ProgrammingContestController):
         return super(PAContestController, self) \
                 .can_submit(request, problem_instance, check_round_times)
 
+    def visibility_cache_key(self, request):
+        return '%s:%d' % (super(PAContestController, self)
+                .visibility_cache_key(request), is_participant(request))
+
     def can_see_publicsolutions(self, request, round):
         return all_public_results_visible(request)
 
@@ -13,7 +13,8 @@ from oioioi.participants.forms import ParticipantForm, ExtendRoundForm
 from oioioi.participants.models import Participant
 from oioioi.contests.models import RoundTimeExtension
 from oioioi.participants.utils import contest_has_participants
-from oioioi.contests.utils import is_contest_admin
+from oioioi.contests.utils import is_contest_admin, \
+        invalidate_contest_timing, invalidate_contest_membership
 
 
 @make_request_condition
@@ -93,12 +94,19 @@ class ParticipantAdmin(admin.ModelAdmin):
         return super(ParticipantAdmin, self) \
                 .formfield_for_foreignkey(db_field, request, **kwargs)
 
+    def _update_status(self, queryset, status):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        queryset.update(status=status)
+        # Bulk updates bypass the receivers invalidating memberships.
+        for user_id in user_ids:
+            invalidate_contest_membership(user_id)
+
     def make_active(self, request, queryset):
-        queryset.update(status='ACTIVE')
+        self._update_status(queryset, 'ACTIVE')
     make_active.short_description = _("Mark selected participants as active")
 
     def make_banned(self, request, queryset):
-        queryset.update(status='BANNED')
+        self._update_status(queryset, 'BANNED')
     make_banned.short_description = _("Mark selected participants as banned")
 
     def extend_round(self, request, queryset):
@@ -123,6 +131,8 @@ class ParticipantAdmin(admin.ModelAdmin):
                         extra_time=extra_time) for user in users
                         if not existing_extensions.filter(user=user).exists()]
                 RoundTimeExtension.objects.bulk_create(new_extensions)
+                # bulk_create sends no post_save signals.
+                invalidate_contest_timing(round.contest_id)
 
                 if existing_count:
                     if existing_count > 1:
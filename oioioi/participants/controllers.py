@@ -43,6 +43,18 @@ class ParticipantsController(RegistrationController):
         return queryset.filter(participant__contest=self.contest,
                 participant__status='ACTIVE')
 
+    @classmethod
+    def filter_visible_contests(cls, request, contests):
+        if request.user.is_anonymous():
+            return [contest.id for contest in contests
+                    if cls(contest).anonymous_can_enter_contest()]
+        ids = set(contest.id for contest in contests)
+        participations = set(Participant.objects
+                .filter(user=request.user, status='ACTIVE')
+                .values_list('contest_id', flat=True))
+        return (ids & participations) | \
+                cls.contests_entered_by_permission(request, contests)
+
     def filter_users_with_accessible_personal_data(self, queryset):
         return self.filter_participants(queryset)
 
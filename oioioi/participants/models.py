@@ -1,6 +1,8 @@
 from nose.tools import nottest
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 
@@ -62,6 +64,13 @@ class Participant(models.Model):
         self.save()
 
 
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def _invalidate_contest_membership(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_membership
+    invalidate_contest_membership(instance.user_id)
+
+
 class RegistrationModel(models.Model):
     participant = OneToOneBothHandsCascadingParticipantField(Participant,
             related_name='%(app_label)s_%(class)s')
@@ -11,9 +11,10 @@ from oioioi.base.tests import fake_time, check_not_accessible
 from oioioi.contestexcl.models import ExclusivenessConfig
 from oioioi.contestexcl.tests import ContestIdViewCheckMixin
 from oioioi.contests.models import Contest, Round, ProblemInstance, \
-    ContestPermission
+    ContestPermission, RoundTimeExtension, Submission
 from oioioi.contests.tests import SubmitFileMixin
 from oioioi.contests.current_contest import ContestMode
+from oioioi.contests.utils import contest_membership_version
 from oioioi.participants.controllers import ParticipantsController
 from oioioi.participants.models import Participant, TestRegistration
 from oioioi.participants.management.commands import import_participants
@@ -137,6 +138,47 @@ class TestParticipantsSubmit(TestCase, SubmitFileMixin):
             response = self.submit_file(contest, problem_instance)
             self._assertSubmitted(contest, response)
 
+    def test_extend_round_action(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.participants.tests.ParticipantsContestController'
+        contest.save()
+
+        round = Round.objects.get(pk=1)
+        problem_instance = ProblemInstance.objects.get(pk=1)
+        round.start_date = datetime(2012, 7, 31, tzinfo=utc)
+        round.end_date = datetime(2012, 8, 5, tzinfo=utc)
+        round.save()
+
+        user = User.objects.get(username='test_user')
+        p = Participant(contest=contest, user=user, status='ACTIVE')
+        p.save()
+
+        with fake_time(datetime(2012, 8, 5, 0, 5, tzinfo=utc)):
+            # The round is over; this also caches the round times.
+            self.client.login(username='test_user')
+            response = self.submit_file(contest, problem_instance)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(Submission.objects.count(), 0)
+
+            self.client.login(username='test_admin')
+            self.client.get('/c/c/')  # 'c' becomes the current contest
+            url = reverse('oioioiadmin:participants_participant_changelist')
+            response = self.client.post(url, {
+                'action': 'extend_round',
+                '_selected_action': [p.id],
+                'submit': 'submit',
+                'round': round.id,
+                'extra_time': 10,
+            })
+            self.assertEqual(302, response.status_code)
+            self.assertTrue(RoundTimeExtension.objects
+                    .filter(user=user, round=round).exists())
+
+            self.client.login(username='test_user')
+            response = self.submit_file(contest, problem_instance)
+            self._assertSubmitted(contest, response)
+
 
 class TestParticipantsRegistration(TestCase):
     fixtures = ['test_users', 'test_contest']
@@ -261,6 +303,26 @@ class TestParticipantsModelAdmin(TestCase):
         self.client.login(username='test_contest_admin')
         check_not_accessible(self, url)
 
+    def test_status_actions(self):
+        contest = Contest.objects.get()
+        contest.controller_name = \
+                'oioioi.participants.tests.ParticipantsContestController'
+        contest.save()
+        user = User.objects.get(username='test_user')
+        p = Participant(contest=contest, user=user)
+        p.save()
+
+        self.client.get('/c/c/')  # 'c' becomes the current contest
+        url = reverse('oioioiadmin:participants_participant_changelist')
+        self.client.login(username='test_admin')
+        for action, status in [('make_banned', 'BANNED'),
+                               ('make_active', 'ACTIVE')]:
+            version = contest_membership_version(user.id)
+            self.client.post(url, {'action': action,
+                                   '_selected_action': [p.id]})
+            self.assertEqual(Participant.objects.get(id=p.id).status, status)
+            self.assertNotEqual(contest_membership_version(user.id), version)
+
     def test_participants_import(self):
         contest = Contest.objects.get()
         contest.controller_name = \
@@ -11,6 +11,9 @@ from django.contrib.admin.actions import delete_selected
 from django.contrib import messages
 from django.conf.urls import patterns, url
 from django.utils.encoding import force_unicode
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from django.template.defaultfilters import filesizeformat
 
 from oioioi.base import admin
 from oioioi.base.utils import make_html_link, make_html_links
@@ -237,6 +240,13 @@ class BaseProblemAdmin(admin.MixinsAdmin):
 admin.site.register(Problem, BaseProblemAdmin)
 
 
+def _format_duration(seconds):
+    if seconds < 60:
+        return _("%.1f s") % seconds
+    return _("%(minutes)d min %(seconds)d s") % \
+            dict(minutes=seconds // 60, seconds=seconds % 60)
+
+
 @make_request_condition
 def pending_packages(request):
     return ProblemPackage.objects.filter(status__in=['?', 'ERR']).exists()
@@ -252,7 +262,8 @@ def pending_contest_packages(request):
 
 class ProblemPackageAdmin(admin.ModelAdmin):
     list_display = ['contest', 'problem_name', 'colored_status', 'package',
-            'created_by', 'creation_date', 'celery_task_id', 'info']
+            'created_by', 'creation_date', 'celery_task_id', 'info',
+            'unpacking_summary']
     list_filter = ['status', 'problem_name', 'contest', 'created_by']
     actions = ['delete_selected']  # This allows us to override the action
 
@@ -287,12 +298,43 @@ class ProblemPackageAdmin(admin.ModelAdmin):
     def colored_status(self, instance):
         status_to_str = {'OK': 'ok', '?': 'in_prog', 'ERR': 'err'}
         package_status = status_to_str[instance.status]
+        status_display = force_unicode(instance.get_status_display())
+        progress = instance.progress if instance.status == '?' else None
+        if progress:
+            status_display = _("%(status)s (%(done)d/%(total)d)") % \
+                    dict(status=status_display, done=progress[0],
+                         total=progress[1])
         return '<span class="subm_admin prob_pack_%s">%s</span>' % \
-                (package_status, force_unicode(instance.get_status_display()))
+                (package_status, status_display)
     colored_status.allow_tags = True
     colored_status.short_description = _("Status")
     colored_status.admin_order_field = 'status'
 
+    def unpacking_summary(self, instance):
+        phases = instance.phases
+        if not phases:
+            return ''
+        slowest = max(phases, key=lambda phase: phase['duration'] or 0)
+        rows = []
+        for phase in phases:
+            if phase['duration'] is None:
+                duration = _("running")
+            else:
+                duration = _format_duration(phase['duration'])
+            rows.append(format_html(
+                    '<tr class="{0}"><td>{1}</td><td>{2}</td><td>{3}</td>'
+                    '<td>{4}</td></tr>',
+                    'slowest' if phase is slowest else '', phase['name'],
+                    duration,
+                    phase['count'] if phase['count'] is not None else '',
+                    filesizeformat(phase['bytes'])
+                        if phase['bytes'] is not None else ''))
+        return format_html('<table class="unpacking-phases">{0}</table>',
+                mark_safe(''.join(rows)))
+    unpacking_summary.allow_tags = True
+    unpacking_summary.short_description = _("Unpacking phases")
+    unpacking_summary.admin_order_field = 'unpacking_time'
+
     def package(self, instance):
         if instance.package_file:
             href = reverse(
@@ -129,10 +129,13 @@ class ProblemController(RegisteredSubclassesBase, ObjectWithMixins):
                     'oioioi.contests.handlers.update_user_results'),
                 ('call_submission_judged',
                     'oioioi.contests.handlers.call_submission_judged'),
-                ('dump_final_env',
-                    'oioioi.evalmgr.handlers.dump_env',
-                    dict(message='Finished evaluation')),
             ]
+        # Steps added by fill_evaluation_environ which need the final
+        # results of the submission.
+        extra_steps.extend(environ.pop('after_judging_steps', []))
+        extra_steps.append(('dump_final_env',
+                    'oioioi.evalmgr.handlers.dump_env',
+                    dict(message='Finished evaluation')))
 
         environ.setdefault('error_handlers', [])
         environ['error_handlers'].append(('create_error_report',
@@ -0,0 +1,24 @@
+import optparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext as _, ungettext
+
+from oioioi.problems.search import rebuild_index, SearchUnavailable
+
+
+class Command(BaseCommand):
+    help = _("Rebuild the full-text index used to search the problemset.")
+    option_list = BaseCommand.option_list + (
+        optparse.make_option('--no-statements', action='store_false',
+                             dest='statements', default=True,
+                             help=_("Do not index the text of statements.")),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            count = rebuild_index(statements=options['statements'])
+        except SearchUnavailable as e:
+            raise CommandError(str(e))
+        if int(options['verbosity']) > 0:
+            print ungettext("Indexed %d problem.", "Indexed %d problems.",
+                            count) % count
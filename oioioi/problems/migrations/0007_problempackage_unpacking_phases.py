@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0006_default_values_for_problem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problempackage',
+            name='unpacking_phases',
+            field=models.TextField(default='', verbose_name='unpacking phases', blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='problempackage',
+            name='unpacking_time',
+            field=models.FloatField(null=True, verbose_name='unpacking time (s)', blank=True),
+            preserve_default=True,
+        ),
+    ]
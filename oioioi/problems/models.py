@@ -1,13 +1,16 @@
+import json
 import logging
 import os.path
+import time
 from contextlib import contextmanager
 from traceback import format_exception
 
 from django.core import validators
+from django.core.cache import cache
 from django.core.validators import validate_slug
 from django.core.files.base import ContentFile
 from django.db import models, transaction
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _, pgettext_lazy
@@ -201,6 +204,11 @@ package_statuses.register('ERR', _("Error"))
 TRACEBACK_STACK_LIMIT = 100
 
 
+PACKAGE_PROGRESS_CACHE_KEY = 'problem_package_progress:%d'
+PACKAGE_PHASES_CACHE_KEY = 'problem_package_phases:%d'
+PACKAGE_PROGRESS_TIMEOUT = 24 * 60 * 60  # seconds
+
+
 class ProblemPackage(models.Model):
     """Represents a file with data necessary for creating a
        :class:`~oioioi.problems.models.Problem` instance.
@@ -223,6 +231,10 @@ class ProblemPackage(models.Model):
             verbose_name=_("traceback"), null=True, blank=True)
     status = EnumField(package_statuses, default='?', verbose_name=_("status"))
     creation_date = models.DateTimeField(default=timezone.now)
+    unpacking_phases = models.TextField(blank=True, default='',
+            verbose_name=_("unpacking phases"))
+    unpacking_time = models.FloatField(null=True, blank=True,
+            verbose_name=_("unpacking time (s)"))
 
     class Meta(object):
         verbose_name = _("problem package")
@@ -250,8 +262,14 @@ class ProblemPackage(models.Model):
             else:
                 package.status = 'OK'
 
+            phases = cache.get(package._phases_cache_key())
+            if phases:
+                package.unpacking_phases = json.dumps(phases)
+                package.unpacking_time = sum(phase['duration'] or 0
+                                             for phase in phases)
             package.celery_task_id = None
             package.save()
+            package.clear_progress()
             return True
 
     def save_operation_status(self):
@@ -277,6 +295,70 @@ class ProblemPackage(models.Model):
                 yield None
         return manager()
 
+    def _progress_cache_key(self):
+        return PACKAGE_PROGRESS_CACHE_KEY % self.id
+
+    def set_progress(self, done, total):
+        """Records that ``done`` of ``total`` steps of unpacking are finished.
+
+           The progress is kept in the cache rather than in the database,
+           as unpacking runs in a transaction, so its writes are not visible
+           before it ends.
+        """
+        cache.set(self._progress_cache_key(), (done, total),
+                PACKAGE_PROGRESS_TIMEOUT)
+
+    @property
+    def progress(self):
+        """A tuple ``(done, total)`` set by :meth:`set_progress` or ``None``
+           if the package is not being unpacked.
+        """
+        return cache.get(self._progress_cache_key())
+
+    def clear_progress(self):
+        cache.delete_many([self._progress_cache_key(),
+                           self._phases_cache_key()])
+
+    def _phases_cache_key(self):
+        return PACKAGE_PHASES_CACHE_KEY % self.id
+
+    @contextmanager
+    def phase(self, name):
+        """Returns a context manager measuring the duration of a phase of
+           unpacking, like compiling statements or generating outputs.
+
+           The yielded dictionary may be updated with the ``count`` of
+           processed items (e.g. tests) and ``bytes`` of processed files.
+           Phases are visible in :attr:`phases` while the package is being
+           unpacked and are stored in the package once it is processed.
+        """
+        key = self._phases_cache_key()
+        phases = cache.get(key) or []
+        phase = {'name': name, 'duration': None, 'count': None,
+                 'bytes': None}
+        phases.append(phase)
+        cache.set(key, phases, PACKAGE_PROGRESS_TIMEOUT)
+        started = time.time()
+        try:
+            yield phase
+        finally:
+            phase['duration'] = time.time() - started
+            cache.set(key, phases, PACKAGE_PROGRESS_TIMEOUT)
+            logger.info("Package %d: %s took %.1fs", self.id, name,
+                    phase['duration'])
+
+    @property
+    def phases(self):
+        """A list of dictionaries with ``name``, ``duration`` (in seconds,
+           ``None`` for the running phase), ``count`` and ``bytes`` of
+           unpacking phases.
+        """
+        if self.status == '?':
+            return cache.get(self._phases_cache_key()) or []
+        if self.unpacking_phases:
+            return json.loads(self.unpacking_phases)
+        return []
+
 
 class ProblemSite(models.Model):
     """Represents a global problem site.
@@ -328,3 +410,49 @@ class TagThrough(models.Model):
 
     class Meta(object):
         unique_together = ('problem', 'tag')
+
+
+@receiver(post_save, sender=Problem)
+def _index_problem(sender, instance, raw, **kwargs):
+    if not raw:
+        from oioioi.problems.search import index_problem
+        index_problem(instance)
+
+
+@receiver(post_save, sender=Problem)
+def _invalidate_contest_timing(sender, instance, **kwargs):
+    # Problem instances are cached with their problems.
+    from oioioi.contests.utils import invalidate_contest_timing
+    for contest_id in instance.probleminstance_set \
+            .filter(contest__isnull=False) \
+            .values_list('contest_id', flat=True).distinct():
+        invalidate_contest_timing(contest_id)
+
+
+@receiver(post_delete, sender=Problem)
+def _unindex_problem(sender, instance, **kwargs):
+    from oioioi.problems.search import unindex_problem
+    unindex_problem(instance.id)
+
+
+def _reindex_problem(problem_id, statements=False):
+    # The problem may be already deleted if its tags or statements are
+    # deleted with it.
+    from oioioi.problems.search import index_problem
+    problem = Problem.objects.filter(id=problem_id).first()
+    if problem is not None:
+        index_problem(problem, statements)
+
+
+@receiver(post_save, sender=TagThrough)
+@receiver(post_delete, sender=TagThrough)
+def _index_problem_tags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _reindex_problem(instance.problem_id)
+
+
+@receiver(post_save, sender=ProblemStatement)
+@receiver(post_delete, sender=ProblemStatement)
+def _index_problem_statements(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _reindex_problem(instance.problem_id, statements=True)
@@ -0,0 +1,246 @@
+"""Full-text search in the problemset.
+
+   Names, short names, tags and statement texts of problems are kept in
+   an SQLite FTS4 index (``settings.PROBLEMSET_SEARCH_INDEX``). It is
+   updated when problems, their tags and statements are saved and may be
+   rebuilt with the ``rebuild_problemset_index`` management command.
+
+   The index only maps queries to ids of problems. Which of them are shown
+   is still decided by the database query the results are applied to, so
+   a stale entry in the index never makes a problem visible.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager
+from distutils.spawn import find_executable
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+from oioioi.base.utils.execute import execute
+
+
+logger = logging.getLogger(__name__)
+
+# Weights of matches in the indexed columns, used for ranking.
+COLUMNS = (('name', 10.0), ('short_name', 10.0), ('tags', 5.0),
+           ('statement', 1.0))
+
+# The progress handler checking the time budget of a query is called every
+# this number of SQLite virtual machine instructions.
+PROGRESS_INSTRUCTIONS = 1000
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchUnavailable(Exception):
+    """Raised when the index is disabled, broken or does not answer within
+       ``settings.PROBLEMSET_SEARCH_TIMEOUT``.
+    """
+    pass
+
+
+def _rank(matchinfo):
+    """Scores a row using the output of ``matchinfo(problems, 'pcx')``.
+
+       Every phrase found in a column adds the weight of the column times
+       the ratio of its hits in this row to its hits in all rows, so rare
+       words count more than common ones.
+    """
+    info = array('I', str(matchinfo))
+    phrases, columns = info[0], info[1]
+    score = 0.0
+    for phrase in xrange(phrases):
+        for column in xrange(columns):
+            offset = 2 + 3 * (phrase * columns + column)
+            hits, all_hits = info[offset], info[offset + 1]
+            if hits:
+                score += COLUMNS[column][1] * hits / all_hits
+    return score
+
+
+def _create_table(db):
+    db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS problems USING '
+               'fts4(%s, tokenize=unicode61)'
+               % ', '.join(name for name, _weight in COLUMNS))
+
+
+@contextmanager
+def _open_index(path=None):
+    path = path or settings.PROBLEMSET_SEARCH_INDEX
+    if not path:
+        raise SearchUnavailable("The problemset search index is disabled")
+    db = sqlite3.connect(path, timeout=settings.PROBLEMSET_SEARCH_TIMEOUT)
+    try:
+        db.create_function('rank', 1, _rank)
+        _create_table(db)
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+def _read_statement(statement):
+    limit = settings.PROBLEMSET_SEARCH_STATEMENT_LENGTH
+    extension = statement.extension
+    if extension in ('.html', '.htm', '.txt'):
+        statement.content.open('rb')
+        try:
+            text = statement.content.read(4 * limit)
+        finally:
+            statement.content.close()
+        text = text.decode('utf-8', 'replace')
+        if extension != '.txt':
+            text = strip_tags(text)
+    elif extension == '.pdf' and settings.PROBLEMSET_SEARCH_PDFTOTEXT and \
+            find_executable(settings.PROBLEMSET_SEARCH_PDFTOTEXT):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            statement.content.open('rb')
+            try:
+                for chunk in statement.content.chunks():
+                    f.write(chunk)
+            finally:
+                statement.content.close()
+            f.flush()
+            text = execute([settings.PROBLEMSET_SEARCH_PDFTOTEXT, '-q',
+                            '-enc', 'UTF-8', f.name, '-'])
+        text = text.decode('utf-8', 'replace')
+    else:
+        return u''
+    return text[:limit]
+
+
+def statement_text(problem):
+    """Returns the text of the statements of the problem which can be
+       indexed: HTML and plain text ones and, if ``pdftotext`` is installed,
+       PDF ones.
+    """
+    texts = []
+    for statement in problem.statements.all():
+        # pylint: disable=broad-except
+        try:
+            texts.append(_read_statement(statement))
+        except Exception:
+            logger.warning("Failed to extract text of statement %s",
+                    statement.content.name, exc_info=True)
+    return u'\n'.join(texts)
+
+
+def _row(problem, tags, statement):
+    return (problem.id, problem.name, problem.short_name, u' '.join(tags),
+            statement)
+
+
+def index_problem(problem, statements=False):
+    """Adds the problem to the index or updates its entry.
+
+       The text of statements is extracted only if ``statements`` is set,
+       otherwise it is kept as it was indexed before. Errors are logged,
+       as the index can always be rebuilt.
+    """
+    if not settings.PROBLEMSET_SEARCH_INDEX:
+        return
+    tags = problem.tag_set.values_list('name', flat=True)
+    try:
+        with _open_index() as db:
+            if statements:
+                db.execute('DELETE FROM problems WHERE docid = ?',
+                           (problem.id,))
+                db.execute('INSERT INTO problems (docid, name, short_name, '
+                           'tags, statement) VALUES (?, ?, ?, ?, ?)',
+                           _row(problem, tags, statement_text(problem)))
+                return
+            cursor = db.execute('UPDATE problems SET name = ?, '
+                                'short_name = ?, tags = ? WHERE docid = ?',
+                                (problem.name, problem.short_name,
+                                 u' '.join(tags), problem.id))
+            if not cursor.rowcount:
+                db.execute('INSERT INTO problems (docid, name, short_name, '
+                           'tags, statement) VALUES (?, ?, ?, ?, ?)',
+                           _row(problem, tags, u''))
+    except (sqlite3.Error, SearchUnavailable):
+        logger.warning("Failed to index problem %d", problem.id,
+                exc_info=True)
+
+
+def unindex_problem(problem_id):
+    if not settings.PROBLEMSET_SEARCH_INDEX:
+        return
+    try:
+        with _open_index() as db:
+            db.execute('DELETE FROM problems WHERE docid = ?', (problem_id,))
+    except (sqlite3.Error, SearchUnavailable):
+        logger.warning("Failed to remove problem %d from the index",
+                problem_id, exc_info=True)
+
+
+def rebuild_index(statements=True):
+    """Indexes all problems from scratch and returns their number.
+
+       The new index is built next to the current one, which keeps serving
+       searches until it is replaced.
+    """
+    from oioioi.problems.models import Problem, TagThrough
+
+    path = settings.PROBLEMSET_SEARCH_INDEX
+    if not path:
+        raise SearchUnavailable("The problemset search index is disabled")
+    tags = {}
+    for problem_id, tag in TagThrough.objects \
+            .values_list('problem_id', 'tag__name').iterator():
+        tags.setdefault(problem_id, []).append(tag)
+
+    new_path = path + '.new'
+    if os.path.exists(new_path):
+        os.unlink(new_path)
+    count = 0
+    with _open_index(new_path) as db:
+        for problem in Problem.objects.only('name', 'short_name').iterator():
+            text = statement_text(problem) if statements else u''
+            db.execute('INSERT INTO problems (docid, name, short_name, '
+                       'tags, statement) VALUES (?, ?, ?, ?, ?)',
+                       _row(problem, tags.get(problem.id, []), text))
+            count += 1
+        db.execute("INSERT INTO problems (problems) VALUES ('optimize')")
+    os.rename(new_path, path)
+    return count
+
+
+def search_terms(query):
+    return [term.lower() for term in _TERM_RE.findall(query)]
+
+
+def search(query, limit=None):
+    """Returns ids of problems matching all words of ``query`` (also as
+       prefixes), the most relevant first.
+
+       Raises :exc:`SearchUnavailable` if the index cannot be used or does
+       not answer within ``settings.PROBLEMSET_SEARCH_TIMEOUT`` seconds.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit = limit or settings.PROBLEMSET_SEARCH_MAX_RESULTS
+    deadline = time.time() + settings.PROBLEMSET_SEARCH_TIMEOUT
+    try:
+        with _open_index() as db:
+            db.set_progress_handler(lambda: time.time() > deadline,
+                                    PROGRESS_INSTRUCTIONS)
+            rows = db.execute('SELECT docid FROM problems '
+                              'WHERE problems MATCH ? '
+                              "ORDER BY rank(matchinfo(problems, 'pcx')) DESC "
+                              'LIMIT ?',
+                              (' '.join(term + '*' for term in terms), limit))
+            return [row[0] for row in rows]
+    except sqlite3.OperationalError as e:
+        if time.time() > deadline:
+            raise SearchUnavailable("The search took too long")
+        raise SearchUnavailable(str(e))
+    except sqlite3.Error as e:
+        raise SearchUnavailable(str(e))
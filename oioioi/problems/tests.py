@@ -1,6 +1,8 @@
 # coding: utf-8
 
 import os.path
+import shutil
+import tempfile
 import urllib
 
 from django.contrib.auth.models import User, Permission
@@ -21,8 +23,9 @@ from oioioi.problems.controllers import ProblemController
 from oioioi.problems.problem_sources import UploadedPackageSource
 from oioioi.problems.package import ProblemPackageBackend
 from oioioi.problems.models import Problem, ProblemStatement, ProblemPackage, \
-        ProblemAttachment, make_problem_filename, ProblemSite
+        ProblemAttachment, make_problem_filename, ProblemSite, TagThrough
 from oioioi.problems.problem_site import problem_site_tab
+from oioioi.problems.search import rebuild_index, search
 from oioioi.programs.controllers import ProgrammingContestController
 
 
@@ -336,6 +339,45 @@ class TestProblemPackageAdminView(TestCase):
         # Not visible, because the problem instances's contest is 'c', not 'c1'
         self.assertNotIn('Model solutions', response.content)
 
+    def test_progress(self):
+        self.client.login(username='test_admin')
+        package = ProblemPackage.objects.get(id=2)
+        package.status = '?'
+        package.save()
+        package.set_progress(12, 40)
+        self.assertEqual(package.progress, (12, 40))
+
+        url = reverse('oioioiadmin:problems_problempackage_changelist')
+        response = self.client.get(url)
+        self.assertIn('(12/40)', response.content)
+
+        package.clear_progress()
+        self.assertIsNone(package.progress)
+
+    def test_unpacking_phases(self):
+        self.client.login(username='test_admin')
+        package = ProblemPackage.objects.get(id=2)
+        package.status = '?'
+        package.save()
+        with package.phase('outgen') as phase:
+            phase['count'] = 240
+            self.assertIsNone(package.phases[0]['duration'])
+        self.assertEqual(package.phases[0]['count'], 240)
+        self.assertIsNotNone(package.phases[0]['duration'])
+
+        with package.save_operation_status():
+            pass
+        package = ProblemPackage.objects.get(id=2)
+        self.assertEqual(package.status, 'OK')
+        self.assertEqual([phase['name'] for phase in package.phases],
+                ['outgen'])
+        self.assertIsNotNone(package.unpacking_time)
+
+        url = reverse('oioioiadmin:problems_problempackage_changelist')
+        response = self.client.get(url)
+        self.assertIn('unpacking-phases', response.content)
+        self.assertIn('outgen', response.content)
+
 
 class TestProblemPackageViews(TestCase, TestStreamingMixin):
     fixtures = ['test_users', 'test_contest', 'test_problem_packages',
@@ -765,6 +807,16 @@ class TestTags(TestCase):
     fixtures = ['test_users', 'test_contest', 'test_problem_packages',
                 'test_problem_site', 'test_tags']
 
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.index_settings = override_settings(PROBLEMSET_SEARCH_INDEX=
+                os.path.join(self.index_dir, 'problemset-search.sqlite'))
+        self.index_settings.enable()
+
+    def tearDown(self):
+        self.index_settings.disable()
+        shutil.rmtree(self.index_dir)
+
     def test_tag_hints_view(self):
         self.client.login(username='test_user')
         self.client.get('/c/c/')  # 'c' becomes the current contest
@@ -853,3 +905,41 @@ class TestTags(TestCase):
         self.assertIn('XYZ', response.content)
         self.assertNotIn('>mrowkowiec<', response.content)
         self.assertNotIn('>mrowka<', response.content)
+
+    @override_settings(PROBLEM_TAGS_VISIBLE=True)
+    def test_problemset_full_text_search(self):
+        self.assertEqual(rebuild_index(statements=False),
+                         Problem.objects.count())
+        self.client.login(username='test_user')
+
+        def get_search_url(**params):
+            url = reverse('problemset_main')
+            return url + '?' + urllib.urlencode(params)
+
+        for query in ['xyz', 'xy', 'XYZ mrowkow']:
+            response = self.client.get(get_search_url(q=query))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('XYZ', response.content)
+        response = self.client.get(get_search_url(q='xyz mrowka'))
+        self.assertNotIn('XYZ', response.content)
+
+        response = self.client.get(get_search_url(q=''))
+        self.assertIn('mrowkowiec (1)', response.content)
+        self.assertNotIn('mrowka (', response.content)
+        response = self.client.get(get_search_url(q='xyz', tag='mrowkowiec'))
+        self.assertIn('XYZ', response.content)
+        response = self.client.get(get_search_url(tag='mrowka'))
+        self.assertNotIn('XYZ', response.content)
+
+        problem = Problem.objects.get(short_name='xyz')
+        problem.name = 'Ants'
+        problem.save()
+        self.assertEqual(search('ants'), [problem.id])
+        TagThrough.objects.filter(problem=problem).delete()
+        self.assertEqual(search('mrowkowiec'), [])
+
+        with self.settings(PROBLEMSET_SEARCH_INDEX=None):
+            response = self.client.get(get_search_url(q='ant'))
+            self.assertIn('Ants', response.content)
+            self.assertIn('Full-text search is not available',
+                          response.content)
@@ -30,6 +30,9 @@ urlpatterns = patterns('oioioi.problems.views',
     url(r'^problem/(?P<problem_instance_id>[a-z0-9_-]+)/models$',
         'model_solutions_view',
         name='model_solutions'),
+    url(r'^problem/(?P<problem_instance_id>[a-z0-9_-]+)/models/csv$',
+        'model_solutions_csv_view',
+        name='model_solutions_csv'),
     url(r'^problem/(?P<problem_instance_id>[a-z0-9_-]+)/models/rejudge$',
         'rejudge_model_solutions_view',
         name='model_solutions_rejudge'),
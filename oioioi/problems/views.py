@@ -1,7 +1,11 @@
 # coding: utf-8
+import logging
 import urllib
 
+import unicodecsv
+
 from django.db import transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404, redirect
 from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.contrib import messages
@@ -15,8 +19,10 @@ from django.conf import settings
 
 from oioioi.base.utils import tabbed_view, jsonify
 from oioioi.problems.models import ProblemStatement, ProblemAttachment, \
-        Problem, ProblemPackage, Tag
-from oioioi.filetracker.utils import stream_file
+        Problem, ProblemPackage, Tag, TagThrough
+from oioioi.problems.search import search, SearchUnavailable
+from oioioi.filetracker.utils import stream_file, \
+        make_content_disposition_header
 from oioioi.problems.utils import can_admin_problem, \
         query_statement, get_submission_without_contest, \
         can_see_submission_without_contest, can_admin_problem_instance
@@ -28,10 +34,8 @@ from oioioi.contests.utils import is_contest_admin
 from oioioi.contests.middleware import activate_contest
 from oioioi.contests.views import submission_view_unsafe, \
         rejudge_submission_view_unsafe, change_submission_kind_view_unsafe
-from oioioi.programs.models import ModelSolution, TestReport, GroupReport, \
-        ModelProgramSubmission
-
-from collections import defaultdict
+from oioioi.programs.models import ModelSolution, ModelProgramSubmission
+from oioioi.programs.model_solutions import get_model_solutions_matrix
 
 # problem_site_statement_zip_view is used in one of the tabs
 # in problem_site.py. We placed the view in problem_site.py
@@ -40,6 +44,12 @@ from collections import defaultdict
 from oioioi.problems.problem_site import problem_site_statement_zip_view
 
 
+logger = logging.getLogger(__name__)
+
+# Number of the most common tags of found problems shown in the problemset.
+TAG_FACETS = 20
+
+
 def show_statement_view(request, statement_id):
     statement = get_object_or_404(ProblemStatement, id=statement_id)
     if not can_admin_problem_instance(request, statement.problem):
@@ -118,46 +128,93 @@ def add_or_update_problem_view(request):
                                  'problems/add_or_update.html')
 
 
-def get_problem_queryset_by_tag(datadict):
-    try:
-        tag_name = datadict['tag_search']
-        if not tag_name:
-            return Problem.objects, ''
-        tag = Tag.objects.get(name=tag_name)
-        return tag.problems, tag_name
-    except KeyError:
-        return Problem.objects, ''
-    except Tag.DoesNotExist:
-        return Problem.objects.none(), ''
+def _tag_facets(request, problems, tags):
+    facets = TagThrough.objects.filter(problem__in=problems) \
+            .values('tag__name').annotate(count=Count('problem')) \
+            .order_by('-count', 'tag__name')[:TAG_FACETS]
+    result = []
+    for facet in facets:
+        name = facet['tag__name']
+        params = request.GET.copy()
+        params.pop('page', None)
+        if name in tags:
+            params.setlist('tag', [tag for tag in tags if tag != name])
+        else:
+            params.setlist('tag', tags + [name])
+        result.append({'name': name, 'count': facet['count'],
+                       'selected': name in tags,
+                       'url': request.path + '?' + params.urlencode()})
+    return result
+
+
+def search_problemset(request, problems):
+    """Filters ``problems`` by the text query (``q``) and the tags
+       (``tag_search`` and ``tag``) given in ``request.GET``.
+
+       Returns the problems, ordered by relevance if there is a text query,
+       and the context of the search form, with the most common tags of
+       the found problems.
+    """
+    query = request.GET.get('q', '').strip()
+    tag_search = request.GET.get('tag_search', '')
+    tags = [tag for tag in request.GET.getlist('tag') if tag]
+    for tag in tags + ([tag_search] if tag_search else []):
+        problems = problems.filter(tag__name=tag)
+
+    ranking = None
+    search_failed = False
+    if query:
+        try:
+            ranking = dict((problem_id, i) for i, problem_id
+                           in enumerate(search(query)))
+            problems = problems.filter(id__in=ranking.keys())
+        except SearchUnavailable:
+            logger.warning("Problemset search failed", exc_info=True)
+            search_failed = True
+            problems = problems.filter(Q(name__icontains=query) |
+                                       Q(short_name__icontains=query))
+
+    show_tags = getattr(settings, 'PROBLEM_TAGS_VISIBLE', False)
+    context = {
+        'search_query': query,
+        'search_failed': search_failed,
+        'tag_search': tag_search,
+        'selected_tags': tags,
+        'tag_facets': _tag_facets(request, problems, tags)
+                if show_tags else [],
+        'show_tags': show_tags,
+        'show_search_bar': True,
+    }
+    if ranking is not None:
+        problems = sorted(problems.select_related('problemsite'),
+                          key=lambda problem: ranking[problem.id])
+    return problems, context
 
 
 def problemset_main_view(request):
-    queryset, query_string = get_problem_queryset_by_tag(request.GET)
-    problems = queryset.filter(is_public=True, problemsite__isnull=False)
-
+    problems, context = search_problemset(request,
+            Problem.objects.filter(is_public=True, problemsite__isnull=False))
+    context.update({
+        'problems': problems,
+        'page_title':
+            _("Welcome to problemset, the place, where all the problems are."),
+        'select_problem_src': request.GET.get('select_problem_src'),
+    })
     return TemplateResponse(request,
-       'problems/problemset/problem_list.html',
-      {'problems': problems,
-       'page_title':
-          _("Welcome to problemset, the place, where all the problems are."),
-       'select_problem_src': request.GET.get('select_problem_src'),
-       'tag_search': query_string,
-       'show_tags': getattr(settings, 'PROBLEM_TAGS_VISIBLE', False),
-       'show_search_bar': True})
+            'problems/problemset/problem_list.html', context)
 
 
 def problemset_my_problems_view(request):
-    queryset, query_string = get_problem_queryset_by_tag(request.GET)
-    problems = queryset.filter(author=request.user, problemsite__isnull=False)
-
+    problems, context = search_problemset(request,
+            Problem.objects.filter(author=request.user,
+                                   problemsite__isnull=False))
+    context.update({
+        'problems': problems,
+        'page_title': _("My problems"),
+        'select_problem_src': request.GET.get('select_problem_src'),
+    })
     return TemplateResponse(request,
-         'problems/problemset/problem_list.html',
-         {'problems': problems,
-          'page_title': _("My problems"),
-          'select_problem_src': request.GET.get('select_problem_src'),
-          'tag_search': query_string,
-          'show_tags': getattr(settings, 'PROBLEM_TAGS_VISIBLE', False),
-          'show_search_bar': True})
+            'problems/problemset/problem_list.html', context)
 
 
 def problem_site_view(request, site_key):
@@ -239,7 +296,7 @@ def problemset_add_or_update_problem_view(request):
                                  'problems/problemset/add_or_update.html')
 
 
-def model_solutions_view(request, problem_instance_id):
+def _get_model_solutions_problem_instance(request, problem_instance_id):
     problem_instance = \
         get_object_or_404(ProblemInstance, id=problem_instance_id)
     problem = problem_instance.problem
@@ -248,53 +305,38 @@ def model_solutions_view(request, problem_instance_id):
             (contest and
              not request.user.has_perm('contests.contest_admin', contest)):
         raise PermissionDenied
+    return problem_instance
 
-    filter_kwargs = {
-        'test__isnull': False,
-        'submission_report__submission__problem_instance':
-            problem_instance,
-        'submission_report__submission__programsubmission'
-                '__modelprogramsubmission__isnull': False,
-        'submission_report__status': 'ACTIVE',
-    }
-    test_reports = TestReport.objects.filter(**filter_kwargs) \
-            .select_related()
-    filter_kwargs = {
-        'submission_report__submission__problem_instance':
-            problem_instance,
-        'submission_report__submission__programsubmission'
-                '__modelprogramsubmission__isnull': False,
-        'submission_report__status': 'ACTIVE',
-    }
-    group_reports = GroupReport.objects.filter(**filter_kwargs) \
-            .select_related()
-    submissions = ModelProgramSubmission.objects \
+
+def _get_model_submissions(problem_instance):
+    return ModelProgramSubmission.objects \
             .filter(problem_instance=problem_instance) \
             .order_by('model_solution__order_key') \
             .select_related('model_solution') \
             .all()
-    tests = problem_instance.test_set \
-            .order_by('order', 'group', 'name').all()
 
-    group_results = defaultdict(lambda: defaultdict(lambda: None))
-    for gr in group_reports:
-        group_results[gr.group][gr.submission_report.submission_id] = gr
 
-    test_results = defaultdict(lambda: defaultdict(lambda: None))
-    for tr in test_reports:
-        test_results[tr.test_id][tr.submission_report.submission_id] = tr
+def model_solutions_view(request, problem_instance_id):
+    problem_instance = _get_model_solutions_problem_instance(request,
+            problem_instance_id)
+    matrix = get_model_solutions_matrix(problem_instance)
+    suggestions = dict((row['test'][0], row)
+                       for row in matrix.suggestions())
+    submissions = _get_model_submissions(problem_instance)
+    tests = problem_instance.test_set \
+            .order_by('order', 'group', 'name').all()
 
     submissions_percentage_statuses = {s.id: '25' for s in submissions}
     rows = []
     submissions_row = []
     for t in tests:
-        row_test_results = test_results[t.id]
-        row_group_results = group_results[t.group]
+        row_test_results = dict((s.id, matrix.get(t.id, s.id))
+                                for s in submissions)
         percentage_statuses = {s.id: '100' for s in submissions}
         for s in submissions:
             if row_test_results[s.id] is not None:
-                time_ratio = float(row_test_results[s.id].time_used) / \
-                        row_test_results[s.id].test_time_limit
+                time_ratio = float(row_test_results[s.id]['time_used']) / \
+                        row_test_results[s.id]['time_limit']
                 if time_ratio <= 0.25:
                     percentage_statuses[s.id] = '25'
                 elif time_ratio <= 0.50:
@@ -307,11 +349,11 @@ def model_solutions_view(request, problem_instance_id):
 
         rows.append({
             'test': t,
+            'suggestion': suggestions.get(t.id),
             'results': [{
                     'test_report': row_test_results[s.id],
-                    'group_report': row_group_results[s.id],
-                    'is_partial_score': s.problem_instance.controller
-                        ._is_partial_score(row_test_results[s.id]),
+                    'is_partial_score': row_test_results[s.id] is not None
+                        and row_test_results[s.id]['is_partial_score'],
                     'percentage_status': percentage_statuses[s.id]
                     }
                 for s in submissions
@@ -339,6 +381,33 @@ def model_solutions_view(request, problem_instance_id):
             context)
 
 
+def model_solutions_csv_view(request, problem_instance_id):
+    problem_instance = _get_model_solutions_problem_instance(request,
+            problem_instance_id)
+    matrix = get_model_solutions_matrix(problem_instance)
+    submissions = _get_model_submissions(problem_instance)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = \
+            make_content_disposition_header('attachment',
+                u'%s-%s.csv' % (_("model-solutions"),
+                                problem_instance.short_name))
+    writer = unicodecsv.writer(response)
+    writer.writerow(map(force_unicode, [_("Test"), _("Group"),
+            _("Time limit")] + [s.model_solution.short_name for s in submissions]
+            + [_("Slowest"), _("Suggested limit"),
+               _("Suggested group limit"), _("Flag")]))
+    for row in matrix.suggestions():
+        test_id, name, group, time_limit = row['test']
+        results = [matrix.get(test_id, s.id) for s in submissions]
+        writer.writerow(map(force_unicode, [name, group, time_limit]
+                + [r['time_used'] if r and r['status'] == 'OK'
+                   else (r['status'] if r else '') for r in results]
+                + [row['slowest'], row['suggested'], row['group_suggested'],
+                   row['flag']]))
+    return response
+
+
 def rejudge_model_solutions_view(request, problem_instance_id):
     problem_instance = \
             get_object_or_404(ProblemInstance, id=problem_instance_id)
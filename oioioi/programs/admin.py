@@ -54,7 +54,7 @@ class TestInline(admin.TabularInline):
             href = reverse('oioioi.programs.views.download_input_file_view',
                     kwargs={'test_id': str(instance.id)})
             return make_html_link(href,
-                                  instance.input_file.name.split('/')[-1])
+                                  instance.input_file_download_name())
         return None
     input_file_link.short_description = _("Input file")
 
@@ -63,7 +63,7 @@ class TestInline(admin.TabularInline):
             href = reverse('oioioi.programs.views.download_output_file_view',
                     kwargs={'test_id': instance.id})
             return make_html_link(href,
-                                  instance.output_file.name.split('/')[-1])
+                                  instance.output_file_download_name())
         return None
     output_file_link.short_description = _("Output/hint file")
 
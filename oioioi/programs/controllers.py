@@ -244,6 +244,28 @@ class ProgrammingProblemController(ProblemController):
                     ('update_submission_score',
                         'oioioi.contests.handlers.update_submission_score'))
 
+        if ModelProgramSubmission.objects.filter(id=submission.id).exists():
+            self._fill_model_solution_environ(environ)
+
+    def _fill_model_solution_environ(self, environ):
+        """Moves evaluation of a model solution to the separate queues
+           optionally configured in ``settings.MODEL_SOLUTIONS_EVALMGR_QUEUE``
+           and ``settings.MODEL_SOLUTIONS_SIOWORKERS_QUEUE`` and analyzes
+           the results once all model solutions are judged.
+        """
+        if settings.MODEL_SOLUTIONS_EVALMGR_QUEUE:
+            environ['recipe'].insert(0, ('postpone_model_solution',
+                    'oioioi.evalmgr.handlers.postpone',
+                    dict(queue=settings.MODEL_SOLUTIONS_EVALMGR_QUEUE)))
+        if settings.MODEL_SOLUTIONS_SIOWORKERS_QUEUE:
+            extra_args = environ.setdefault('sioworkers_extra_args', {})
+            for kind in ('EXAMPLE', 'NORMAL'):
+                extra_args.setdefault(kind, {})['queue'] = \
+                        settings.MODEL_SOLUTIONS_SIOWORKERS_QUEUE
+        environ.setdefault('after_judging_steps', []).append(
+                ('analyze_model_solutions',
+                    'oioioi.programs.handlers.analyze_model_solutions'))
+
     def _map_report_to_submission_status(self, status, problem_instance,
                                          kind='INITIAL'):
         if kind == 'INITIAL':
@@ -5,9 +5,10 @@ from oioioi.base.utils import get_object_by_dotted_name, make_html_link
 from oioioi.sioworkers.jobs import run_sioworkers_job, run_sioworkers_jobs
 from oioioi.contests.scores import ScoreValue, IntegerScore
 from oioioi.contests.models import Submission, SubmissionReport, \
-        ScoreReport
+        ScoreReport, ProblemInstance
 from oioioi.programs.models import CompilationReport, TestReport, \
-        GroupReport, Test, UserOutGenStatus
+        GroupReport, Test, UserOutGenStatus, ModelProgramSubmission
+from oioioi.programs.model_solutions import get_model_solutions_matrix
 from oioioi.programs.utils import slice_str
 from oioioi.problems.models import Problem
 from oioioi.filetracker.client import get_client
@@ -615,3 +616,19 @@ def insert_existing_submission_link(env, **kwargs):
     src_submission.save()
 
     return env
+
+
+def analyze_model_solutions(env, **kwargs):
+    """Rebuilds the cached results of model solutions of the problem
+       instance (see :mod:`oioioi.programs.model_solutions`) once all of
+       them are judged, so that they are not computed when viewed.
+
+       Used ``environ`` keys:
+           * ``problem_instance_id``
+    """
+    problem_instance = ProblemInstance.objects.get(
+            id=env['problem_instance_id'])
+    if not ModelProgramSubmission.objects.filter(
+            problem_instance=problem_instance, status='?').exists():
+        get_model_solutions_matrix(problem_instance, refresh=True)
+    return env
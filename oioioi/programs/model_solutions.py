@@ -0,0 +1,201 @@
+"""Results of model solutions, shown in
+   :func:`~oioioi.problems.views.model_solutions_view`.
+
+   The matrix of results (model solution x test) of a problem instance and
+   time limit suggestions based on it are computed once after its model
+   solutions are judged (see
+   :func:`~oioioi.programs.handlers.analyze_model_solutions`) and then kept
+   in the cache until they are judged again or the tests change.
+"""
+
+import hashlib
+import math
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from oioioi.contests.models import SubmissionReport
+from oioioi.programs.models import Test, TestReport, ModelProgramSubmission
+
+# Bump the suffix whenever the cached TimingMatrix changes its layout.
+MATRIX_CACHE_KEY = 'model_solutions_matrix:%d:2'
+
+# Time limits are suggested in multiples of this number of milliseconds.
+TIME_LIMIT_GRANULARITY = 100
+
+
+class TimingMatrix(object):
+    """Results of model solutions on tests of a problem instance.
+
+       Results are kept in flat arrays indexed by ``test_index *
+       len(submission_ids) + submission_index``, so the matrix stays small
+       even for many tests.
+    """
+
+    def __init__(self, tests, submissions):
+        """``tests`` is a list of ``(id, name, group, time_limit)`` and
+           ``submissions`` is a list of ``(id, model solution kind)``.
+        """
+        self.tests = tests
+        self.test_index = dict((test[0], i) for i, test in enumerate(tests))
+        self.submission_ids = [submission[0] for submission in submissions]
+        self.submission_kinds = [submission[1] for submission in submissions]
+        self.submission_index = dict((submission_id, i) for i, submission_id
+                                     in enumerate(self.submission_ids))
+        size = len(tests) * len(submissions)
+        # Statuses are stored as indexes in self.statuses, -1 marks
+        # a missing result.
+        self.statuses = []
+        self._status_codes = {}
+        self.status_codes = array('b', [-1]) * size
+        self.times = array('l', [0]) * size
+        # Time limits the results were judged with, which may differ from
+        # the current limits of the tests. 0 marks an unknown limit.
+        self.time_limits = array('l', [0]) * size
+        self.partial = array('b', [0]) * size
+
+    def _index(self, test_id, submission_id):
+        test_index = self.test_index.get(test_id)
+        submission_index = self.submission_index.get(submission_id)
+        if test_index is None or submission_index is None:
+            return None
+        return test_index * len(self.submission_ids) + submission_index
+
+    def set(self, test_id, submission_id, status, time_used, time_limit,
+            is_partial):
+        index = self._index(test_id, submission_id)
+        if index is None:
+            return
+        if status not in self._status_codes:
+            self._status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        self.status_codes[index] = self._status_codes[status]
+        self.times[index] = time_used or 0
+        self.time_limits[index] = time_limit or 0
+        self.partial[index] = bool(is_partial)
+
+    def get(self, test_id, submission_id):
+        """Returns a dictionary with ``status``, ``time_used``,
+           ``time_limit`` (the one the test was judged with) and
+           ``is_partial_score`` or ``None`` if there is no result.
+        """
+        index = self._index(test_id, submission_id)
+        if index is None or self.status_codes[index] < 0:
+            return None
+        return {
+            'status': self.statuses[self.status_codes[index]],
+            'time_used': self.times[index],
+            'time_limit': self.time_limits[index] or None,
+            'is_partial_score': bool(self.partial[index]),
+        }
+
+    def slowest_model_time(self, test_id):
+        """Returns the longest time of a correct (``NORMAL``) model solution
+           which passed the test or ``None``.
+        """
+        row = self.test_index[test_id] * len(self.submission_ids)
+        times = [self.times[row + i]
+                 for i, kind in enumerate(self.submission_kinds)
+                 if kind == 'NORMAL' and self.status_codes[row + i] >= 0
+                 and self.statuses[self.status_codes[row + i]] == 'OK']
+        return max(times) if times else None
+
+    def suggestions(self):
+        """Returns a list of dictionaries with ``test`` (a tuple passed to
+           the constructor), ``slowest`` (see :meth:`slowest_model_time`),
+           ``suggested`` time limit of the test, ``group_suggested`` time
+           limit of its group and ``flag``, which is ``'tight'`` or
+           ``'loose'`` if the current limit is too close to or too far from
+           the slowest model solution, or ``None``.
+        """
+        result = []
+        group_suggested = {}
+        for test in self.tests:
+            slowest = self.slowest_model_time(test[0])
+            suggested = flag = None
+            if slowest is not None:
+                suggested = _round_time_limit(slowest *
+                        settings.MODEL_SOLUTIONS_TIME_LIMIT_FACTOR +
+                        settings.MODEL_SOLUTIONS_TIME_LIMIT_MARGIN)
+                group_suggested[test[2]] = max(suggested,
+                        group_suggested.get(test[2], 0))
+                time_limit = test[3]
+                if time_limit is not None:
+                    if time_limit < slowest * \
+                            settings.MODEL_SOLUTIONS_TIGHT_LIMIT_FACTOR:
+                        flag = 'tight'
+                    elif time_limit > max(slowest, 1) * \
+                            settings.MODEL_SOLUTIONS_LOOSE_LIMIT_FACTOR:
+                        flag = 'loose'
+            result.append({'test': test, 'slowest': slowest,
+                           'suggested': suggested, 'flag': flag})
+        for row in result:
+            row['group_suggested'] = group_suggested.get(row['test'][2])
+        return result
+
+
+def _round_time_limit(time_limit):
+    return int(math.ceil(float(time_limit) / TIME_LIMIT_GRANULARITY)) \
+            * TIME_LIMIT_GRANULARITY
+
+
+def _model_submission_reports(problem_instance):
+    return SubmissionReport.objects.filter(
+            submission__problem_instance=problem_instance,
+            submission__programsubmission__modelprogramsubmission__isnull=False,
+            status='ACTIVE')
+
+
+def _tests(problem_instance):
+    return list(Test.objects.filter(problem_instance=problem_instance)
+            .order_by('order', 'group', 'name')
+            .values_list('id', 'name', 'group', 'time_limit'))
+
+
+def _matrix_version(problem_instance, tests):
+    """Returns a value which changes whenever model solutions of
+       the problem instance are judged or recreated, or its tests change.
+    """
+    result = _model_submission_reports(problem_instance) \
+            .aggregate(last=Max('id'), count=Count('id'))
+    return result['last'], result['count'], \
+            hashlib.md5(repr(tests)).hexdigest()
+
+
+def _build_matrix(problem_instance, tests):
+    submissions = ModelProgramSubmission.objects \
+            .filter(problem_instance=problem_instance) \
+            .order_by('model_solution__order_key') \
+            .values_list('id', 'model_solution__kind')
+    matrix = TimingMatrix(tests, list(submissions))
+
+    controller = problem_instance.problem.controller
+    test_reports = TestReport.objects.filter(test__isnull=False,
+            submission_report__in=_model_submission_reports(problem_instance)) \
+            .select_related('submission_report') \
+            .only('test', 'status', 'score', 'time_used', 'test_time_limit',
+                  'test_max_score', 'submission_report__submission')
+    for report in test_reports:
+        matrix.set(report.test_id, report.submission_report.submission_id,
+                report.status, report.time_used, report.test_time_limit,
+                controller._is_partial_score(report))
+    return matrix
+
+
+def get_model_solutions_matrix(problem_instance, refresh=False):
+    """Returns the :class:`TimingMatrix` of the model submissions of
+       the given problem instance, building it only if the cached one is
+       out of date or ``refresh`` is set.
+    """
+    key = MATRIX_CACHE_KEY % problem_instance.id
+    tests = _tests(problem_instance)
+    version = _matrix_version(problem_instance, tests)
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    matrix = _build_matrix(problem_instance, tests)
+    cache.set(key, (version, matrix), None)
+    return matrix
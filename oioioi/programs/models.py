@@ -50,6 +50,19 @@ class Test(models.Model):
     def __unicode__(self):
         return self.name
 
+    def input_file_download_name(self):
+        """Returns the name under which the input file is downloaded.
+
+           Names of test files in Filetracker may be meaningless, as they
+           can be content-addressed (see
+           :func:`~oioioi.filetracker.utils.save_content_addressed`).
+        """
+        return '%s%s.in' % (self.problem.short_name, self.name)
+
+    def output_file_download_name(self):
+        """Returns the name under which the output file is downloaded."""
+        return '%s%s.out' % (self.problem.short_name, self.name)
+
     class Meta(object):
         ordering = ['order']
         verbose_name = _("test")
@@ -90,6 +103,13 @@ model_solution_kinds.register('INCORRECT', _("Incorrect solution"))
 
 class ModelSolutionsManager(models.Manager):
     def recreate_model_submissions(self, problem_instance):
+        """Replaces model submissions of the problem instance with new ones
+           and sends them for evaluation as one batch.
+
+           Model submissions may be evaluated in a separate queue (see
+           ``settings.MODEL_SOLUTIONS_EVALMGR_QUEUE``), so that they do not
+           delay contestants' submissions.
+        """
         with transaction.atomic():
             for model_submission in ModelProgramSubmission.objects.filter(
                     problem_instance=problem_instance):
@@ -97,16 +117,26 @@ class ModelSolutionsManager(models.Manager):
         if not problem_instance.round and \
                 problem_instance.contest is not None:
             return
-        for model_solution in self.filter(problem=problem_instance.problem):
-            with transaction.atomic():
+        with transaction.atomic():
+            submissions = []
+            for model_solution in self.filter(
+                    problem=problem_instance.problem):
                 submission = ModelProgramSubmission(
                         model_solution=model_solution,
                         problem_instance=problem_instance,
                         source_file=model_solution.source_file,
                         kind='IGNORED')
                 submission.save()
+                submissions.append(submission)
+        for submission in submissions:
             problem_instance.controller.judge(submission, is_rejudge=True)
 
+    def recreate_all_model_submissions(self, problem):
+        """Recreates model submissions of all instances of the problem."""
+        for problem_instance in ProblemInstance.objects.filter(
+                problem=problem):
+            self.recreate_model_submissions(problem_instance)
+
 
 class ModelSolution(models.Model):
     objects = ModelSolutionsManager()
@@ -147,10 +177,11 @@ def _autocreate_model_submissions_for_problem_instance(sender, instance,
 @receiver(post_save, sender=ModelSolution)
 def _autocreate_model_submissions_for_model_solutions(sender, instance,
         created, raw, **kwargs):
+    # Model solutions created in bulk (e.g. when unpacking a problem
+    # package) do not send this signal, their creators recreate model
+    # submissions once for all of them.
     if created and not raw:
-        pis = ProblemInstance.objects.filter(problem=instance.problem)
-        for pi in pis:
-            ModelSolution.objects.recreate_model_submissions(pi)
+        ModelSolution.objects.recreate_all_model_submissions(instance.problem)
 
 
 def make_submission_filename(instance, filename):
@@ -17,7 +17,9 @@ from oioioi.contests.models import Submission, ProblemInstance, Contest
 from oioioi.contests.tests import PrivateRegistrationController, \
         SubmitFileMixin
 from oioioi.programs.models import Test, ModelSolution, ProgramSubmission, \
-        TestReport, ReportActionsConfig
+        TestReport, ReportActionsConfig, ModelProgramSubmission
+from oioioi.programs.model_solutions import TimingMatrix, \
+        get_model_solutions_matrix
 from oioioi.programs.controllers import ProgrammingContestController
 from oioioi.sinolpack.tests import get_test_filename
 from oioioi.contests.scores import IntegerScore
@@ -128,6 +130,77 @@ class TestProgramsViews(TestCase, TestStreamingMixin):
         self.assertEqual(response.content.count('subm_status subm_CE'), 2)
         self.assertEqual(response.content.count('>10.00s<'), 5)
 
+    def test_model_solutions_matrix_cache(self):
+        pi = ProblemInstance.objects.get()
+        ModelSolution.objects.recreate_model_submissions(pi)
+        matrix = get_model_solutions_matrix(pi)
+        self.assertTrue(matrix.submission_ids)
+        with self.assertNumQueries(2):
+            self.assertEqual(get_model_solutions_matrix(pi).submission_ids,
+                             matrix.submission_ids)
+
+        ModelSolution.objects.recreate_model_submissions(pi)
+        submission_ids = set(ModelProgramSubmission.objects
+                .filter(problem_instance=pi).values_list('id', flat=True))
+        matrix = get_model_solutions_matrix(pi)
+        self.assertEqual(set(matrix.submission_ids), submission_ids)
+        test = Test.objects.filter(problem_instance=pi).first()
+        judged_limit = test.time_limit
+        for submission_id in submission_ids:
+            result = matrix.get(test.id, submission_id)
+            if result is not None:
+                self.assertEqual(result['time_limit'], judged_limit)
+
+        # Results keep the limit they were judged with.
+        test.time_limit = judged_limit * 2
+        test.save()
+        matrix = get_model_solutions_matrix(pi)
+        for submission_id in submission_ids:
+            result = matrix.get(test.id, submission_id)
+            if result is not None:
+                self.assertEqual(result['time_limit'], judged_limit)
+        self.assertEqual(dict((row['test'][0], row['test'][3])
+                              for row in matrix.suggestions())[test.id],
+                         judged_limit * 2)
+
+    def test_time_limit_suggestions(self):
+        matrix = TimingMatrix(
+                [(1, '1a', '1', 1000), (2, '1b', '1', 1000),
+                 (3, '2a', '2', 100), (4, '3a', '3', 1000)],
+                [(10, 'NORMAL'), (11, 'NORMAL'), (12, 'SLOW')])
+        for test_id, time_used in [(1, 50), (2, 150), (3, 90), (4, 20)]:
+            matrix.set(test_id, 10, 'OK', time_used, 1000, False)
+        matrix.set(1, 11, 'OK', 280, 1000, False)
+        matrix.set(4, 11, 'TLE', 1000, 1000, False)
+        matrix.set(4, 12, 'OK', 900, 1000, False)
+
+        rows = dict((row['test'][0], row) for row in matrix.suggestions())
+        self.assertEqual(rows[1]['slowest'], 280)
+        self.assertEqual(rows[1]['suggested'], 1000)
+        self.assertEqual(rows[2]['suggested'], 600)
+        self.assertEqual(rows[2]['group_suggested'], 1000)
+        self.assertEqual(rows[3]['flag'], 'tight')
+        self.assertEqual(rows[4]['slowest'], 20)
+        self.assertEqual(rows[4]['flag'], 'loose')
+        self.assertIsNone(rows[1]['flag'])
+        self.assertIsNone(matrix.get(2, 11))
+        self.assertEqual(matrix.get(4, 11)['status'], 'TLE')
+
+    def test_model_solutions_csv(self):
+        pi = ProblemInstance.objects.get()
+        ModelSolution.objects.recreate_model_submissions(pi)
+        url = reverse('model_solutions_csv', args=(pi.id,))
+        check_not_accessible(self, url)
+
+        self.client.login(username='test_admin')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = response.content.splitlines()
+        self.assertEqual(len(lines), Test.objects.filter(
+                problem_instance=pi).count() + 1)
+        self.assertIn('sum', lines[0])
+
 
 class TestProgramsXssViews(TestCase, TestStreamingMixin):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
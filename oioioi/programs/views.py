@@ -1,13 +1,8 @@
 import difflib
-import zipfile
-import os
-import shutil
-import tempfile
 import logging
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied, SuspiciousOperation
-from django.core.files import File
 from django.core.urlresolvers import reverse
 from django.shortcuts import get_object_or_404, redirect
 from django.http import Http404, HttpResponse
@@ -28,7 +23,7 @@ from oioioi.programs.utils import decode_str, \
 from oioioi.contests.utils import contest_exists, can_enter_contest, \
         get_submission_or_error, is_contest_admin
 from oioioi.base.permissions import enforce_condition
-from oioioi.filetracker.utils import stream_file
+from oioioi.filetracker.utils import stream_file, stream_zip_file
 from oioioi.problems.utils import can_admin_problem_instance, \
         get_submission_source_file_without_contest_or_error
 
@@ -231,14 +226,14 @@ def download_input_file_view(request, test_id):
 
     if not can_admin_problem_instance(request, test.problem):
         raise PermissionDenied
-    return stream_file(test.input_file)
+    return stream_file(test.input_file, test.input_file_download_name())
 
 
 def download_output_file_view(request, test_id):
     test = get_object_or_404(Test, id=test_id)
     if not can_admin_problem_instance(request, test.problem):
         raise PermissionDenied
-    return stream_file(test.output_file)
+    return stream_file(test.output_file, test.output_file_download_name())
 
 
 def download_checker_exe_view(request, checker_id):
@@ -306,23 +301,12 @@ def download_user_all_output_view(request, submission_report_id):
         for report in testreports:
             _check_generated_out_visibility_for_user(report)
 
-    zipfd, tmp_zip_filename = tempfile.mkstemp()
-    with zipfile.ZipFile(os.fdopen(zipfd, 'wb'), 'w') as zip:
-        for report in testreports:
-            arcname = _userout_filename(report)
-            testfd, tmp_test_filename = tempfile.mkstemp()
-            fileobj = os.fdopen(testfd, 'wb')
-            try:
-                shutil.copyfileobj(report.output_file, fileobj)
-                fileobj.close()
-                zip.write(tmp_test_filename, arcname)
-            finally:
-                os.unlink(tmp_test_filename)
-
-        name = submission_report.submission.problem_instance.problem.short_name
-        return stream_file(File(open(tmp_zip_filename, 'rb'),
-            name=name + '_' + str(submission_report.submission.user) +
-            '_' + str(submission_report.id) + '_user_outs.zip'))
+    name = submission_report.submission.problem_instance.problem.short_name
+    files = ((_userout_filename(report), report.output_file)
+             for report in testreports)
+    return stream_zip_file(files, name + '_' +
+            str(submission_report.submission.user) + '_' +
+            str(submission_report.id) + '_user_outs.zip')
 
 
 def _testreports_to_generate_outs(request, testreports):
@@ -10,12 +10,15 @@ from django.utils.text import Truncator
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 
 from oioioi.contests.models import Contest, Round, ProblemInstance
 from oioioi.base.fields import EnumRegistry, EnumField
+from oioioi.base.utils import group_cache
 from oioioi.base.utils.validators import validate_whitespaces
-from oioioi.questions.utils import send_email_about_new_question
+from oioioi.questions.utils import send_email_about_new_question, \
+        invalidate_topic_version, MESSAGES_CACHE_GROUP, \
+        MESSAGE_VIEWS_CACHE_GROUP
 
 message_kinds = EnumRegistry()
 message_kinds.register('QUESTION', _("Question"))
@@ -114,6 +117,28 @@ class MessageView(models.Model):
         unique_together = ('message', 'user')
 
 
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def _invalidate_messages_cache(sender, instance, **kwargs):
+    group_cache.invalidate(MESSAGES_CACHE_GROUP % instance.contest_id)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def _invalidate_topic_version(sender, instance, **kwargs):
+    if instance.top_reference_id is not None:
+        invalidate_topic_version(instance.top_reference_id)
+
+
+@receiver(post_save, sender=MessageView)
+@receiver(post_delete, sender=MessageView)
+def _invalidate_message_views_cache(sender, instance, **kwargs):
+    contest_id = Message.objects.filter(id=instance.message_id) \
+            .values_list('contest_id', flat=True).first()
+    group_cache.invalidate(MESSAGE_VIEWS_CACHE_GROUP
+                           % (contest_id, instance.user_id))
+
+
 class MessageNotifierConfig(models.Model):
     contest = models.ForeignKey(Contest)
     user = models.ForeignKey(User, verbose_name=_("username"))
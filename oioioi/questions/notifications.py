@@ -40,11 +40,10 @@ def notification_function_public(arguments):
         'details': message_details[:MAX_DETAILS_LENGTH]
     }
 
-    controller = arguments.contest.controller
-
-    for user in controller.users_to_receive_public_message_notification():
-        NotificationHandler.send_notification(user,
-            'new_public_message', message, message_arguments)
+    # Recipients are chosen by the Notifications Server, see
+    # ContestController.is_public_message_notification_recipient
+    NotificationHandler.send_broadcast(arguments.contest,
+        'new_public_message', message, message_arguments)
 
 NotificationHandler.register_notification('new_public_message',
         notification_function_public)
@@ -1,12 +1,68 @@
 from django.core.urlresolvers import reverse
+from django.db.models import Max
 from django.utils.translation import ungettext
 from django.utils.functional import lazy
-from oioioi.base.utils import make_navbar_badge
-from oioioi.contests.utils import can_enter_contest, is_contest_admin
-from oioioi.questions.utils import unanswered_questions
+from oioioi.base.utils import make_navbar_badge, group_cache
+from oioioi.contests.utils import can_enter_contest, is_contest_admin, \
+        visible_rounds
+from oioioi.questions.models import Message
+from oioioi.questions.utils import unanswered_questions, \
+        MESSAGES_CACHE_GROUP, MESSAGE_VIEWS_CACHE_GROUP
 from oioioi.questions.views import new_messages, visible_messages
 
 
+def _new_messages_badge(request, is_admin):
+    """Returns the number of messages to show in the navbar badge (new
+       messages or, for admins, unanswered questions) and the id of
+       the message to link to if there is exactly one.
+    """
+    messages = visible_messages(request)
+    if is_admin:
+        messages = unanswered_questions(messages)
+    else:
+        messages = new_messages(request, messages)
+    count = messages.count()
+    if count != 1:
+        return count, None
+    m = messages.get()
+    if m.top_reference_id is not None and \
+            visible_messages(request).filter(id=m.top_reference_id).exists():
+        return count, m.top_reference_id
+    return count, m.id
+
+
+def _latest_message_date(request):
+    group = MESSAGES_CACHE_GROUP % request.contest.id
+    cached = group_cache.get('latest_date', group)
+    if cached is None:
+        cached = (Message.objects.filter(contest=request.contest)
+                  .aggregate(latest=Max('date'))['latest'],)
+        group_cache.set('latest_date', group, cached,
+                        group_cache.GROUP_CACHE_INF)
+    return cached[0]
+
+
+def _cached_new_messages_badge(request, is_admin):
+    """Like :func:`_new_messages_badge`, but cached until messages of
+       the contest change or the user reads any of them.
+    """
+    latest = _latest_message_date(request)
+    if latest is not None and latest > request.timestamp:
+        # Some messages are not visible yet.
+        return _new_messages_badge(request, is_admin)
+
+    key = group_cache.generate_cache_key('navbar_badge:%s:%s:%s' % (
+            request.user.id, is_admin,
+            ','.join(str(r.id) for r in visible_rounds(request))),
+        MESSAGES_CACHE_GROUP % request.contest.id)
+    group = MESSAGE_VIEWS_CACHE_GROUP % (request.contest.id, request.user.id)
+    result = group_cache.get(key, group)
+    if result is None:
+        result = _new_messages_badge(request, is_admin)
+        group_cache.set(key, group, result, group_cache.GROUP_CACHE_INF)
+    return result
+
+
 def navbar_tip_processor(request):
     if not getattr(request, 'contest', None):
         return {}
@@ -16,24 +72,16 @@ def navbar_tip_processor(request):
         return {}
 
     def generator():
-        is_admin = is_contest_admin(request)
-        messages = visible_messages(request)
-        visible_ids = messages.values_list('id', flat=True)
-        if is_admin:
-            messages = unanswered_questions(messages)
-        else:
-            messages = new_messages(request, messages)
-        count = messages.count()
+        count, message_id = _cached_new_messages_badge(request,
+                is_contest_admin(request))
         if count:
             text = ungettext('%(count)d NEW MESSAGE', '%(count)d NEW MESSAGES',
                     count) % {'count': count}
 
             if count == 1:
-                m = messages.get()
                 link = reverse('message', kwargs={
                         'contest_id': request.contest.id,
-                        'message_id': m.top_reference_id
-                            if m.top_reference_id in visible_ids else m.id
+                        'message_id': message_id,
                     })
             else:
                 link = reverse('contest_messages', kwargs={'contest_id':
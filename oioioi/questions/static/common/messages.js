@@ -1,5 +1,6 @@
 var newAnswersConfig = {};
 newAnswersConfig.pollingTimeout = 5000;
+newAnswersConfig.version = undefined;
 newAnswersConfig.loadDateSeconds = 0;
 newAnswersConfig.visited = {};
 newAnswersConfig.toDismiss = 0;
@@ -61,14 +62,22 @@ function beginCheckAnswersInMeantime(url, initialDate) {
 }
 
 // This function checks if any new answers were made in the meantime
-// after user started composing an answer.
+// after user started composing an answer. With gevent, the server may hold
+// the request until replies change (up to QUESTIONS_LONG_POLL_TIMEOUT), so
+// checks are issued at most every pollingTimeout, but right after a long
+// poll.
 
 function checkAnswersInMeantime() {
     var currentUrl = newAnswersConfig.url;
-    $.getJSON(currentUrl,
-        {'timestamp': Math.round(newAnswersConfig.loadDateSeconds)},
+    var started = Date.now();
+    var params = {'timestamp': Math.round(newAnswersConfig.loadDateSeconds)};
+    if (newAnswersConfig.version) {
+        params.version = newAnswersConfig.version;
+    }
+    $.getJSON(currentUrl, params,
         function (data) {
         newAnswersConfig.loadDateSeconds = data.timestamp;
+        newAnswersConfig.version = data.version;
         $.each(data.messages, function (key, val) {
             var topic = val[0], msg = val[1], msg_id = val[2];
             if (newAnswersConfig.visited[msg_id]) {
@@ -88,10 +97,14 @@ function checkAnswersInMeantime() {
             $('#alert_' + msg_id).fadeIn();
         });
     })
-    .complete(function () {
+    .done(function () {
+        setTimeout(checkAnswersInMeantime, Math.max(0,
+                newAnswersConfig.pollingTimeout - (Date.now() - started)));
+    })
+    .fail(function () {
+        newAnswersConfig.version = undefined;
         setTimeout(checkAnswersInMeantime, newAnswersConfig.pollingTimeout);
     });
-    newAnswersConfig.loadDateSeconds = Date.now() / 1000;
 }
 
 function new_answer_reload_page() {
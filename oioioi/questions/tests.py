@@ -1,16 +1,31 @@
 import json
+import logging
+import threading
 
-from django.test import TestCase
+from datetime import datetime, timedelta
+from time import time
+
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.db import connection
+from django.utils import timezone
+from nose.plugins.attrib import attr
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 
 from oioioi.base.tests import check_not_accessible
 from oioioi.contests.models import Contest, ProblemInstance
 from oioioi.programs.controllers import ProgrammingContestController
-from oioioi.questions.models import Message, ReplyTemplate
+from oioioi.questions.models import Message, MessageView, ReplyTemplate
+from oioioi.questions.utils import invalidate_topic_version
+from oioioi.questions.views import messages_template_context, \
+        visible_messages
 from oioioi.base.notification import NotificationHandler
 
 
+logger = logging.getLogger(__name__)
+
+
 class TestContestControllerMixin(object):
     def users_to_receive_public_message_notification(self):
         return self.registration_controller().filter_participants(User
@@ -212,20 +227,15 @@ class TestQuestions(TestCase):
         NotificationHandler.send_notification = send_notification_backup
 
     def test_public_message_notification(self):
-        flags = {}
-        flags['user_1001_got_notification'] = False
-        flags['user_1002_got_notification'] = False
+        broadcasts = []
 
         @classmethod
-        def fake_send_notification(cls, user, notification_type,
+        def fake_send_broadcast(cls, contest, notification_type,
                     notification_message, notificaion_message_arguments):
-            if user.pk == 1002:
-                flags['user_1002_got_notification'] = True
-            if user.pk == 1001:
-                flags['user_1001_got_notification'] = True
+            broadcasts.append((contest.id, notification_type))
 
-        send_notification_backup = NotificationHandler.send_notification
-        NotificationHandler.send_notification = fake_send_notification
+        send_broadcast_backup = NotificationHandler.send_broadcast
+        NotificationHandler.send_broadcast = fake_send_broadcast
 
         # Test user asks a new question
         self.client.login(username='test_user2')
@@ -266,10 +276,14 @@ class TestQuestions(TestCase):
         response = self.client.post(url, post_data)
         self.assertEqual(response.status_code, 302)
 
-        self.assertTrue(flags['user_1002_got_notification'])
-        self.assertTrue(flags['user_1001_got_notification'])
+        # A single notification is broadcast to the whole contest.
+        self.assertEqual(broadcasts, [(contest.id, 'new_public_message')])
+        controller = contest.controller
+        for username in ('test_user', 'test_user2'):
+            self.assertTrue(controller.is_public_message_notification_recipient(
+                    User.objects.get(username=username)))
 
-        NotificationHandler.send_notification = send_notification_backup
+        NotificationHandler.send_broadcast = send_broadcast_backup
 
     def test_filtering(self):
         self.client.login(username='test_admin')
@@ -414,6 +428,46 @@ class TestQuestions(TestCase):
         self.client.login(username='test_user')
         check_not_accessible(self, url1)
 
+    def test_navbar_badge(self):
+        self.client.login(username='test_user')
+        contest = Contest.objects.get()
+        list_url = reverse('contest_messages',
+                kwargs={'contest_id': contest.id})
+        response = self.client.get(list_url)
+        self.assertIn('2 NEW MESSAGES', response.content)
+
+        # Reading a message updates the cached badge.
+        public_answer = Message.objects.get(topic='public-answer')
+        self.client.get(reverse('message', kwargs={
+            'contest_id': contest.id, 'message_id': public_answer.id}))
+        response = self.client.get(list_url)
+        self.assertIn('1 NEW MESSAGE', response.content)
+        self.assertIn(reverse('message', kwargs={'contest_id': contest.id,
+            'message_id': 2}), response.content)
+
+        # So does a new message.
+        Message.objects.create(contest=contest, round=public_answer.round,
+                author=User.objects.get(username='test_admin'),
+                kind='PUBLIC', topic='news', content='news-body')
+        response = self.client.get(list_url)
+        self.assertIn('2 NEW MESSAGES', response.content)
+
+    def test_dashboard_messages_limit(self):
+        self.client.login(username='test_user')
+        request = RequestFactory().request()
+        request.contest = Contest.objects.get()
+        request.user = User.objects.get(username='test_user')
+        request.timestamp = timezone.now()
+        entries = messages_template_context(request,
+                visible_messages(request))
+        self.assertEqual([e['message'].topic for e in entries],
+                         ['public-answer', 'private-answer'])
+        self.assertEqual(entries[1]['link_message'].id, 2)
+        limited = messages_template_context(request,
+                visible_messages(request), limit=1)
+        self.assertEqual([e['message'].id for e in limited],
+                         [entries[0]['message'].id])
+
     def test_check_new_messages(self):
         self.client.login(username='test_user')
         url = reverse('check_new_messages',
@@ -423,6 +477,64 @@ class TestQuestions(TestCase):
 
         self.assertEqual(data[1][0], u'private-answer')
 
+    @override_settings(QUESTIONS_LONG_POLL_TIMEOUT=0)
+    def test_check_new_messages_version(self):
+        self.client.login(username='test_admin')
+        url = reverse('check_new_messages',
+                kwargs={'contest_id': 'c', 'topic_id': 2})
+        resp = self.client.get(url, {'timestamp': 1347000000})
+        data = json.loads(resp.content)
+        self.assertEqual(len(data['messages']), 2)
+
+        # Nothing changed, so the messages are not queried again.
+        params = {'timestamp': data['timestamp'], 'version': data['version']}
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, params)
+        self.assertFalse([q for q in queries.captured_queries
+                          if 'questions_message' in q['sql']])
+        data = json.loads(resp.content)
+        self.assertEqual(data['messages'], [])
+        self.assertEqual(data['timestamp'], params['timestamp'])
+
+        question = Message.objects.get(id=2)
+        Message.objects.create(top_reference=question, kind='PRIVATE',
+                author=User.objects.get(username='test_admin'),
+                topic='re', content='new-reply',
+                date=datetime.fromtimestamp(params['timestamp']))
+        resp = self.client.get(url, params)
+        data = json.loads(resp.content)
+        self.assertNotEqual(data['version'], params['version'])
+        self.assertIn(u're', [m[0] for m in data['messages']])
+
+    @override_settings(UWSGI_USE_GEVENT=True, QUESTIONS_LONG_POLL_TIMEOUT=0.2,
+            QUESTIONS_LONG_POLL_INTERVAL=0.05)
+    def test_check_new_messages_long_poll(self):
+        self.client.login(username='test_admin')
+        url = reverse('check_new_messages',
+                kwargs={'contest_id': 'c', 'topic_id': 2})
+        resp = self.client.get(url, {'timestamp': 1347000000})
+        data = json.loads(resp.content)
+        params = {'timestamp': data['timestamp'], 'version': data['version']}
+
+        # Nothing changes, so the view waits for the whole timeout.
+        start = time()
+        resp = self.client.get(url, params)
+        self.assertGreaterEqual(time() - start, 0.2)
+        data = json.loads(resp.content)
+        self.assertEqual(data['messages'], [])
+        self.assertEqual(data['version'], params['version'])
+
+        # A change during the wait is returned as soon as it is noticed.
+        with override_settings(QUESTIONS_LONG_POLL_TIMEOUT=30):
+            timer = threading.Timer(0.1, invalidate_topic_version, [2])
+            timer.start()
+            start = time()
+            resp = self.client.get(url, params)
+            timer.join()
+        self.assertLess(time() - start, 10)
+        data = json.loads(resp.content)
+        self.assertNotEqual(data['version'], params['version'])
+
 
 class TestUserInfo(TestCase):
     fixtures = ['test_users', 'test_contest', 'test_full_package',
@@ -439,3 +551,77 @@ class TestUserInfo(TestCase):
         self.assertIn('User info', response.content)
         self.assertIn("User's messages", response.content)
         self.assertIn('general-question', response.content)
+
+
+@attr('slow')
+class TestQuestionsBenchmark(TestCase):
+    """Measures listing messages of a contest with 5000 messages and 2000
+       users. Run with ``-a slow``.
+    """
+    fixtures = ['test_users', 'test_contest', 'test_full_package',
+                'test_problem_instance']
+
+    def setUp(self):
+        contest = Contest.objects.get()
+        round = contest.round_set.get()
+        User.objects.bulk_create([User(username='bench_user%d' % i)
+                                  for i in xrange(2000)])
+        users = list(User.objects.filter(username__startswith='bench_user'))
+        admin = User.objects.get(username='test_admin')
+        date = timezone.now() - timedelta(days=1)
+        Message.objects.bulk_create([Message(contest=contest, round=round,
+                author=users[i % len(users)], kind='QUESTION',
+                topic='question%d' % i, content='body', date=date)
+                for i in xrange(2500)])
+        questions = list(Message.objects.all())
+        Message.objects.bulk_create([Message(contest=contest, round=round,
+                author=admin, kind='PRIVATE', top_reference=question,
+                topic='reply', content='body', date=date)
+                for question in questions[:2000]] +
+            [Message(contest=contest, round=round, author=admin,
+                kind='PUBLIC', topic='news%d' % i, content='body',
+                date=date) for i in xrange(500)])
+        self.user = users[0]
+        MessageView.objects.bulk_create([MessageView(message=m,
+                user=self.user) for m in Message.objects.all()[:1000]])
+
+    def _request(self, user):
+        request = RequestFactory().request()
+        request.contest = Contest.objects.get()
+        request.user = user
+        request.timestamp = timezone.now()
+        return request
+
+    def _measure(self, name, fn):
+        with CaptureQueriesContext(connection) as queries:
+            started = time()
+            result = fn()
+            elapsed = time() - started
+        logger.info("%s: %.3fs, %d queries", name, elapsed,
+                    len(queries.captured_queries))
+        return result, len(queries.captured_queries)
+
+    def test_messages_benchmark(self):
+        self.assertEqual(Message.objects.count(), 5000)
+        for user in (self.user, User.objects.get(username='test_admin')):
+            request = self._request(user)
+            entries, queries = self._measure('list (%s)' % user.username,
+                    lambda: messages_template_context(request,
+                                                      visible_messages(request)))
+            self.assertLessEqual(queries, 4)
+            self.assertTrue(entries)
+
+            request = self._request(user)
+            entries, queries = self._measure('dashboard (%s)' % user.username,
+                    lambda: messages_template_context(request,
+                            visible_messages(request), limit=8))
+            self.assertEqual(len(entries), 8)
+            self.assertLessEqual(queries, 5)
+
+        self.client.login(username=self.user.username)
+        url = reverse('contest_messages', kwargs={'contest_id': 'c'})
+        _response, first = self._measure('first page view',
+                lambda: self.client.get(url))
+        _response, second = self._measure('second page view',
+                lambda: self.client.get(url))
+        self.assertLess(second, first)
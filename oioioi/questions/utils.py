@@ -1,5 +1,8 @@
+import uuid
+
 from django.contrib.admin.models import LogEntry, ADDITION
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.mail import EmailMessage
 from django.core.urlresolvers import reverse
 from django.template.loader import render_to_string
@@ -8,6 +11,14 @@ from django.utils.translation import ugettext_lazy as _
 
 from oioioi.contests.utils import visible_rounds, visible_problem_instances
 
+# Groups (see oioioi.base.utils.group_cache) of cached data about messages
+# of a contest and about messages of a contest read by a user.
+MESSAGES_CACHE_GROUP = 'questions_messages:%s'
+MESSAGE_VIEWS_CACHE_GROUP = 'questions_message_views:%s:%s'
+
+# Version of replies to a question, changed whenever they change.
+TOPIC_VERSION_KEY = 'questions_topic_version:%s'
+
 
 # taken from django.contrib.admin.options.ModelAdmin
 def log_addition(request, object):
@@ -57,3 +68,19 @@ def get_category(message):
 def unanswered_questions(messages):
     return messages.filter(message__isnull=True, top_reference__isnull=True,
                            kind='QUESTION')
+
+
+def topic_version(topic_id):
+    """Returns a string which changes whenever a reply to the question
+       is added, edited or deleted.
+    """
+    key = TOPIC_VERSION_KEY % topic_id
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_topic_version(topic_id):
+    cache.delete(TOPIC_VERSION_KEY % topic_id)
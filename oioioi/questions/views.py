@@ -1,5 +1,6 @@
 import datetime
 import calendar
+import time
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
@@ -19,12 +20,20 @@ from oioioi.base.utils.user_selection import get_user_hints_view
 from oioioi.contests.utils import can_enter_contest, is_contest_admin, \
     visible_rounds, contest_exists
 from oioioi.questions.utils import get_categories, log_addition, \
-    unanswered_questions
+    unanswered_questions, topic_version
 from oioioi.questions.forms import AddContestMessageForm, AddReplyForm, \
     FilterMessageForm, FilterMessageAdminForm
 from oioioi.questions.models import Message, MessageView, ReplyTemplate, \
     new_question_signal
 
+# uwsgi does not monkey-patch the standard library in its gevent loop, so
+# time.sleep() would block all requests handled by the worker. Without
+# gevent there is no such loop, and long polling is disabled anyway.
+try:
+    from gevent import sleep as _long_poll_sleep
+except ImportError:
+    _long_poll_sleep = time.sleep
+
 
 def visible_messages(request, author=None, category=None):
     rounds_ids = [round.id for round in visible_rounds(request)]
@@ -64,26 +73,57 @@ def request_time_seconds(request):
     return calendar.timegm(request.timestamp.timetuple())
 
 
-def messages_template_context(request, messages):
-    replied_ids = frozenset(m.top_reference_id for m in messages)
-    new_ids = new_messages(request, messages).values_list('id', flat=True)
+def _read_message_ids(request):
+    if not request.user.is_authenticated():
+        return None
+    return frozenset(MessageView.objects
+            .filter(user=request.user, message__contest=request.contest)
+            .values_list('message_id', flat=True))
+
+
+def messages_template_context(request, messages, limit=None):
+    """Returns a list of entries to show on a list of messages: questions
+       without visible replies and replies, the ones needing a reply and
+       then the newest first.
+
+       If ``limit`` is given, only the first ``limit`` entries are returned
+       and only their messages are fetched from the database.
+    """
+    if limit is None:
+        by_id = dict((m.id, m) for m in messages)
+        rows = [(m.id, m.top_reference_id, m.date) for m in by_id.values()]
+    else:
+        rows = list(messages.values_list('id', 'top_reference_id', 'date'))
+    visible_ids = frozenset(message_id for message_id, _top, _date in rows)
+    replied_ids = frozenset(top_reference_id
+                            for _id, top_reference_id, _date in rows)
 
     if is_contest_admin(request):
-        unanswered = unanswered_questions(messages)
+        unanswered = frozenset(unanswered_questions(messages)
+                               .values_list('id', flat=True))
     else:
-        unanswered = []
-
-    to_display = [{
+        unanswered = frozenset()
+
+    entries = sorted(((message_id in unanswered, date, message_id)
+                      for message_id, _top, date in rows
+                      if message_id not in replied_ids), reverse=True)
+    if limit is not None:
+        entries = entries[:limit]
+        by_id = messages.in_bulk([message_id for _needs_reply, _date,
+                                  message_id in entries])
+
+    read_ids = _read_message_ids(request)
+    to_display = []
+    for needs_reply, _date, message_id in entries:
+        m = by_id[message_id]
+        to_display.append({
             'message': m,
             'link_message': m.top_reference
-                    if m.top_reference in messages else m,
-            'needs_reply': m in unanswered,
-            'read': m.id not in new_ids,
-        } for m in messages if m.id not in replied_ids]
-
-    def key(entry):
-        return entry['needs_reply'], entry['message'].date
-    to_display.sort(key=key, reverse=True)
+                    if m.top_reference_id in visible_ids else m,
+            'needs_reply': needs_reply,
+            'read': read_ids is None or m.id in read_ids or
+                    m.author_id == request.user.id,
+        })
     return to_display
 
 
@@ -228,7 +268,34 @@ def increment_template_usage_view(request, template_id=None):
 @jsonify
 @enforce_condition(contest_exists)
 def check_new_messages_view(request, topic_id):
+    """Returns replies to the question posted since ``timestamp``.
+
+       If the client passes the ``version`` of the replies returned
+       before, the view returns no messages if it did not change. With
+       ``settings.UWSGI_USE_GEVENT``, it first waits up to
+       ``settings.QUESTIONS_LONG_POLL_TIMEOUT`` seconds for the change,
+       looking only at the cache. It sleeps with ``gevent.sleep``, so that
+       other requests of the uwsgi worker are handled meanwhile.
+    """
     timestamp = request.GET['timestamp']
+    version = request.GET.get('version')
+    if version:
+        timeout = 0
+        if settings.UWSGI_USE_GEVENT:
+            timeout = settings.QUESTIONS_LONG_POLL_TIMEOUT
+        deadline = time.time() + timeout
+        while topic_version(topic_id) == version \
+                and time.time() < deadline:
+            _long_poll_sleep(settings.QUESTIONS_LONG_POLL_INTERVAL)
+        if topic_version(topic_id) == version:
+            # Nothing changed, so the client should ask about the same
+            # period again.
+            return {'timestamp': int(timestamp), 'messages': [],
+                    'version': version}
+
+    # The version is read before the messages, so a reply added meanwhile
+    # is returned now or on the next request.
+    version = topic_version(topic_id)
     unix_date = datetime.datetime.fromtimestamp(int(timestamp))
     output = [[x.topic,
               Truncator(x.content)
@@ -237,4 +304,5 @@ def check_new_messages_view(request, topic_id):
               for x in visible_messages(request)
               .filter(top_reference_id=topic_id)
               .filter(date__gte=unix_date)]
-    return {'timestamp': request_time_seconds(request), 'messages': output}
+    return {'timestamp': request_time_seconds(request), 'messages': output,
+            'version': version}
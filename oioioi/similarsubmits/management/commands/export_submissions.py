@@ -1,9 +1,9 @@
 # ~*~ encoding: utf-8 ~*~
 import csv
 import os
-import shutil
 import tarfile
-import tempfile
+import time
+from cStringIO import StringIO
 from optparse import make_option
 
 from django.core.exceptions import ObjectDoesNotExist
@@ -11,6 +11,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Q
 from django.utils.encoding import force_unicode
 
+from oioioi.base.utils.streaming_zip import stream_zip
 from oioioi.contests.models import Contest, Round
 from oioioi.filetracker.client import get_client
 from oioioi.filetracker.utils import django_to_filetracker_path
@@ -20,7 +21,9 @@ from oioioi.programs.models import ProgramSubmission
 
 class Command(BaseCommand):
     args = "contest archive_file"
-    help = "Prepare archive containing similar submissions' sources."
+    help = "Prepare archive containing similar submissions' sources. " \
+           "The archive is a zip file if its name ends with .zip, " \
+           "a gzipped tarball otherwise."
 
     option_list = BaseCommand.option_list + (
         make_option('-r', '--round',
@@ -107,25 +110,47 @@ class Command(BaseCommand):
 
         submissions_list = self.collect_submissions(contest_id, **options)
 
-        tmpdir = tempfile.mkdtemp()
-        try:
-            files_dir = os.path.join(tmpdir, contest_id)
-            os.mkdir(files_dir, 0700)
-            with open(os.path.join(files_dir, 'INDEX'), 'w') as f:
-                index_csv = csv.writer(f)
-
-                for submission in submissions_list:
-                    index_csv.writerow([c.encode('utf8')
-                                        for c in submission['index_entry']])
-
-            ft = get_client()
-            for s in submissions_list:
-                ft_file = django_to_filetracker_path(
-                        s['submission'].source_file)
-                ft.get_file(ft_file, os.path.join(files_dir, s['filename']),
-                        add_to_cache=False)
-
-            with tarfile.open(out_file, 'w:gz') as tar:
-                tar.add(files_dir, arcname=contest_id)
-        finally:
-            shutil.rmtree(tmpdir)
+        index = StringIO()
+        index_csv = csv.writer(index)
+        for submission in submissions_list:
+            index_csv.writerow([c.encode('utf8')
+                                for c in submission['index_entry']])
+        index.seek(0)
+
+        ft = get_client()
+        files = [('INDEX', index)]
+        files.extend((s['filename'], django_to_filetracker_path(
+                s['submission'].source_file)) for s in submissions_list)
+
+        # Sources are copied from Filetracker streams straight into the
+        # archive, without staging them in a temporary directory.
+        if out_file.lower().endswith('.zip'):
+            self._write_zip(out_file, contest_id, ft, files)
+        else:
+            self._write_tar(out_file, contest_id, ft, files)
+
+    def _write_zip(self, out_file, contest_id, ft, files):
+        def _members():
+            for name, source in files:
+                if isinstance(source, basestring):
+                    source = ft.get_stream(source)[0]
+                yield os.path.join(contest_id, name), source
+
+        with open(out_file, 'wb') as f:
+            for chunk in stream_zip(_members()):
+                f.write(chunk)
+
+    def _write_tar(self, out_file, contest_id, ft, files):
+        with tarfile.open(out_file, 'w:gz') as tar:
+            for name, source in files:
+                info = tarfile.TarInfo(os.path.join(contest_id, name))
+                info.mtime = time.time()
+                if isinstance(source, basestring):
+                    info.size = ft.file_size(source)
+                    source = ft.get_stream(source)[0]
+                else:
+                    info.size = len(source.getvalue())
+                try:
+                    tar.addfile(info, source)
+                finally:
+                    source.close()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0003_auto_20150420_2002'),
+        ('sinolpack', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestFingerprint',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('input_hash', models.CharField(max_length=64)),
+                ('output_hash', models.CharField(max_length=64, blank=True)),
+                ('ingen_hash', models.CharField(max_length=64, blank=True)),
+                ('outgen_hash', models.CharField(max_length=64, blank=True)),
+                ('inwer_hash', models.CharField(max_length=64, blank=True)),
+                ('test', models.OneToOneField(related_name='sinolpack_fingerprint', to='programs.Test')),
+            ],
+            options={
+                'verbose_name': 'test fingerprint',
+                'verbose_name_plural': 'test fingerprints',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
 from oioioi.problems.models import Problem, make_problem_filename
+from oioioi.programs.models import Test
 from oioioi.filetracker.fields import FileField
 
 
@@ -43,3 +44,22 @@ class OriginalPackage(models.Model):
     class Meta(object):
         verbose_name = _("original problem package")
         verbose_name_plural = _("original problem packages")
+
+
+class TestFingerprint(models.Model):
+    """Hashes of the files of a test and of the programs used to prepare it.
+
+       When a package is uploaded again, they allow skipping upload,
+       output generation and verification of tests which have not changed.
+       Hashes of programs are empty if a program was not used.
+    """
+    test = models.OneToOneField(Test, related_name='sinolpack_fingerprint')
+    input_hash = models.CharField(max_length=64)
+    output_hash = models.CharField(max_length=64, blank=True)
+    ingen_hash = models.CharField(max_length=64, blank=True)
+    outgen_hash = models.CharField(max_length=64, blank=True)
+    inwer_hash = models.CharField(max_length=64, blank=True)
+
+    class Meta(object):
+        verbose_name = _("test fingerprint")
+        verbose_name_plural = _("test fingerprints")
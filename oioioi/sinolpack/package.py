@@ -1,14 +1,18 @@
 import glob
+import hashlib
+import itertools
 import logging
 import re
 import shutil
 import tempfile
+import threading
 import os
-import zipfile
 import chardet
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.core.validators import slug_re
 from django.utils.translation import ugettext as _
 from django.core.files import File
@@ -23,10 +27,12 @@ from oioioi.problems.package import ProblemPackageBackend, \
         ProblemPackageError
 from oioioi.programs.models import Test, OutputChecker, ModelSolution, \
         LibraryProblemData
-from oioioi.sinolpack.models import ExtraConfig, ExtraFile, OriginalPackage
+from oioioi.sinolpack.models import ExtraConfig, ExtraFile, OriginalPackage, \
+        TestFingerprint
 from oioioi.sinolpack.utils import add_extra_files
-from oioioi.filetracker.utils import stream_file, django_to_filetracker_path, \
-        filetracker_to_django_file
+from oioioi.filetracker.utils import stream_file, stream_zip_file, \
+        django_to_filetracker_path, filetracker_to_django_file, \
+        save_content_addressed
 from oioioi.filetracker.client import get_client
 from oioioi.sioworkers.jobs import run_sioworkers_job, run_sioworkers_jobs
 
@@ -61,6 +67,25 @@ def _decode(title, file):
     return title.decode(encoding)
 
 
+def _file_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _submittable_extensions():
+    return [ext for lang_exts in
+            getattr(settings, 'SUBMITTABLE_EXTENSIONS', {}).values()
+            for ext in lang_exts]
+
+
+def _test_values(test):
+    return (test.input_file.name, test.output_file.name, test.kind,
+            test.group, test.time_limit, test.memory_limit, test.order)
+
+
 def _make_filename(env, base_name):
     unpack_dir = '/unpack/%s' % (env['package_id'])
     env['unpack_dir'] = unpack_dir
@@ -95,6 +120,14 @@ class SinolPackage(object):
                 {'c': C_EXTRA_ARGS, 'cpp': C_EXTRA_ARGS, 'pas': PAS_EXTRA_ARGS}
         self.use_make = settings.USE_SINOLPACK_MAKEFILES
         self.use_sandboxes = not settings.USE_UNSAFE_EXEC
+        self.existing_tests = {}
+        self.saved_test_values = {}
+        self.uploads = []
+        self.fingerprints = {}
+        self.new_fingerprints = {}
+        self.unchanged_inputs = set()
+        self.reused_outputs = 0
+        self.source_hashes = {}
 
     def identify(self):
         return self._find_main_folder() is not None
@@ -106,22 +139,13 @@ class SinolPackage(object):
         # Looks for the only folder which has at least the in/ and out/
         # subfolders.
         #
-        # Note that depending on the archive type, there may be or
-        # may not be entries for the folders themselves in
-        # self.archive.filenames()
-
-        files = map(os.path.normcase, self.archive.filenames())
-        files = map(os.path.normpath, files)
-        toplevel_folders = set(f.split(os.sep)[0] for f in files)
-        toplevel_folders = filter(slug_re.match, toplevel_folders)
-        problem_folders = []
-        for folder in toplevel_folders:
-            for required_subfolder in ('in', 'out'):
-                if all(f.split(os.sep)[:2] != [folder, required_subfolder]
-                       for f in files):
-                    break
-            else:
-                problem_folders.append(folder)
+        # The archive index is shared by all package backends inspecting
+        # the archive, so it is scanned only once.
+        index = self.archive.index()
+        problem_folders = [folder for folder in index.listdir()
+                if slug_re.match(folder)
+                and index.exists(os.path.join(folder, 'in'))
+                and index.exists(os.path.join(folder, 'out'))]
         if len(problem_folders) == 1:
             return problem_folders[0]
 
@@ -205,12 +229,30 @@ class SinolPackage(object):
                     _("Expected extra files %r not found in prog/")
                     % (not_found))
 
-    def _save_to_field(self, field, file):
+    def _fetch_file(self, file):
+        """Moves the file from Filetracker to the unpacking directory and
+           returns its local path.
+        """
         basename = os.path.basename(filetracker_to_django_file(file).name)
         filename = os.path.join(self.rootdir, basename)
         get_client().get_file(file, filename)
-        field.save(os.path.basename(filename), File(open(filename, 'rb')))
         get_client().delete_file(file)
+        return filename
+
+    def _save_to_field(self, field, file):
+        filename = self._fetch_file(file)
+        field.save(os.path.basename(filename), File(open(filename, 'rb')))
+
+    def _save_test_file(self, instance, field_name, filename):
+        """Assigns the local file ``filename`` to the given field of the
+           test ``instance``.
+
+           Test files are content-addressed, so unchanged tests of
+           re-uploaded packages, or the same package uploaded to several
+           contests, share their Filetracker files.
+        """
+        with open(filename, 'rb') as f:
+            setattr(instance, field_name, save_content_addressed(File(f)))
 
     def _extract_makefiles(self):
         sinol_makefiles_tgz = os.path.join(os.path.dirname(__file__),
@@ -315,6 +357,38 @@ class SinolPackage(object):
         new_env['compiled_file'] = new_env['out_file']
         return new_env
 
+    def _find_source(self, name):
+        """Returns a tuple ``(path, extension)`` of the source file of
+           program ``name`` in ``prog/``, or ``(None, None)``.
+        """
+        for ext in _submittable_extensions():
+            src = os.path.join(self.rootdir, 'prog', '%s.%s' % (name, ext))
+            if os.path.isfile(src):
+                return src, ext
+        return None, None
+
+    def _source_hash(self, suffix):
+        """Returns a hash of the source of the program with the given
+           ``suffix`` and of the non-source files in ``prog/`` (headers,
+           extra compilation files), which may be used to compile it.
+
+           Returns an empty string if the package has no such program.
+        """
+        source, _ext = self._find_source(self.short_name + suffix)
+        if not source:
+            return ''
+        progdir = os.path.join(self.rootdir, 'prog')
+        source_exts = set('.' + ext for ext in _submittable_extensions())
+        files = [source] + sorted(os.path.join(progdir, name)
+                for name in os.listdir(progdir)
+                if os.path.splitext(name)[1] not in source_exts
+                and os.path.isfile(os.path.join(progdir, name)))
+        digest = hashlib.sha256()
+        for filename in files:
+            digest.update(os.path.basename(filename) + '\0')
+            digest.update(_file_hash(filename))
+        return digest.hexdigest()
+
     def _find_and_compile(self, suffix, command=None, cwd=None,
             log_on_failure=True, out_name=None):
         renv = None
@@ -331,20 +405,7 @@ class SinolPackage(object):
                 logger.info(renv['stdout'])
         else:
             name = self.short_name + suffix
-            choices = (getattr(settings, 'SUBMITTABLE_EXTENSIONS', {})). \
-                    values()
-            lang_exts = []
-            for ch in choices:
-                lang_exts.extend(ch)
-
-            source = None
-            for ext in lang_exts:
-                src = os.path.join(self.rootdir, 'prog', '%s.%s' % (name, ext))
-                if os.path.isfile(src):
-                    source = src
-                    extension = ext
-                    break
-
+            source, extension = self._find_source(name)
             if source:
                 renv = self._compile(source, name, extension, out_name)
                 logger.info("%s: %s", self.filename, command)
@@ -369,6 +430,8 @@ class SinolPackage(object):
             return {}
 
     def _make_outs(self, outs_to_make):
+        if not outs_to_make:
+            return {}
         env = self._find_and_compile('', command='outgen')
         if not env:
             return {}
@@ -413,21 +476,43 @@ class SinolPackage(object):
             logger.info("%s: inwer success", self.filename)
 
     def _assign_scores(self, scored_groups, total_score):
-        Test.objects.filter(problem_instance=self.main_problem_instance) \
-                .update(max_score=0)
         num_groups = len(scored_groups)
         group_score = total_score / num_groups
         extra_score_groups = sorted(scored_groups, key=naturalsort_key)[
                 num_groups - (total_score - num_groups * group_score):]
-        for group in scored_groups:
+        scores = []
+        for group in sorted(scored_groups):
             score = group_score
             if group in extra_score_groups:
                 score += 1
-            Test.objects.filter(problem_instance=self.main_problem_instance,
-                    group=group).update(max_score=score)
+            scores.extend([group, score])
+
+        # A single UPDATE for all groups; tests outside them get no points.
+        qn = connection.ops.quote_name
+        column = lambda name: qn(Test._meta.get_field(name).column)
+        sql = 'UPDATE %s SET %s = CASE %s %s ELSE 0 END WHERE %s = %%s' % (
+                qn(Test._meta.db_table), column('max_score'), column('group'),
+                ' '.join(['WHEN %s THEN %s'] * num_groups),
+                column('problem_instance'))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, scores + [self.main_problem_instance.id])
+
+    def _reusable_ins(self):
+        """Returns a set of names of input files generated by ingen during
+           the previous upload, if ingen has not changed since then, so that
+           it need not be run again.
+        """
+        ingen_hash = self.source_hashes['ingen']
+        generated = [fingerprint for fingerprint in self.fingerprints.values()
+                     if fingerprint.ingen_hash]
+        if not ingen_hash or not generated or \
+                any(f.ingen_hash != ingen_hash for f in generated):
+            return set()
+        return set('%s%s.in' % (self.short_name, fingerprint.test.name)
+                   for fingerprint in generated)
 
     def _process_test(self, test, order, names_re, indir, outdir,
-            collected_ins, scored_groups, outs_to_make):
+            collected_ins, reused_ins, scored_groups, outs_to_make):
         match = names_re.match(test)
         if not match:
             if test.endswith('.in'):
@@ -441,23 +526,56 @@ class SinolPackage(object):
         group = match.group(3)       # 0
         suffix = match.group(4)      # ocen
 
-        instance, created = Test.objects.get_or_create(
-                problem_instance=self.main_problem_instance, name=name)
+        instance = self.existing_tests.get(name)
+        created = instance is None
+        if created:
+            instance = Test(problem_instance=self.main_problem_instance,
+                            name=name)
 
         inname_base = basename + '.in'
         inname = os.path.join(indir, inname_base)
         outname_base = basename + '.out'
         outname = os.path.join(outdir, outname_base)
 
-        if test in collected_ins:
-            self._save_to_field(instance.input_file, collected_ins[test])
-        else:
-            instance.input_file.save(inname_base, File(open(inname, 'rb')))
+        # Files of tests which have not changed since the previous upload
+        # are neither uploaded nor generated again.
+        fingerprint = self.fingerprints.get(name)
+        new_fingerprint = {'ingen_hash': '', 'output_hash': '',
+                           'outgen_hash': ''}
+        self.new_fingerprints[name] = new_fingerprint
 
-        if os.path.isfile(outname):
-            instance.output_file.save(outname_base, File(open(outname), 'rb'))
-        outs_to_make.append((_make_filename(self.env,
-                'out/%s' % (outname_base)), instance))
+        if test in reused_ins:
+            new_fingerprint['input_hash'] = fingerprint.input_hash
+            new_fingerprint['ingen_hash'] = fingerprint.ingen_hash
+        else:
+            if test in collected_ins:
+                inname = collected_ins[test]
+                new_fingerprint['ingen_hash'] = self.source_hashes['ingen']
+            new_fingerprint['input_hash'] = _file_hash(inname)
+        input_unchanged = fingerprint is not None and bool(
+                instance.input_file) and \
+                fingerprint.input_hash == new_fingerprint['input_hash']
+        if input_unchanged:
+            self.unchanged_inputs.add(name)
+        else:
+            self.uploads.append((instance, 'input_file', inname))
+
+        outgen_hash = self.source_hashes['outgen']
+        if outgen_hash:
+            if input_unchanged and fingerprint.outgen_hash == outgen_hash \
+                    and instance.output_file:
+                new_fingerprint['outgen_hash'] = outgen_hash
+                self.reused_outputs += 1
+            else:
+                outs_to_make.append((_make_filename(self.env,
+                        'out/%s' % (outname_base)), instance))
+        elif os.path.isfile(outname):
+            new_fingerprint['output_hash'] = _file_hash(outname)
+            if fingerprint is not None and instance.output_file and \
+                    fingerprint.output_hash == new_fingerprint['output_hash']:
+                self.reused_outputs += 1
+            else:
+                self.uploads.append((instance, 'output_file', outname))
 
         if group == '0' or 'ocen' in suffix:
             # Example tests
@@ -487,9 +605,68 @@ class SinolPackage(object):
             instance.memory_limit = DEFAULT_MEMORY_LIMIT
 
         instance.order = order
-        instance.save()
         return instance
 
+    def _run_in_pool(self, function, items):
+        """Calls ``function`` on each of ``items`` using a pool of
+           ``settings.SINOLPACK_UPLOAD_THREADS`` threads and returns a list
+           of results.
+        """
+        if not items:
+            return []
+        pool = ThreadPool(min(settings.SINOLPACK_UPLOAD_THREADS, len(items)))
+        try:
+            return pool.map(function, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _upload_test_files(self, phase_name):
+        """Uploads the files scheduled in ``self.uploads`` concurrently,
+           reporting the progress to the package.
+        """
+        uploads, self.uploads = self.uploads, []
+        with self.package.phase(phase_name) as phase:
+            phase['count'] = len(uploads)
+            phase['bytes'] = sum(os.path.getsize(filename)
+                                 for _instance, _field, filename in uploads)
+            self._do_upload_test_files(uploads)
+
+    def _do_upload_test_files(self, uploads):
+        total = len(uploads)
+        done = [0]
+        lock = threading.Lock()
+
+        def _upload(upload):
+            instance, field_name, filename = upload
+            self._save_test_file(instance, field_name, filename)
+            with lock:
+                done[0] += 1
+                self.package.set_progress(done[0], total)
+
+        self._run_in_pool(_upload, uploads)
+
+    def _save_tests(self, tests):
+        """Creates rows of new tests in bulk and updates these existing tests
+           which have changed.
+        """
+        new_tests = [test for test in tests if test.pk is None]
+        Test.objects.bulk_create(new_tests)
+        ids = dict(Test.objects.filter(
+                problem_instance=self.main_problem_instance,
+                name__in=[test.name for test in new_tests])
+                .values_list('name', 'id'))
+        for test in new_tests:
+            test.pk = ids[test.name]
+            self.existing_tests[test.name] = test
+            self.saved_test_values[test.name] = _test_values(test)
+
+        for test in tests:
+            values = _test_values(test)
+            if self.saved_test_values.get(test.name) != values:
+                test.save()
+                self.saved_test_values[test.name] = values
+
     def _generate_tests(self, total_score=100):
 
         indir = os.path.join(self.rootdir, 'in')
@@ -505,31 +682,84 @@ class SinolPackage(object):
                 self.config.get('memory_limits', {}))
         self.statement_memory_limit = self._detect_statement_memory_limit()
 
+        self.existing_tests = dict((test.name, test) for test in
+                Test.objects.filter(
+                    problem_instance=self.main_problem_instance))
+        self.saved_test_values = dict((name, _test_values(test))
+                for name, test in self.existing_tests.iteritems())
+        self.uploads = []
+        self.fingerprints = dict((fingerprint.test.name, fingerprint)
+                for fingerprint in TestFingerprint.objects.filter(
+                    test__problem_instance=self.main_problem_instance)
+                    .select_related('test'))
+        self.new_fingerprints = {}
+        self.unchanged_inputs = set()
+        self.reused_outputs = 0
+        # Programs run by makefiles are not tracked.
+        if self.use_make:
+            self.source_hashes = dict.fromkeys(('ingen', 'outgen', 'inwer'),
+                                               '')
+        else:
+            self.source_hashes = {
+                'ingen': self._source_hash('ingen'),
+                'outgen': self._source_hash(''),
+                'inwer': self._source_hash('inwer'),
+            }
+
         outs_to_make = []
         created_tests = []
-        collected_ins = self._make_ins(re_string)
-        all_items = list(set(os.listdir(indir)) | set(collected_ins.keys()))
+        reused_ins = self._reusable_ins()
+        if reused_ins:
+            logger.info("%s: ingen unchanged, not running it", self.filename)
+            collected_ins = {}
+        else:
+            with self.package.phase('ingen') as phase:
+                collected_ins = self._make_ins(re_string)
+                collected_ins = dict(zip(collected_ins.keys(),
+                        self._run_in_pool(self._fetch_file,
+                                          collected_ins.values())))
+                phase['count'] = len(collected_ins)
+        all_items = list(set(os.listdir(indir)) | set(collected_ins.keys())
+                         | reused_ins)
         if self.use_make:
             self._find_and_compile('', command='outgen')
 
         # Find tests and create objects
         for order, test in enumerate(sorted(all_items, key=naturalsort_key)):
             instance = self._process_test(test, order, names_re, indir, outdir,
-                    collected_ins, scored_groups, outs_to_make)
+                    collected_ins, reused_ins, scored_groups, outs_to_make)
             if instance:
                 created_tests.append(instance)
+        self._upload_test_files('upload tests')
+        self._save_tests(created_tests)
 
         # Check test inputs
-        self._verify_ins(created_tests)
+        if self.use_make:
+            tests_to_verify = created_tests
+        else:
+            inwer_hash = self.source_hashes['inwer']
+            tests_to_verify = [t for t in created_tests
+                    if t.name not in self.unchanged_inputs
+                    or self.fingerprints[t.name].inwer_hash != inwer_hash]
+        if tests_to_verify:
+            with self.package.phase('inwer') as phase:
+                phase['count'] = len(tests_to_verify)
+                self._verify_ins(tests_to_verify)
 
         # Generate outputs (safe upload only)
         if not self.use_make:
-            outs = self._make_outs(outs_to_make)
-            for instance in created_tests:
-                if instance.name in outs:
-                    generated_out = outs[instance.name]
-                    self._save_to_field(instance.output_file,
-                            generated_out['out_file'])
+            with self.package.phase('outgen') as phase:
+                phase['count'] = len(outs_to_make)
+                outs = self._make_outs(outs_to_make)
+                generated = [t for t in created_tests if t.name in outs]
+                filenames = self._run_in_pool(self._fetch_file,
+                        [outs[t.name]['out_file'] for t in generated])
+            for instance, filename in zip(generated, filenames):
+                self.uploads.append((instance, 'output_file', filename))
+                self.new_fingerprints[instance.name]['outgen_hash'] = \
+                        self.source_hashes['outgen']
+            self._upload_test_files('upload outputs')
+            self._save_tests(generated)
 
         # Validate tests
         for instance in created_tests:
@@ -541,6 +771,16 @@ class SinolPackage(object):
             except ValidationError as e:
                 raise ProblemPackageError(e.messages[0])
 
+        for instance in created_tests:
+            values = self.new_fingerprints[instance.name]
+            values['inwer_hash'] = self.source_hashes['inwer']
+            TestFingerprint.objects.update_or_create(test=instance,
+                    defaults=values)
+        logger.info("%s: reused %d of %d inputs, %d outputs and %d "
+                "verifications", self.filename, len(self.unchanged_inputs),
+                len(created_tests), self.reused_outputs,
+                len(created_tests) - len(tests_to_verify))
+
         # Delete nonexistent tests
         for test in Test.objects.filter(
                 problem_instance=self.main_problem_instance) \
@@ -602,9 +842,7 @@ class SinolPackage(object):
     def _process_model_solutions(self):
         ModelSolution.objects.filter(problem=self.problem).delete()
 
-        lang_exts_list = \
-                getattr(settings, 'SUBMITTABLE_EXTENSIONS', {}).values()
-        extensions = [ext for lang_exts in lang_exts_list for ext in lang_exts]
+        extensions = _submittable_extensions()
         regex = r'^%s[0-9]*([bs]?)[0-9]*\.(' + \
                 '|'.join(extensions) + ')'
         names_re = re.compile(regex % (re.escape(self.short_name),))
@@ -627,14 +865,21 @@ class SinolPackage(object):
             return (kinds[short_kind][0],
                     naturalsort_key(name[:name.index(".")]))
 
+        # Model solutions are created in bulk, so that their submissions
+        # are recreated and judged once, not after every solution.
+        instances = []
         for order, (short_kind, name, path) in \
                enumerate(sorted(progs, key=modelsolutionssort_key)):
             instance = ModelSolution(problem=self.problem, name=name,
                                      order_key=order,
                                      kind=kinds[short_kind][1])
 
-            instance.source_file.save(name, File(open(path, 'rb')))
+            instance.source_file.save(name, File(open(path, 'rb')),
+                                      save=False)
+            instances.append(instance)
             logger.info("%s: model solution: %s", self.filename, name)
+        ModelSolution.objects.bulk_create(instances)
+        ModelSolution.objects.recreate_all_model_submissions(self.problem)
 
     def _save_original_package(self):
         original_package, created = \
@@ -643,18 +888,25 @@ class SinolPackage(object):
         original_package.save()
 
     def process_package(self):
-        self._process_config_yml()
-        self._detect_full_name()
-        self._detect_library()
-        self._process_extra_files()
-        if self.use_make:
-            self._extract_makefiles()
-        else:
-            self._save_prog_dir()
-        self._process_statements()
+        with self.package.phase('config'):
+            self._process_config_yml()
+            self._detect_full_name()
+            self._detect_library()
+            self._process_extra_files()
+        with self.package.phase('programs'):
+            if self.use_make:
+                self._extract_makefiles()
+            else:
+                self._save_prog_dir()
+        with self.package.phase('statements'):
+            self._process_statements()
         self._generate_tests()
-        self._process_checkers()
-        self._process_model_solutions()
+        with self.package.phase('checkers'):
+            self._process_checkers()
+        with self.package.phase('model solutions') as phase:
+            self._process_model_solutions()
+            phase['count'] = ModelSolution.objects.filter(
+                    problem=self.problem).count()
         self._save_original_package()
 
     def unpack(self, env, package):
@@ -696,7 +948,10 @@ class SinolPackage(object):
         tmpdir = tempfile.mkdtemp()
         logger.info("%s: tmpdir is %s", self.filename, tmpdir)
         try:
-            self.archive.extract(to_path=tmpdir)
+            # Only the problem folder is used, so nothing else is extracted.
+            with self.package.phase('extract') as phase:
+                self.archive.extract(to_path=tmpdir, paths=[self.short_name])
+                phase['bytes'] = self.archive.index().size(self.short_name)
             self.rootdir = os.path.join(tmpdir, self.short_name)
             self.process_package()
 
@@ -711,21 +966,6 @@ class SinolPackageCreator(object):
     def __init__(self, problem):
         self.problem = problem
         self.short_name = problem.short_name
-        self.zip = None
-
-    def _pack_django_file(self, django_file, arcname):
-        reader = django_file.file
-        if hasattr(reader.file, 'name'):
-            self.zip.write(reader.file.name, arcname)
-        else:
-            fd, name = tempfile.mkstemp()
-            fileobj = os.fdopen(fd, 'wb')
-            try:
-                shutil.copyfileobj(reader, fileobj)
-                fileobj.close()
-                self.zip.write(name, arcname)
-            finally:
-                os.unlink(name)
 
     def _pack_statement(self):
         for statement in ProblemStatement.objects.filter(problem=self.problem):
@@ -737,22 +977,22 @@ class SinolPackageCreator(object):
             else:
                 filename = os.path.join(self.short_name, 'doc', '%szad.pdf'
                         % (self.short_name,))
-            self._pack_django_file(statement.content, filename)
+            yield filename, statement.content
 
     def _pack_tests(self):
         # Takes tests from main_problem_instance
         for test in Test.objects.filter(
                 problem_instance=self.problem.main_problem_instance):
             basename = '%s%s' % (self.short_name, test.name)
-            self._pack_django_file(test.input_file,
-                    os.path.join(self.short_name, 'in', basename + '.in'))
-            self._pack_django_file(test.output_file,
-                    os.path.join(self.short_name, 'out', basename + '.out'))
+            yield (os.path.join(self.short_name, 'in', basename + '.in'),
+                    test.input_file)
+            yield (os.path.join(self.short_name, 'out', basename + '.out'),
+                    test.output_file)
 
     def _pack_model_solutions(self):
         for solution in ModelSolution.objects.filter(problem=self.problem):
-            self._pack_django_file(solution.source_file,
-                    os.path.join(self.short_name, 'prog', solution.name))
+            yield (os.path.join(self.short_name, 'prog', solution.name),
+                    solution.source_file)
 
     def pack(self):
         try:
@@ -765,20 +1005,11 @@ class SinolPackageCreator(object):
             pass
 
         # If the original package is not available, produce the most basic
-        # output: tests, statements, model solutions.
-        fd, tmp_filename = tempfile.mkstemp()
-        try:
-            self.zip = zipfile.ZipFile(os.fdopen(fd, 'wb'), 'w',
-                    zipfile.ZIP_DEFLATED)
-            self._pack_statement()
-            self._pack_tests()
-            self._pack_model_solutions()
-            self.zip.close()
-            zip_filename = '%s.zip' % self.short_name
-            return stream_file(File(open(tmp_filename, 'rb'),
-                    name=zip_filename))
-        finally:
-            os.unlink(tmp_filename)
+        # output: tests, statements, model solutions. The archive is
+        # streamed straight from Filetracker.
+        files = itertools.chain(self._pack_statement(), self._pack_tests(),
+                self._pack_model_solutions())
+        return stream_zip_file(files, '%s.zip' % self.short_name)
 
 
 class SinolPackageBackend(ProblemPackageBackend):
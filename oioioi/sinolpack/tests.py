@@ -1,5 +1,6 @@
 # coding: utf-8
 
+import hashlib
 import os.path
 import urllib
 import zipfile
@@ -20,7 +21,7 @@ from oioioi.contests.scores import IntegerScore
 from oioioi.problems.models import Problem, ProblemStatement, ProblemPackage
 from oioioi.programs.models import Test, OutputChecker, ModelSolution, \
         TestReport
-from oioioi.sinolpack.models import ExtraConfig, ExtraFile
+from oioioi.sinolpack.models import ExtraConfig, ExtraFile, TestFingerprint
 
 
 @nottest
@@ -108,6 +109,55 @@ class TestSinolPackage(TestCase):
         test = Test.objects.filter(memory_limit=132000)
         self.assertEqual(test.count(), 5)
 
+    def test_identical_test_files_are_shared(self):
+        filename = get_test_filename('test_simple_package.zip')
+        call_command('addproblem', filename)
+        call_command('addproblem', filename)
+        first, second = Problem.objects.order_by('id')
+        tests = Test.objects.filter(
+                problem_instance=first.main_problem_instance)
+        self.assertTrue(tests.exists())
+        for test in tests:
+            other = Test.objects.get(name=test.name,
+                    problem_instance=second.main_problem_instance)
+            self.assertEqual(test.input_file.name.versioned_name,
+                    other.input_file.name.versioned_name)
+            self.assertEqual(test.output_file.name.versioned_name,
+                    other.output_file.name.versioned_name)
+            self.assertEqual(test.input_file.read(),
+                    other.input_file.read())
+
+    @attr('slow')
+    @both_configurations
+    def test_reupload_reuses_unchanged_tests(self):
+        filename = get_test_filename('test_full_package.tgz')
+        call_command('addproblem', filename)
+        problem = Problem.objects.get()
+        tests = Test.objects.filter(
+                problem_instance=problem.main_problem_instance)
+        files = dict((test.name, (test.input_file.name,
+                                  test.output_file.name)) for test in tests)
+        self.assertEqual(TestFingerprint.objects.count(), len(files))
+
+        call_command('updateproblem', str(problem.id), filename)
+        tests = Test.objects.filter(
+                problem_instance=problem.main_problem_instance)
+        self.assertEqual(dict((test.name, (test.input_file.name,
+                                           test.output_file.name))
+                              for test in tests), files)
+        self.assertEqual(TestFingerprint.objects.count(), len(files))
+        for test in tests:
+            self.assertEqual(test.sinolpack_fingerprint.input_hash,
+                    hashlib.sha256(test.input_file.read()).hexdigest())
+
+        # Programs run by makefiles are not tracked, so they are always run.
+        if not settings.USE_SINOLPACK_MAKEFILES:
+            package = ProblemPackage.objects.latest('id')
+            phases = dict((phase['name'], phase) for phase in package.phases)
+            self.assertNotIn('ingen', phases)
+            self.assertNotIn('inwer', phases)
+            self.assertEqual(phases['outgen']['count'], 0)
+
     @attr('slow')
     @both_configurations
     def test_huge_unpack_update(self):
@@ -1,22 +1,33 @@
 $(function(){
     var sync_time = 300000 + (Math.random()*60000)|0;
-    var sync_interval;
+    var sync_timeout;
     var status_url = oioioi_base_url + "status";
 
+    // The server may ask to poll less frequently when it is under load.
+    var updateSyncTime = function(data) {
+        if (data && data.sync_time) {
+            sync_time = data.sync_time + (Math.random()*data.sync_time*0.05)|0;
+        }
+    };
+
+    var scheduleUpdate = function() {
+        clearTimeout(sync_timeout);
+        sync_timeout = setTimeout(fetchUpdates, sync_time);
+    };
+
     var fetchUpdates = function() {
         $.getJSON(status_url, function(data) {
+            updateSyncTime(data);
             $(window).trigger('updateStatus', data);
-        });
+        }).always(scheduleUpdate);
     };
 
     $(window).one('initialStatus', function(ev, data) {
-        if (data.sync_time) {
-            sync_time = data.sync_time + (Math.random()*data.sync_time*0.05)|0;
-        }
+        updateSyncTime(data);
         if (data.status_url) {
             status_url = data.status_url;
         }
-        sync_interval = setInterval(fetchUpdates, sync_time);
+        scheduleUpdate();
     });
 
     $('#modal-outdated').on('hidden', function() {$(this).detach();});
@@ -1,10 +1,14 @@
 import json
+import time
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from oioioi.contests.models import Contest
 from oioioi.status import status_registry
+from oioioi.status.utils import REQUESTS_COUNTER_KEY
 
 
 def _coding_status(request, response):
@@ -77,3 +81,23 @@ class TestNoContestStatus(TestCase):
         self.assertNotContains(response, 'contest_id')
         self.assertContains(response, 'test_user')
         self.assertContains(response, 'testing an app')
+
+    @override_settings(STATUS_TARGET_REQUESTS_RATE=10,
+                       STATUS_MAX_SYNC_TIME=900000)
+    def test_adaptive_sync_time(self):
+        url = reverse('get_status')
+        self.client.login(username='test_user')
+
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(data['sync_time'], 300000)
+
+        now = int(time.time())
+        for second in xrange(now - 5, now + 5):
+            cache.set(REQUESTS_COUNTER_KEY % second, 20, 10)
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(data['sync_time'], 600000)
+
+        for second in xrange(now - 5, now + 5):
+            cache.set(REQUESTS_COUNTER_KEY % second, 1000, 10)
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(data['sync_time'], 900000)
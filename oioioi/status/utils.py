@@ -1,9 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 
 from oioioi.base.permissions import is_superuser
 from oioioi.status import status_registry
 
 
+# Numbers of status requests in each second, shared by all processes.
+REQUESTS_COUNTER_KEY = 'status_requests:%d'
+
+
+def _count_request():
+    """Counts the current status request and returns the number of
+       status requests in the previous second.
+    """
+    now = int(time.time())
+    key = REQUESTS_COUNTER_KEY % now
+    if not cache.add(key, 1, 10):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter has just expired.
+            pass
+    return cache.get(REQUESTS_COUNTER_KEY % (now - 1)) or 0
+
+
+def adapt_sync_time(sync_time):
+    """Makes clients poll less frequently when the status is requested
+       more than ``settings.STATUS_TARGET_REQUESTS_RATE`` times per second,
+       proportionally to the load, but not less often than every
+       ``settings.STATUS_MAX_SYNC_TIME`` milliseconds.
+    """
+    rate = _count_request()
+    target = settings.STATUS_TARGET_REQUESTS_RATE
+    if rate <= target:
+        return sync_time
+    return max(sync_time, min(int(sync_time * float(rate) / target),
+                              settings.STATUS_MAX_SYNC_TIME))
+
+
 def get_status(request):
     """Returns dict composed by ``status_registry`` functions."""
     response = {
@@ -20,4 +57,5 @@ def get_status(request):
     for fun in status_registry:
         response = fun(request, response)
 
+    response['sync_time'] = adapt_sync_time(response['sync_time'])
     return response
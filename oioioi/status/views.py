@@ -1,7 +1,8 @@
 from oioioi.status.utils import get_status
-from oioioi.base.utils import jsonify
+from oioioi.base.utils import jsonify, content_etag
 
 
+@content_etag
 @jsonify
 def get_status_view(request):
     return get_status(request)
@@ -1,5 +1,6 @@
 from django.utils.translation import ugettext_lazy as _
 from oioioi.contests.models import Contest
+from oioioi.contests.utils import cached_user_permissions
 
 from oioioi.teachers.models import Teacher, ContestTeacher
 
@@ -15,10 +16,30 @@ class TeacherAuthBackend(object):
         if not user_obj.is_authenticated() or not user_obj.is_active:
             return False
         if perm == 'teachers.teacher':
-            return bool(Teacher.objects.filter(user=user_obj, is_active=True))
+            return self._get_permissions(user_obj)[0]
         if perm == 'contests.contest_admin' and isinstance(obj, Contest):
-            if not hasattr(user_obj, '_teacher_perms_cache'):
-                user_obj._teacher_perms_cache = set(ContestTeacher.objects
-                    .filter(teacher__user=user_obj, teacher__is_active=True)
-                    .values_list('contest', flat=True))
-            return obj.id in user_obj._teacher_perms_cache
+            return obj.id in self._get_permissions(user_obj)[1]
+
+    def contests_with_perm(self, user_obj, perm):
+        """Returns ids of contests for which the user has the permission."""
+        if not user_obj.is_authenticated() or not user_obj.is_active or \
+                perm != 'contests.contest_admin':
+            return set()
+        return set(self._get_permissions(user_obj)[1])
+
+    def _get_permissions(self, user_obj):
+        """Returns a tuple: whether the user is an active teacher and
+           the set of ids of contests they teach.
+        """
+        if not hasattr(user_obj, '_teacher_perms_cache'):
+            def _compute():
+                is_teacher = Teacher.objects \
+                        .filter(user=user_obj, is_active=True).exists()
+                contests = frozenset(ContestTeacher.objects
+                        .filter(teacher__user=user_obj,
+                                teacher__is_active=True)
+                        .values_list('contest', flat=True))
+                return is_teacher, contests
+            user_obj._teacher_perms_cache = cached_user_permissions(user_obj,
+                    'teacher_permissions', _compute)
+        return user_obj._teacher_perms_cache
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 from oioioi.base.utils.deps import check_django_app_dependencies
@@ -33,6 +35,21 @@ class ContestTeacher(models.Model):
         return u'%s/%s' % (self.contest_id, self.teacher.user)
 
 
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def _invalidate_contest_membership_of_teacher(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_membership
+    invalidate_contest_membership(instance.user_id)
+
+
+@receiver(post_save, sender=ContestTeacher)
+@receiver(post_delete, sender=ContestTeacher)
+def _invalidate_contest_membership(sender, instance, **kwargs):
+    from oioioi.contests.utils import invalidate_contest_membership
+    # The teacher is the primary key of the user.
+    invalidate_contest_membership(instance.teacher_id)
+
+
 class RegistrationConfig(models.Model):
     contest = models.OneToOneField(Contest, primary_key=True)
     is_active_pupil = models.BooleanField(default=True)
@@ -125,3 +125,6 @@ LOGGING['loggers']['django.db.backends.schema'] = {
     'handlers': ['console'],
     'level': 'INFO',
 }
+
+# Do not wait for RabbitMQ, which is not available in tests, on exit.
+NOTIFICATIONS_FLUSH_TIMEOUT = 0
@@ -1,5 +1,4 @@
 import logging
-import os
 
 from django.core.validators import slug_re
 from django.utils.translation import ugettext as _
@@ -16,10 +15,8 @@ class ZeusPackage(SinolPackage):
     package_backend_name = 'oioioi.zeus.package.ZeusPackageBackend'
 
     def _find_main_folder(self):
-        files = map(os.path.normcase, self.archive.filenames())
-        files = map(os.path.normpath, files)
-        toplevel_folders = set(f.split(os.sep)[0] for f in files)
-        toplevel_folders = filter(slug_re.match, toplevel_folders)
+        toplevel_folders = filter(slug_re.match,
+                                  self.archive.index().listdir())
 
         folder = super(ZeusPackage, self)._find_main_folder()
         if not folder and len(toplevel_folders) > 0:
@@ -38,7 +35,7 @@ class ZeusPackage(SinolPackage):
 
 class ZeusPackageCreator(SinolPackageCreator):
     def _pack_tests(self):
-        pass
+        return []
 
 
 class ZeusPackageBackend(SinolPackageBackend):